@@ -0,0 +1,106 @@
+"""Wie viele Datenbankeinträge verwirft der Fingerprint-Vorfilter vor der RMSD-Zuordnung?
+
+Erzeugt eine synthetische Konformerenbibliothek (Torsion eines Molekülteils, Rauschen,
+zufällige Drehung und Atomreihenfolge) und vergleicht Kandidaten einmal mit und einmal
+ohne Vorfilter.
+
+    python benchmarks/bench_fingerprint.py --atoms 60 --conformers 400
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import database
+from database import Database
+from fingerprint import fingerprint, rmsd_lower_bound
+
+
+def random_rotation(rng):
+    q, r = np.linalg.qr(rng.normal(size=(3, 3)))
+    return q * np.sign(np.diag(r))
+
+
+def conformer(base, rng, noise=0.02):
+    """Dreht die zweite Molekülhälfte um die Achse zwischen zwei Atomen und verrauscht leicht"""
+    half = len(base) // 2
+    axis = base[half] - base[half - 1]
+    axis /= np.linalg.norm(axis)
+    angle = rng.uniform(0, 2 * np.pi)
+    K = np.array([[0, -axis[2], axis[1]], [axis[2], 0, -axis[0]], [-axis[1], axis[0], 0]])
+    R = np.eye(3) + np.sin(angle) * K + (1 - np.cos(angle)) * K @ K
+    coords = base.copy()
+    coords[half:] = (coords[half:] - base[half]) @ R.T + base[half]
+    coords += rng.normal(scale=noise, size=coords.shape)
+    return coords @ random_rotation(rng).T
+
+
+def to_xyz(atoms, coords):
+    lines = [f"{len(atoms)}", "synthetic"]
+    lines += [f"{a} {x:.6f} {y:.6f} {z:.6f}" for a, (x, y, z) in zip(atoms, coords)]
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atoms", type=int, default=60)
+    parser.add_argument("--conformers", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    atoms = rng.choice(["C", "H", "N", "O"], size=args.atoms, p=[0.4, 0.4, 0.1, 0.1]).tolist()
+    base = np.cumsum(rng.normal(scale=0.9, size=(args.atoms, 3)), axis=0)
+    library = [conformer(base, rng) for _ in range(args.conformers)]
+    vectors = [fingerprint(coords)[1] for coords in library]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database.BASE_PATH = Path(tmp)
+        db = Database(Path(tmp) / "bench" / "bench", {})
+        library_xyz = [to_xyz(atoms, coords) for coords in library]
+
+        kept_total = 0
+        pruned_time = 0.0
+        full_time = 0.0
+        missed = 0
+        for q in range(args.queries):
+            # Jede zweite Anfrage ist ein echtes Duplikat (gedreht und umnummeriert)
+            if q % 2 == 0:
+                source = library[rng.integers(len(library))]
+                order = rng.permutation(args.atoms)
+                query = (source @ random_rotation(rng).T)[order]
+                query_atoms = [atoms[i] for i in order]
+            else:
+                query = conformer(base, rng)
+                query_atoms = atoms
+            query_xyz = to_xyz(query_atoms, query)
+
+            start = time.perf_counter()
+            query_vector = fingerprint(query)[1]
+            kept = [i for i, v in enumerate(vectors)
+                    if rmsd_lower_bound(query_vector, v, args.atoms) <= db.fingerprint_tolerance]
+            found_pruned = any(db.rmsd(query_xyz, library_xyz[i])[0] < db.rmsd_value for i in kept)
+            pruned_time += time.perf_counter() - start
+            kept_total += len(kept)
+
+            start = time.perf_counter()
+            found_full = any(db.rmsd(query_xyz, xyz)[0] < db.rmsd_value for xyz in library_xyz)
+            full_time += time.perf_counter() - start
+            missed += found_full and not found_pruned
+
+    candidates = args.queries * args.conformers
+    print(f"library: {args.conformers} conformers x {args.atoms} atoms, {args.queries} queries")
+    print(f"reached exact stage: {kept_total} of {candidates} ({100 * (1 - kept_total / candidates):.1f}% pruned)")
+    print(f"duplicates missed by prefilter: {missed}")
+    print(f"with prefilter: {pruned_time:.2f}s, without: {full_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Vorbereitungszeit pro Struktur: alter textbasierter Weg gegen das Array-Modell (Molecule).
+
+Misst die Schritte von ORCAInputFileCreator.prepare, die kein RDKit brauchen:
+Mittelpunkt/Ligandensuche, fragment_cleaning, Aufteilen in fragment_*/subsys_*.xyz und
+die Fragmentzeilen der .inp-Dateien. Der alte Weg ist hier als Referenz nachgebaut.
+
+    python benchmarks/bench_prepare.py --atoms 2000 --fragments 200 --repeat 5
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from molecule import Molecule
+
+
+def legacy_prepare(xyz_file: str, subsys_groups: list, folder: str) -> list:
+    """Der Ablauf vor dem Array-Modell: Text lesen, pro Gruppe neu öffnen, Dict-Mapping"""
+    with open(xyz_file) as f:
+        block = f.read().strip().split("\n")[2:]
+    coords = np.mean([np.array(atom.split()[1:], dtype=float) for atom in block], axis=0)
+    np.argmin([np.linalg.norm(np.array(atom.split()[1:], dtype=float) - coords) for atom in block])
+
+    for fragment_groups in subsys_groups:
+        with open(xyz_file, "r") as file:
+            atom_names = [line.split()[0] for line in file.readlines()[2:]]
+        for i, atom in enumerate(atom_names):
+            if len(atom) > 1:
+                for j, fragment in enumerate(fragment_groups):
+                    for atom in fragment:
+                        if atom == i:
+                            fragment_groups.insert(0, fragment_groups.pop(j))
+                            break
+        with open(xyz_file, "r") as file:
+            lines = file.readlines()
+        atom_data = [line.replace("\t", " ") for line in lines[2:2 + int(lines[0])]]
+
+    def split(fragments_list, name):
+        for i, fragment_indices in enumerate(fragments_list):
+            with open(f"{folder}/{name}_{i + 1:03}.xyz", "w") as out:
+                out.write(f"{len(fragment_indices)}\nFragment generated by split_xyz\n")
+                out.writelines([atom_data[idx] for idx in fragment_indices])
+
+    split(subsys_groups[-1], "fragment")
+    split([[a for group in groups for a in group] for groups in subsys_groups[:-1]], "subsys")
+
+    fragment_lines = []
+    for fragment_groups in subsys_groups:
+        all_sorted = sorted(a for group in fragment_groups for a in group)
+        index_mapping = {old: new for new, old in enumerate(all_sorted)}
+        lines = ["%geom\n Fragments\n"]
+        for i, group in enumerate(fragment_groups, start=1):
+            lines.append(f"  {i} {{{' '.join(str(index_mapping[a]) for a in group)}}} end\n")
+        fragment_lines.append(lines + [" end\nend\n"])
+    return fragment_lines
+
+
+def array_prepare(xyz_file: str, subsys_groups: list, folder: str) -> list:
+    """Derselbe Ablauf mit einmal eingelesenem Molecule und Indexarrays"""
+    molecule = Molecule.from_xyz(xyz_file)
+    molecule.closest_to_centroid()
+    multi = molecule.multi_letter_atoms()
+    for fragment_groups in subsys_groups:
+        owner = np.full(len(molecule), -1)
+        for j, fragment in enumerate(fragment_groups):
+            owner[fragment] = j
+        touched = []
+        for j in owner[multi][::-1]:
+            if j >= 0 and j not in touched:
+                touched.append(j)
+        order = touched + [j for j in range(len(fragment_groups)) if j not in touched]
+        fragment_groups[:] = [fragment_groups[j] for j in order]
+
+    for i, indices in enumerate(subsys_groups[-1]):
+        molecule.subset(indices).write_xyz(f"{folder}/fragment_{i + 1:03}.xyz", "Fragment generated by split_xyz")
+    for i, groups in enumerate(subsys_groups[:-1]):
+        molecule.subset(np.concatenate(groups)).write_xyz(f"{folder}/subsys_{i + 1:03}.xyz", "Fragment generated by split_xyz")
+
+    fragment_lines = []
+    for fragment_groups in subsys_groups:
+        all_sorted = np.sort(np.concatenate(fragment_groups))
+        lines = ["%geom\n Fragments\n"]
+        for i, group in enumerate(fragment_groups, start=1):
+            lines.append(f"  {i} {{{' '.join(map(str, np.searchsorted(all_sorted, group)))}}} end\n")
+        fragment_lines.append(lines + [" end\nend\n"])
+    return fragment_lines
+
+
+def synthetic_structure(atoms: int, fragments: int, rng):
+    elements = rng.choice(["C", "H", "N", "O", "Br", "Cl"], size=atoms, p=[0.35, 0.45, 0.08, 0.08, 0.02, 0.02])
+    coords = rng.normal(scale=8.0, size=(atoms, 3))
+    cuts = np.sort(rng.choice(np.arange(1, atoms), size=fragments - 1, replace=False))
+    frags = [f.tolist() for f in np.split(rng.permutation(atoms), cuts)]
+    return Molecule(elements, coords), frags
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atoms", type=int, default=2000)
+    parser.add_argument("--fragments", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    molecule, frags = synthetic_structure(args.atoms, args.fragments, rng)
+    timings = {"legacy": [], "array": []}
+    outputs = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        xyz_file = f"{tmp}/structure.xyz"
+        molecule.write_xyz(xyz_file, "synthetic")
+        for _ in range(args.repeat):
+            for name, prepare in (("legacy", legacy_prepare), ("array", array_prepare)):
+                # Ligand (erstes Fragment) gegen den Rest, dazu das Supersystem, wie parse_fragments
+                groups = [[frags[0]], frags[1:], list(frags)]
+                if name == "array":
+                    groups = [[np.array(f) for f in g] for g in groups]
+                start = time.perf_counter()
+                result = prepare(xyz_file, groups, tmp)
+                timings[name].append(time.perf_counter() - start)
+                outputs[name] = result
+        assert outputs["legacy"] == outputs["array"], "fragment lines differ"
+
+    print(f"structure: {args.atoms} atoms, {args.fragments} fragments, best of {args.repeat}")
+    for name in ("legacy", "array"):
+        print(f"{name:>6}: {min(timings[name]) * 1000:.1f} ms per structure")
+
+
+if __name__ == "__main__":
+    main()
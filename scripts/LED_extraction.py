@@ -1,13 +1,15 @@
 import os
 import sys
 from pathlib import Path
+from file_cache import shared_cache
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from LEDAW.ledaw_package.nbody_engine import engine_LED_N_body
 
 class LEDExtractor:
-    def __init__(self, base):
+    def __init__(self, base, file_cache=shared_cache):
         self.base = base
+        self.file_cache = file_cache
         self.base_path = Path(base)
         self.xlsx_file = f"{base}/Summary_fp-LED_matrices.xlsx"
         self.xyz_file = f"{base}/{self.base_path.stem}.xyz"
@@ -19,8 +21,7 @@ class LEDExtractor:
 
     def read_file(self, filepath):
         try:
-            with open(filepath, "r") as file:
-                content = file.read()
+            content = self.file_cache.read_text(filepath)
             print(f"Successfully read file: {filepath}")
             return filepath, content
         except FileNotFoundError:
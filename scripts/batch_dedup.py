@@ -0,0 +1,70 @@
+import logging
+from collections import defaultdict
+import numpy as np
+from database import Database, batch_assignment
+from fingerprint import fingerprint, rmsd_lower_bound
+
+
+class BatchDeduplicator:
+    """Clusters the calculations of one upload in memory before the database is asked.
+
+    Two calculations are the same if they agree in formula, method header and atom count,
+    their geometries match below ``Database.rmsd_value`` and the fragmentation agrees under
+    the atom assignment, i.e. the same rules as ``Database.molecule_exists``. Only the first
+    calculation of every cluster is submitted, the others are linked to its database entry.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+
+    def describe(self, calculation):
+        """Key, fragment header, distance matrix, elements and fingerprint of one calculation"""
+        content = self.db.file_cache.read_text(calculation.job_dir.parent / f"{calculation.job_dir.name}.xyz")
+        atoms = self.db.atoms_from_filecontent(content)
+        coords = self.db.coords_from_filecontent(content)
+        # gleiche Form wie FileCache.read_header, damit die Fragmentvergleiche identisch bleiben
+        header = "".join(line.strip() for line in calculation.inp_content(calculation.xyz_file).splitlines(keepends=True))
+        key = (self.db.atoms_to_str(atoms), self.db.header_key(header), len(atoms))
+        return key, header, self.db.compute_distance_matrix(coords), atoms, fingerprint(coords)
+
+    def same_fragmentation(self, header: str, other_header: str, col_ind) -> bool:
+        fragments = self.db.right_fragmentation(header, None)
+        mapped = self.db.right_fragmentation(other_header, col_ind)
+        return [f.tolist() for f in fragments] == [f.tolist() for f in mapped]
+
+    def cluster(self, calculations: list) -> tuple[list, dict]:
+        """Return the unique calculations and ``{duplicate: representative}``"""
+        groups = defaultdict(list)
+        for calculation in calculations:
+            key, *described = self.describe(calculation)
+            groups[key].append((calculation, *described))
+
+        unique = []
+        duplicates = {}
+        for key, members in groups.items():
+            representatives = []
+            for calculation, header, D, atoms, (fp_hash, vector) in members:
+                candidates = [
+                    rep for rep in representatives
+                    if rep[4][0] == fp_hash or rmsd_lower_bound(vector, rep[4][1], key[2]) <= self.db.fingerprint_tolerance
+                ]
+                match = None
+                if candidates:
+                    rmsd, col_ind, _ = batch_assignment(D, atoms, [rep[2] for rep in candidates], [rep[3] for rep in candidates])
+                    for n in np.argsort(rmsd):
+                        rep = candidates[n]
+                        if rmsd[n] >= self.db.rmsd_value:
+                            break
+                        if self.same_fragmentation(header, rep[1], col_ind[n]):
+                            match = rep
+                            break
+                if match is None:
+                    representatives.append((calculation, header, D, atoms, (fp_hash, vector)))
+                    unique.append(calculation)
+                else:
+                    duplicates[calculation] = match[0]
+
+        position = {id(calculation): i for i, calculation in enumerate(calculations)}
+        unique.sort(key=lambda calculation: position[id(calculation)])
+        logging.info("Batch dedup: %d of %d calculations are unique", len(unique), len(calculations))
+        return unique, duplicates
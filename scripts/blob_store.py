@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import shutil
+import stat
+import tempfile
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # gzip aus der Standardbibliothek als Rückfall
+    zstandard = None
+
+CHUNK = 1024 * 1024
+FICLONE = 0x40049409
+
+
+def reflink(src: Path, dst: Path) -> None:
+    """Copy-on-write clone (btrfs, XFS, ...); raises OSError where unsupported"""
+    import fcntl
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dst)
+            raise
+
+
+def clone_or_copy(src: Path, dst: Path) -> str:
+    """Place an independent copy of ``src`` at ``dst``: a reflink where supported, else a copy"""
+    try:
+        reflink(src, dst)
+        return "reflink"
+    except (OSError, ImportError):
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+def link_or_copy(src: Path, dst: Path, mode: str = "auto") -> str:
+    """Place ``src`` at ``dst`` as reflink, copy or hardlink and return which one was used.
+
+    ``mode`` is ``"reflink"``, ``"copy"``, ``"hardlink"`` or ``"auto"`` (reflink, then copy).
+    A hardlink shares the inode, so every later write to ``src`` also changes ``dst``; it is
+    only used when asked for explicitly and needs both on the same filesystem.
+    """
+    src = Path(src).resolve()
+    if mode == "hardlink":
+        logging.warning("Hardlinking %s: writes to the source also change %s", src, dst)
+        os.link(src, dst)
+        return "hardlink"
+    if mode in ("auto", "reflink"):
+        try:
+            reflink(src, dst)
+            return "reflink"
+        except (OSError, ImportError):
+            if mode == "reflink":
+                raise
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+class BlobStore:
+    """Content-addressed store for large ORCA artifacts below ``root``.
+
+    Blobs are named by the SHA-256 of their uncompressed content and symlinked to the entry
+    file names, which is also how ``prune`` finds the blobs still in use. Raw blobs keep
+    ``.out``/``.property.txt`` readable through the symlink; compressed blobs (zstd, gzip
+    without ``zstandard``) are read through ``open``. Blobs are read-only, so a write through
+    an entry name fails instead of changing the content of every entry sharing the blob;
+    a rerun has to write into a fresh entry.
+    """
+
+    def __init__(self, root: Path, compressed_suffixes=(".cube", ".densities")) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compressed_suffixes = tuple(compressed_suffixes)
+        self.codec = ".zst" if zstandard is not None else ".gz"
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def blob_path(self, digest: str, codec: str = "") -> Path:
+        return self.root / digest[:2] / f"{digest}{codec}"
+
+    def find(self, digest: str):
+        for codec in ("", ".zst", ".gz"):
+            path = self.blob_path(digest, codec)
+            if path.exists():
+                return path
+        return None
+
+    def put(self, src: Path, compress: bool = False) -> Path:
+        """Store ``src`` (if its content is not stored yet) and return the blob path.
+
+        A blob never shares its inode with ``src``: a hardlink would make the source
+        read-only and let later writes to it change the blob behind its hash.
+        """
+        digest = self.hash_file(src)
+        existing = self.find(digest)
+        if existing is not None:
+            return existing
+        target = self.blob_path(digest, self.codec if compress else "")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            if compress:
+                with open(src, "rb") as fsrc, open(tmp, "wb") as fdst:
+                    if zstandard is not None:
+                        zstandard.ZstdCompressor(level=3).copy_stream(fsrc, fdst)
+                    else:
+                        with gzip.GzipFile(fileobj=fdst, mode="wb", compresslevel=6) as gz:
+                            shutil.copyfileobj(fsrc, gz, CHUNK)
+            else:
+                os.unlink(tmp)
+                clone_or_copy(src, tmp)
+            os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return target
+
+    def store(self, src: Path, dst: Path) -> Path:
+        """Put ``src`` into the store and make ``dst`` resolve to it"""
+        compress = Path(dst).name.endswith(self.compressed_suffixes)
+        blob = self.put(src, compress)
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        os.symlink(blob, dst)
+        return blob
+
+    def open(self, path: Path, mode: str = "rb"):
+        """Open an entry file; compressed blobs are decompressed while streaming"""
+        real = Path(path).resolve()
+        if real.suffix == ".zst" and real.parent.parent == self.root.resolve():
+            raw = zstandard.ZstdDecompressor().stream_reader(open(real, "rb"), closefd=True)
+        elif real.suffix == ".gz" and real.parent.parent == self.root.resolve():
+            raw = gzip.open(real, "rb")
+        else:
+            return open(real, mode)
+        return io.TextIOWrapper(raw) if "b" not in mode else raw
+
+    def prune(self, entries_root: Path) -> int:
+        """Delete blobs no entry below ``entries_root`` refers to any more.
+
+        Raw blobs are kept while an entry is still hardlinked to them (stores written before
+        entries were symlinked); ``Database.compact`` replaces those hardlinks.
+        """
+        referenced = set()
+        for root, dirs, files in os.walk(entries_root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for file in files:
+                path = Path(root) / file
+                if path.is_symlink():
+                    referenced.add(os.path.realpath(path))
+        removed = 0
+        for blob in self.root.glob("*/*"):
+            if blob.name.startswith(".tmp-"):
+                continue
+            raw = blob.suffix not in (".zst", ".gz")
+            if str(blob.resolve()) in referenced or (raw and blob.stat().st_nlink > 1):
+                continue
+            blob.unlink()
+            removed += 1
+        logging.info("Removed %d unreferenced blobs", removed)
+        return removed
@@ -1,9 +1,12 @@
 import os
-import re
 import time
 import streamlit as st
 from pathlib import Path
 import pipeline
+from job_array import JobArraySubmitter
+from job_dag import SlurmBackend
+from local_backend import LocalExecutor
+from fragmentation import STRATEGIES, Fragmenter
 from LED_extraction import LEDExtractor
 from csv_to_viz import extract
 from visualization import MoleculeVisualizer
@@ -13,15 +16,26 @@ from rdkit import Chem
 import cProfile
 import pstats
 import numpy as np
-import asyncio
 from database import Database
+from file_cache import shared_cache
+from output_reader import shared_reader
+from job_status import check_progress_of_all_topics
+from status_watcher import STATUS_DB, StatusStore
 
 BASE_PATH = Path(Path(__file__).resolve().parent.parent / "calculations")
 if not BASE_PATH.exists():
     BASE_PATH.mkdir(parents=True, exist_ok=True)
 open_topic = ""
 state = 0
-file_cache ={}
+file_cache = shared_cache
+# ältere Schnappschüsse des status_watcher gelten als veraltet, dann wird selbst gesucht
+STATUS_MAX_AGE = 1800
+
+
+@st.cache_resource
+def local_executor() -> LocalExecutor:
+    """Ein Executor (und damit ein Kernbudget) für alle Sitzungen des Dashboards"""
+    return LocalExecutor()
 
 def profile(func):
     def wrapper(*args, **kwargs):
@@ -94,7 +108,9 @@ class Dashboard:
                         clean_name = uploaded_file.name.translate(str.maketrans(" ", "_", "!$%&()=+,-/:;<=>?@[\]^`{|}~"))
                         save_path = BASE_PATH / f"{topic}/{Path(clean_name).stem}/{clean_name}"
                         save_path.parent.mkdir(parents=True, exist_ok=True)
-                        save_path.write_bytes(uploaded_file.getbuffer())
+                        # gleiche Datei nicht neu schreiben, sonst gilt die Struktur über die mtime als geändert
+                        if not save_path.exists() or save_path.read_bytes() != bytes(uploaded_file.getbuffer()):
+                            save_path.write_bytes(uploaded_file.getbuffer())
                         logging.info(f"File uploaded: {uploaded_file.name} with topic: {topic}")
                         return save_path
                     except Exception as e:
@@ -142,18 +158,41 @@ class Dashboard:
     %mdci
         MaxIter 200
     end""")
+        strategy = st.selectbox("Fragmentierung", ["RDKit (GetMolFrags)", *STRATEGIES])
+        fragmenter = None
+        if strategy != "RDKit (GetMolFrags)":
+            cutoff = st.number_input("Schalenradius (Å)", value=4.0, min_value=0.5) if strategy == "shell" else 4.0
+            k = int(st.number_input("Anzahl nächster Fragmente", value=6, min_value=1)) if strategy == "nearest" else 6
+            count = int(st.number_input("Anzahl Umgebungsfragmente (0 = alle einzeln)", value=4 if strategy == "count" else 0, min_value=1 if strategy == "count" else 0))
+            fragmenter = Fragmenter(strategy, cutoff=cutoff, k=k, count=count or None)
+        use_guess = st.checkbox("Orbitale ähnlicher Datenbankeinträge als Startvermutung nutzen (MORead)", value=False)
+        guess_tolerance = st.number_input("RMSD-Toleranz für die Startvermutung", value=0.1, min_value=0.001, format="%.3f") if use_guess else None
+        use_job_arrays = st.checkbox("Als Slurm-Job-Arrays abschicken", value=False)
+        use_job_dag = st.checkbox("LED-Auswertung als abhängigen Slurm-Job anhängen", value=False)
+        use_local = st.checkbox("Lokal ausführen (kleine Rechnungen, ohne Slurm)", value=False)
         if st.button("Berechnung starten"):
             if file_paths:
                 st.info("Die Berechnung wurde in Auftrag gegeben...")
-                async def process_file(file_path):
-                    pipeline.ORCAInputFileCreator(str(file_path), header_input).create_inp_files(file_cache)
-
-                async def process_all_files():
-                    tasks = [process_file(file_path) for file_path in file_paths]
-                    await asyncio.gather(*tasks)
-
-                asyncio.run(process_all_files())
-                st.success("Die Berechnung wurde vorbereitet.")
+                progress_bar = st.progress(0.0, text="Strukturen werden vorbereitet...")
+
+                def update_progress(done, total, file):
+                    progress_bar.progress(done / total, text=f"{done}/{total} vorbereitet: {Path(file).name}")
+
+                duplicates, errors = pipeline.create_inp_files_batch(
+                    file_paths, header_input, file_cache, progress_callback=update_progress,
+                    job_array=local_executor() if use_local else JobArraySubmitter() if use_job_arrays else None,
+                    backend=(local_executor() if use_local else SlurmBackend()) if use_job_dag else None,
+                    fragmenter=fragmenter,
+                    guess_tolerance=guess_tolerance,
+                )
+                if duplicates:
+                    st.info(f"{len(duplicates)} gleiche Rechnungen im Upload werden nur einmal gerechnet.")
+                for item, error in errors.items():
+                    st.error(f"{item}: {error}")
+                if errors:
+                    st.warning(f"{len(errors)} Strukturen oder Rechnungen konnten nicht vorbereitet werden.")
+                else:
+                    st.success("Die Berechnung wurde vorbereitet.")
             else:
                 st.error("Bitte wählen Sie eine Datei aus.")
 
@@ -161,148 +200,6 @@ class Dashboard:
     @st.fragment(run_every="600s")
     @profile
     def check_progress_of_all_jobs():
-        class JobHandler:
-            @staticmethod
-            def check_orca_termination(content):
-                return "****ORCA TERMINATED NORMALLY****" in content
-
-            @staticmethod
-            def get_progress_of_job(output, path):
-                runtime = None
-                error_status = JobHandler.get_error_file(path)
-                
-                status, runtime = JobHandler.check_slurm_job_status_and_duration(path)
-                if status != "Not Finished":
-                    return status, runtime
-
-                if JobHandler.check_orca_termination(output):
-                    return "Progress: 100%", runtime
-                
-                if error_status is not None:
-                    return error_status, None
-                count = 0
-                output = output.split("\n")
-                if "INITIAL GUESS DONE" in output:
-                    count += 1
-                for line in output:
-                    if "TIMINGS" in line:
-                        count += 1
-                return f"Progress: {int(count *50)}%", runtime
-
-            @staticmethod
-            def get_error_file(path):
-                total_path = Path(f"{path}_err.err")
-                if os.path.exists(total_path):
-                    try:
-                        content = total_path.read_text()
-                        if "multiplicity" in content:
-                            return "multiplicity"
-                        if "OUT OF MEMORY ERROR!" in content:
-                            return "memory"
-                        if "Segmentation fault" in content:
-                            return "Seg fault"
-                        if "Wrong syntax in xyz coordinates" in content:
-                            return "Syntax"
-                        if "Tool-Scanner" in content:
-                            return "Scanner"
-                        if "CANCELLED AT" in content:
-                            return "CANCELLED"
-                        if "mpirun noticed that process" in content:
-                            return "mpirun"
-                        if "CalcSigma" in content:
-                            return "CalcSigma"
-                        if "out of memory" in content:
-                            return "memory"
-                        if "CANCELLED" in content:
-                            return "CANCELLED"
-                        if "aborting the run" in content:
-                            return "aborted"
-                    except Exception as e:
-                        logging.error(f"Error reading error file: {str(e)}")
-                        return f"Error: {str(e)}"
-                return None
-
-            @staticmethod
-            def check_slurm_job_status_and_duration(base_path: Path) -> tuple:
-                """Gibt Status und Laufzeit für SLURM-Job zurück"""
-                slurm_output_path = base_path.with_name(base_path.name + "_out.out")
-                
-                if not slurm_output_path.exists():
-                    return "Not Finished", None
-
-                status = "Not Finished"
-                runtime = None
-                content = slurm_output_path.read_text()
-                
-                if "DUE TO TIME LIMIT" in content:
-                    status = "Failed: Time Limit"
-                elif "CANCELLED" in content:
-                    status = "Cancelled"
-                elif "CPU Utilized:" in content:
-                    time_parts = content.split("CPU Utilized:")[1].split("\n")[0].split(":")[0:3]
-                    runtime = ":".join(time_parts).strip()
-                return status, runtime
-
-            @staticmethod
-            def get_color_and_progress(progress: str) -> tuple:
-                """Gibt Farbe und Prozentwert für Progress-Balken zurück"""
-                if progress == "Not Started":
-                    return "grey", 100
-                if "Progress:" not in progress:
-                    return "red", 100
-                if "100%" in progress:
-                    return "green", 100
-                
-                progress_value = float(progress.replace("Progress:", "").replace("%", "").strip())
-                return "orange", progress_value
-
-            @staticmethod
-            def energy_extraction(context):
-                matches = list(re.finditer(r"FINAL SINGLE POINT ENERGY \s+([-+]?\d+\.\d+)", context))
-                if not matches:
-                    return None
-                return float(matches[-1].group(1))
-
-        def check_progress_of_single_topic(topic_path):
-            def check_progress_of_single_file(path):
-                if path.is_dir():
-                    output_file = path / f"{path.stem}.out"
-                    if output_file.exists():
-                        lines = output_file.read_text()
-
-                        progress, runtime = JobHandler.get_progress_of_job(lines, path / path.stem)
-                        jobs_progress = (progress, runtime, path.stem, JobHandler.energy_extraction(lines))
-                    else:
-                        jobs_progress = ("Not Started", None, path.stem, None)
-                return jobs_progress
-
-            subtopics = {}
-            for subfolder_name in os.listdir(topic_path):
-                subtopics[subfolder_name] = {}
-                subfolder_path = Path(topic_path) / subfolder_name
-                if os.path.isdir(subfolder_path):
-                    subfolders = sorted(
-                        [f for f in subfolder_path.iterdir() if f.is_dir()],
-                        key=lambda x: ("subsys_" in x.name, x.name)
-                    ) or sorted(
-                        [f for f in subfolder_path.iterdir() if f.is_dir()],
-                        key=lambda x: ("fragment_" in x.name, x.name)
-                    )
-                    check = any(folder.name.startswith(("fragment_", "subsys_")) for folder in subfolders)
-
-                    if check:
-                        jobs_progress = {}
-                        for subsubfolder_name in subfolders:
-                            job_path = subfolder_path / subsubfolder_name
-                            jobs_info = check_progress_of_single_file(job_path)
-                            jobs_progress[subsubfolder_name] = jobs_info
-                        if jobs_progress:
-                            subtopics[subfolder_name] = (jobs_progress, subfolder_path)
-
-                if subtopics[subfolder_name] == {}:
-                    del subtopics[subfolder_name]
-            return subtopics
-
         def update_dashboard(topics_progress):
             global open_topic, state
 
@@ -428,21 +325,15 @@ class Dashboard:
                         st.empty()
 
         logging.info("Checking progress of all jobs.")
-        topics_dir = BASE_PATH
-        topics = {}
-        async def process_topic(topic_name):
-            topic_path = Path(topics_dir) / topic_name
-            topic_progress = await asyncio.to_thread(check_progress_of_single_topic, topic_path)
-            if topic_progress:
-                topics[topic_name] = topic_progress
-
-        async def process_all_topics():
-            tasks = [process_topic(topic_name) for topic_name in os.listdir(topics_dir)]
-            await asyncio.gather(*tasks)
-
-        asyncio.run(process_all_topics())
+        updated = StatusStore().updated() if STATUS_DB.exists() else None
+        if updated is not None and time.time() - updated < STATUS_MAX_AGE:
+            # status_watcher.py läuft: nur den Schnappschuss lesen
+            topics = StatusStore().snapshot()
+            logging.info(f"Using job status snapshot from {time.time() - updated:.0f} seconds ago")
+        else:
+            topics = check_progress_of_all_topics(BASE_PATH)
         update_dashboard(topics)
-        logging.info("Finished checking progress of all jobs.")
+        logging.info("Finished checking progress of all jobs. File cache: %s, outputs: %s", file_cache.stats(), shared_reader.stats())
 
 Dashboard.check_progress_of_all_jobs()
 Dashboard.upload_file_and_start_calculation()
@@ -1,52 +1,184 @@
 import logging
 from pathlib import Path
 import datetime
-from shutil import copy2
+from shutil import copy2, rmtree
 import numpy as np
 from scipy.optimize import linear_sum_assignment
 import time
 import os
+import re
+import fcntl
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
+from db_index import DatabaseIndex
+from fingerprint import fingerprint, rmsd_lower_bound
+from file_cache import FileCache, shared_cache
+from blob_store import BlobStore, link_or_copy
+from initial_guess import INITIAL_GUESS_SETTINGS, InitialGuess
 
 BASE_PATH = Path(__file__).resolve().parent.parent
 
+# nprocs/maxcore werden pro Rechnung dimensioniert und gehören nicht zum Vergleichsschlüssel
+RESOURCE_SETTINGS = re.compile(r"%pal\s*nprocs\s*\d*\s*end|%maxcore\s*\d+", re.IGNORECASE)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def row_cost_batch(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Squared euclidean distances between the rows of A (n, N) and of every B[k] (K, m, N) -> (K, n, m)"""
+    cost = np.sum(A**2, axis=1)[None, :, None] + np.sum(B**2, axis=2)[:, None, :] - 2 * np.einsum("in,kjn->kij", A, B)
+    return np.maximum(cost, 0.0)
+
+
+def batch_assignment(D1: np.ndarray, atoms1, D2s: list, atoms2s: list, refinements: int = 5):
+    """Match one geometry against K geometries of the same formula in one vectorized pass.
+
+    All matrices are reordered by element first, so every geometry shares the same element
+    blocks and the cost matrices of a block can be built for all K entries at once. Atoms are
+    only permuted within their element. The first guess pairs similar sorted distance rows,
+    which is refined by comparing whole rows under the current assignment.
+
+    Returns the distance-matrix RMSD (K,), the assignment ``col_ind`` (K, N) in the original
+    atom order (candidate atom i <-> entry atom col_ind[k, i]) and the final cost (K,).
+    """
+    atoms1 = np.asarray(atoms1)
+    order1 = np.argsort(atoms1, kind="stable")
+    _, counts = np.unique(atoms1, return_counts=True)
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    blocks = [slice(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    A = np.asarray(D1)[np.ix_(order1, order1)]
+    orders2 = np.stack([np.argsort(np.asarray(atoms2), kind="stable") for atoms2 in atoms2s])
+    B = np.stack([np.asarray(D2)[np.ix_(order2, order2)] for D2, order2 in zip(D2s, orders2)])
+    K, N = B.shape[0], A.shape[0]
+
+    perm = np.empty((K, N), dtype=int)
+    SA = np.sort(A, axis=1)
+    SB = np.sort(B, axis=2)
+    for block in blocks:
+        cost = row_cost_batch(SA[block], SB[:, block])
+        for k in range(K):
+            r, c = linear_sum_assignment(cost[k])
+            perm[k, block.start + r] = block.start + c
+
+    total_cost = np.zeros(K)
+    active = np.arange(K)
+    for _ in range(refinements):
+        if active.size == 0:
+            break
+        B_cols = np.take_along_axis(B[active], perm[active][:, None, :], axis=2)
+        new_perm = perm[active].copy()
+        total_cost[active] = 0.0
+        for block in blocks:
+            cost = row_cost_batch(A[block], B_cols[:, block])
+            for n, k in enumerate(active):
+                r, c = linear_sum_assignment(cost[n])
+                new_perm[n, block.start + r] = block.start + c
+                total_cost[k] += cost[n][r, c].sum()
+        changed = np.any(new_perm != perm[active], axis=1)
+        perm[active] = new_perm
+        active = active[changed]
+
+    B_perm = np.take_along_axis(np.take_along_axis(B, perm[:, :, None], axis=1), perm[:, None, :], axis=2)
+    rmsd = np.sqrt(np.mean((A[None] - B_perm)**2, axis=(1, 2)))
+
+    col_ind = np.empty((K, N), dtype=int)
+    col_ind[:, order1] = np.take_along_axis(orders2, perm, axis=1)
+    return rmsd, col_ind, total_cost
+
+
+def compare_with_sidecars(D1: np.ndarray, atoms1: list, sidecars: list) -> list:
+    """RMSD and assignment of one geometry against database entries given by their ``.npy`` sidecars"""
+    atoms2s = [np.load(atoms_path) for _, atoms_path in sidecars]
+    same = [i for i, atoms2 in enumerate(atoms2s) if sorted(atoms2.tolist()) == sorted(atoms1)]
+    results = [(100.0, None)] * len(sidecars)
+    if same:
+        D2s = [np.load(sidecars[i][0], mmap_mode="r") for i in same]
+        rmsd, col_ind, _ = batch_assignment(D1, atoms1, D2s, [atoms2s[i] for i in same])
+        for n, i in enumerate(same):
+            results[i] = (float(rmsd[n]), col_ind[n])
+    return results
+
+
 class Database:
-    def __init__(self, dir: Path, file_cache) -> None:
+    def __init__(self, dir: Path, file_cache: FileCache = None) -> None:
         self.base = BASE_PATH / "database/"
         self.base.mkdir(parents=True, exist_ok=True)
+        self.calculations = BASE_PATH / "calculations"
+        self.blobs = BlobStore(self.base / ".blobs")
+        self.blob_ends = [".densities", ".cube", ".out", ".property.txt"]
         self.dir: Path = dir
         self.get_file_paths()
         self.rmsd_value = 0.001
+        self.fingerprint_tolerance = self.rmsd_value
+        self.closest: list = []
+        self.batch_size = 64
+        self.workers = None
+        self.parallel_threshold = 256
         self.ends = ["_out.out", ".out", ".densities", "_err.err", ".property.txt", ".bibtex", ".cube", ".densitiesinfo", ".sh", ".inp"]
-        self.file_cache = file_cache
+        self.file_cache = file_cache if file_cache is not None else shared_cache
+        self.index = DatabaseIndex.shared(BASE_PATH / "database.sqlite")
+        if self.index.is_empty() or self.index.outdated() or self.index.links_outdated():
+            # Nur ein Prozess baut den Katalog neu, die anderen finden ihn danach aktuell vor
+            with self.lock(".index"):
+                rebuilt = self.index.is_empty() or self.index.outdated()
+                if rebuilt:
+                    self.rebuild_index()
+                if rebuilt or self.index.links_outdated():
+                    self.rebuild_links()
 
     def get_file_paths(self):
         self.filename = self.dir.parent / f"{self.dir.stem}.xyz"
         self.header_filename = self.dir / f"{self.dir.stem}.inp"
 
     def get_filecontent(self) -> str:
-        if self.filename not in self.file_cache:
-            with self.filename.open("r") as f:
-                self.file_cache[self.filename] = f.read()
-        return self.file_cache[self.filename]
+        return self.file_cache.read_text(self.filename)
 
     def atoms_from_filecontent(self, content: str) -> list:
         lines = [line for line in content.splitlines() if line.strip()]
         return [line.split()[0] for line in lines[2:]]
 
+    def coords_from_filecontent(self, content: str) -> np.ndarray:
+        lines = [line for line in content.splitlines() if line.strip()]
+        return np.array([[float(x) for x in line.split()[1:4]] for line in lines[2:]]).reshape(-1, 3)
+
     def header_from_file(self) -> str:
-        if self.header_filename not in self.file_cache:
-            with self.header_filename.open("r") as f:
-                self.file_cache[self.header_filename] = "".join(line.strip() for line in f)
-        return self.file_cache[self.header_filename]
+        return self.file_cache.read_header(self.header_filename)
 
     def atoms_to_str(self, atoms: list) -> str:
         sorted_atoms = sorted(atom.upper() for atom in atoms)
         unique, counts = np.unique(sorted_atoms, return_counts=True)
         return "".join(f"{a}{c}" for a, c in zip(unique, counts))
 
+    def header_key(self, header: str) -> str:
+        """Canonical method header: everything before the coordinates, alphanumerics only.
+
+        Resource settings (``%pal nprocs``, ``%maxcore``) and the initial guess (``MORead``,
+        ``%moinp``) are dropped, they do not change the result.
+        """
+        header = RESOURCE_SETTINGS.sub("", header.split("*XYZfile")[0])
+        header = INITIAL_GUESS_SETTINGS.sub("", header)
+        return "".join(char for char in header.strip() if char.isalnum())
+
+    def catalog_key(self) -> tuple[str, str, int]:
+        atoms = self.atoms_from_filecontent(self.get_filecontent())
+        return self.atoms_to_str(atoms), self.header_key(self.header_from_file()), len(atoms)
+
+    def fingerprint_filter(self, candidate_xyz: str, rows: list, tolerance: float = None) -> list:
+        """Names of the catalog rows whose fingerprint allows an RMSD below the threshold"""
+        tolerance = self.fingerprint_tolerance if tolerance is None else max(tolerance, self.fingerprint_tolerance)
+        coords = self.coords_from_filecontent(candidate_xyz)
+        fp_hash, vector = fingerprint(coords)
+        kept = [
+            name for name, entry_hash, entry_vector in rows
+            if entry_vector is None or entry_hash == fp_hash
+            or rmsd_lower_bound(vector, entry_vector, len(coords)) <= tolerance
+        ]
+        logging.info("Fingerprint prefilter kept %d of %d database entries", len(kept), len(rows))
+        return kept
+
     def header_to_str(self, header: str) -> str:
         header_str = "".join(char for char in header.upper() if char.isalnum())
         return header_str[:55]
@@ -54,16 +186,19 @@ class Database:
     def date_to_str(self) -> str:
         return datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")[:-4]
 
+    def unique_id(self) -> str:
+        """Timestamp plus random part, so parallel submitters never pick the same name"""
+        return f"{self.date_to_str()}_{uuid.uuid4().hex[:8]}"
+
     def create_filename(self, atoms: list) -> tuple[Path, Path]:
         atoms_str = self.atoms_to_str(atoms)
-        date_str = self.date_to_str()
-        name = f"{atoms_str}_{date_str}"
+        name = f"{atoms_str}_{self.unique_id()}"
         dirpath = self.base / name
         filepath = dirpath / name
         return dirpath, filepath
 
     def get_database_names(self) -> list:
-        return [f.name for f in self.base.iterdir() if f.is_dir()]
+        return [f.name for f in self.base.iterdir() if f.is_dir() and not f.name.startswith(".")]
 
     def find_matches(self, current_name: str, database_names: list) -> list:
         name_parts = current_name.split("_")[:1]
@@ -73,13 +208,13 @@ class Database:
         diff = coords[:, None, :] - coords[None, :, :]
         return np.sqrt(np.sum(diff**2, axis=-1))
 
-    def match_distance_matrices(self, D1: np.ndarray, D2: np.ndarray):
-        cost_matrix = np.sum((D1[:, None, :] - D2[None, :, :])**2, axis=-1)
-        row_ind, col_ind = linear_sum_assignment(cost_matrix)
-        return row_ind, col_ind, cost_matrix
+    def match_distance_matrices(self, D1: np.ndarray, D2: np.ndarray, atoms1: list, atoms2: list):
+        """Assign the atoms of the second geometry to the first, only within the same element"""
+        _, col_ind, cost = batch_assignment(D1, atoms1, [D2], [atoms2])
+        return np.arange(len(D1)), col_ind[0], cost[0]
 
     def rmsd_of_distance_matrices(self, D1: np.ndarray, D2: np.ndarray, row_ind, col_ind) -> float:
-        D2_perm = D2[np.ix_(row_ind, col_ind)]
+        D2_perm = D2[np.ix_(col_ind, col_ind)]
         diff = D1 - D2_perm
         return np.sqrt(np.sum(diff**2) / D1.size)
 
@@ -99,10 +234,39 @@ class Database:
 
         D1 = self.compute_distance_matrix(coords1)
         D2 = self.compute_distance_matrix(coords2)
-        row_ind, col_ind, _ = self.match_distance_matrices(D1, D2)
+        row_ind, col_ind, _ = self.match_distance_matrices(D1, D2, atoms1, atoms2)
         # logging.info("Row indices: %s, Column indices: %s", row_ind, col_ind)
         return self.rmsd_of_distance_matrices(D1, D2, row_ind, col_ind), col_ind
 
+    def sidecar_paths(self, folder: str) -> tuple[Path, Path]:
+        entry = self.base / folder / folder
+        return Path(f"{entry}.dist.npy"), Path(f"{entry}.atoms.npy")
+
+    def write_sidecars(self, folder: str, content: str) -> None:
+        """Store distance matrix and element list of an entry next to its XYZ file"""
+        dist_path, atoms_path = self.sidecar_paths(folder)
+        np.save(dist_path, self.compute_distance_matrix(self.coords_from_filecontent(content)))
+        np.save(atoms_path, np.asarray(self.atoms_from_filecontent(content)))
+
+    def ensure_sidecars(self, folder: str) -> tuple[Path, Path]:
+        dist_path, atoms_path = self.sidecar_paths(folder)
+        if not (dist_path.exists() and atoms_path.exists()):
+            self.write_sidecars(folder, (self.base / folder / f"{folder}.xyz").read_text())
+        return dist_path, atoms_path
+
+    def rmsd_batch(self, candidate_xyz: str, folders: list) -> list:
+        """``rmsd`` of the candidate against many entries: parsed once, entries memory-mapped"""
+        atoms1 = self.atoms_from_filecontent(candidate_xyz)
+        D1 = self.compute_distance_matrix(self.coords_from_filecontent(candidate_xyz))
+        sidecars = [self.ensure_sidecars(folder) for folder in folders]
+        chunks = [sidecars[i:i + self.batch_size] for i in range(0, len(sidecars), self.batch_size)]
+        if self.workers and len(folders) >= self.parallel_threshold:
+            with ProcessPoolExecutor(self.workers) as pool:
+                parts = list(pool.map(compare_with_sidecars, repeat(D1), repeat(atoms1), chunks))
+        else:
+            parts = [compare_with_sidecars(D1, atoms1, chunk) for chunk in chunks]
+        return [result for part in parts for result in part]
+
     def right_fragmentation(self, header_str, col_ind):
         fragmentation = self.get_fragmentation(header_str)
         if col_ind is not None:
@@ -121,74 +285,103 @@ class Database:
         return sorted(fragments, key=lambda x: x.tolist())
 
     def molecule_exists(self, candidate_xyz: str, matched: list, header_str: str) -> tuple[list, bool]:
-        """Check if the molecule already exists in the database"""
+        """Check if the molecule already exists in the database.
+
+        ``self.closest`` keeps ``(folder, rmsd, col_ind)`` of all same-method entries with the
+        same fragmentation, closest first, for ``closest_guess``.
+        """
+        self.closest = []
         if not matched:
             return matched, False
         fragments = self.right_fragmentation(header_str, None)
-        header_header = "".join(char for char in header_str.split("*XYZfile")[0].strip() if char.isalnum())
+        header_header = self.header_key(header_str)
         def check_header(folder):
-            xyz_path = self.base / folder / f"{folder}.inp"
-            if xyz_path not in self.file_cache:
-                with xyz_path.open("r") as f:
-                    self.file_cache[xyz_path] = "".join(line.strip() for line in f)
-            content = self.file_cache[xyz_path]
-            output = "".join(char for char in content.split("*XYZfile")[0].strip() if char.isalnum())
-            print(output)
-            return output == header_header
-
-        def compute_rmsd_and_col(folder):
-            xyz_path = self.base / folder / f"{folder}.xyz"
-            if xyz_path not in self.file_cache:
-                with xyz_path.open("r") as f:
-                    self.file_cache[xyz_path] = f.read()
-            content = self.file_cache[xyz_path]
-            return self.rmsd(candidate_xyz, content)
+            content = self.file_cache.read_header(self.base / folder / f"{folder}.inp")
+            return self.header_key(content) == header_header
+
         matched = [folder for folder in matched if check_header(folder)]
         if not matched:
             return matched, False
-        results = [compute_rmsd_and_col(folder) for folder in matched]
+        results = self.rmsd_batch(candidate_xyz, matched)
         rmsd_list = np.array([result[0] for result in results], dtype=float)
         col_ind = [result[1] for result in results]
 
         def check_fragmentation(folder, col):
-            inp_path = self.base / folder / f"{folder}.inp"
-            if inp_path not in self.file_cache:
-                with inp_path.open("r") as f:
-                    self.file_cache[inp_path] = f.read()
-            content = self.file_cache[inp_path]
+            content = self.file_cache.read_header(self.base / folder / f"{folder}.inp")
             return self.right_fragmentation(content, col) == fragments
 
         fragmentation_matches = np.array([check_fragmentation(folder, col) for folder, col in zip(matched, col_ind)])
 
         new_matched = np.array(matched)[fragmentation_matches]
         new_rmsd_list = rmsd_list[fragmentation_matches]
+        new_col_ind = [col for col, match in zip(col_ind, fragmentation_matches) if match]
 
         sorted_indices = np.argsort(new_rmsd_list)
         matched = new_matched[sorted_indices].tolist()
         rmsd_list = new_rmsd_list[sorted_indices].tolist()
+        self.closest = [(folder, value, new_col_ind[i]) for folder, value, i in zip(matched, rmsd_list, sorted_indices)]
 
         exists = bool(rmsd_list) and min(rmsd_list) < self.rmsd_value
         return matched, exists
 
+    def closest_guess(self, tolerance: float):
+        """Closest finished entry from ``molecule_exists`` within ``tolerance`` that has a ``.gbw``"""
+        for folder, value, col_ind in self.closest:
+            if value >= tolerance:
+                break
+            gbw = self.base / folder / f"{folder}.gbw"
+            if col_ind is not None and gbw.exists() and self.is_finished(folder):
+                return InitialGuess(gbw, col_ind, value)
+        return None
+
+    @contextmanager
+    def lock(self, formula: str):
+        """Exclusive lock per formula, held across processes while checking and inserting"""
+        lock_dir = self.base / ".locks"
+        lock_dir.mkdir(exist_ok=True)
+        with open(lock_dir / f"{formula}.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
     def insert(self, dirpath: Path, filepath: Path) -> None:
-        dirpath.mkdir(parents=True, exist_ok=True)
-        filepath = Path(str(filepath.parent) + "/" + str(filepath.stem))
-        xyz_path = filepath.with_suffix(".xyz")
-        for end in self.ends:
-            out_path = Path(str(filepath) + end)
-            with os.fdopen(os.open(out_path, os.O_WRONLY | os.O_CREAT, 0o644), 'w') as file:
-                file.write("test")
-        self.header_filename.unlink()
-        copy2(self.filename, xyz_path)
-        self.create_symlink(xyz_path)
+        """Create the entry in a temporary folder and rename it into place.
+
+        The ``.inp`` placeholder already carries the candidate header, so a concurrent
+        submitter sees a comparable header as soon as the entry is catalogued.
+        """
+        key = self.catalog_key()
+        fp = fingerprint(self.coords_from_filecontent(self.get_filecontent()))
+        name = filepath.stem
+        tmp_dir = self.base / f".tmp-{dirpath.name}"
+        tmp_dir.mkdir(parents=True)
+        try:
+            for end in self.ends:
+                with os.fdopen(os.open(tmp_dir / f"{name}{end}", os.O_WRONLY | os.O_CREAT, 0o644), 'w') as file:
+                    file.write("test")
+            copy2(self.header_filename, tmp_dir / f"{name}.inp")
+            copy2(self.filename, tmp_dir / f"{name}.xyz")
+            os.rename(tmp_dir, dirpath)
+        except BaseException:
+            rmtree(tmp_dir, ignore_errors=True)
+            raise
+        xyz_path = dirpath / f"{name}.xyz"
+        self.write_sidecars(dirpath.name, self.get_filecontent())
+        with self.index.transaction():
+            self.index.add(dirpath.name, *key, *fp)
+            self.header_filename.unlink()
+            self.create_symlink(xyz_path)
 
     def create_symlink(self, out_path: Path) -> None:
         symlink_base = self.header_filename.parent / self.header_filename.stem
         for end in self.ends:
             symlink = Path(f"{symlink_base}{end}")
-            if symlink.exists():
+            if symlink.exists() or symlink.is_symlink():
                 symlink.unlink()
             symlink.symlink_to(Path(f"{out_path.parent}/{out_path.stem}{end}"))
+            self.index.add_link(symlink, out_path.parent.name, end)
 
     def file_end(self, filename: Path) -> str:
         for match in self.ends:
@@ -197,96 +390,296 @@ class Database:
         return
 
     @classmethod
-    def process_candidate(cls, dir: Path, file_cache) -> Path:
+    def process_candidate(cls, dir: Path, file_cache: FileCache = None) -> Path:
+        return cls.find_or_insert(dir, file_cache)[0]
+
+    @classmethod
+    def find_or_insert(cls, dir: Path, file_cache: FileCache = None, guess_tolerance: float = None) -> tuple[str, InitialGuess]:
+        """``process_candidate`` that also looks for an initial guess for new entries.
+
+        With ``guess_tolerance`` (RMSD) the closest finished same-method entry below it is
+        returned as ``InitialGuess`` and the new entry's XYZ is written in that entry's atom order.
+        """
         db = cls(dir, file_cache)
         candidate_xyz = db.get_filecontent()
         atoms = db.atoms_from_filecontent(candidate_xyz)
         header = db.header_from_file()
         new_dir, new_filepath = db.create_filename(atoms)
-        
-        database_names = db.get_database_names()
-        matched = db.find_matches(new_filepath.name, database_names)
-        matched, exists = db.molecule_exists(candidate_xyz, matched, header)    
-
-        if not exists:
-            db.insert(new_dir, new_filepath)
-            return str(new_filepath) + ".xyz"
-        else:
-            existing_folder = db.base / matched[0]
-            out_path = existing_folder / (matched[0] + ".out")
-            db.create_symlink(out_path)
-            return None
-
-    def add_calculation(self):
+        key = db.catalog_key()
+
+        with db.lock(key[0]):
+            rows = db.index.lookup_fingerprints(*key)
+            matched = db.fingerprint_filter(candidate_xyz, rows, guess_tolerance)
+            matched, exists = db.molecule_exists(candidate_xyz, matched, header)
+
+            if not exists:
+                guess = db.closest_guess(guess_tolerance) if guess_tolerance else None
+                db.insert(new_dir, new_filepath)
+                xyz_path = Path(f"{new_filepath}.xyz")
+                if guess is not None:
+                    if guess.reorder_xyz(xyz_path):
+                        db.write_sidecars(new_dir.name, xyz_path.read_text())
+                        logging.info(f"Reusing orbitals of {guess.gbw.stem} (RMSD {guess.rmsd:.4f}) for {new_dir.name}")
+                    else:
+                        guess = None
+                return str(xyz_path), guess
+            else:
+                existing_folder = db.base / matched[0]
+                out_path = existing_folder / (matched[0] + ".out")
+                with db.index.transaction():
+                    db.create_symlink(out_path)
+                return None, None
+
+    def add_calculation(self, link_mode: str = "copy") -> tuple[int, int]:
+        """Copy (or link, see ``link_or_copy``) a calculation into a new database entry.
+
+        Files in ``blob_ends`` are stored as blobs and symlinked into the entry.
+        Returns the number of files and bytes ingested.
+        """
         start_time = time.time()
         candidate_xyz = self.get_filecontent()
         atoms = self.atoms_from_filecontent(candidate_xyz)
-        header = self.header_from_file()
+        key = self.catalog_key()
+        fp = fingerprint(self.coords_from_filecontent(candidate_xyz))
         new_dir, new_filepath = self.create_filename(atoms)
-        new_dir.mkdir(parents=True, exist_ok=True)
-
-        for file in self.dir.iterdir():
-            end = self.file_end(file)
-            if end is not None:
-                destination = new_dir / new_filepath.stem
-                destination = Path(f"{destination}{end}")
-                copy2(file, destination)
-
-        destination = new_dir / new_filepath.stem
-        destination = destination.with_suffix(".xyz")
-        copy2(self.filename, destination)
-
-        destination = new_dir / new_filepath.stem
-        destination = destination.with_suffix(".inp")
-        copy2(self.header_filename, destination)
+        new_dir.mkdir(parents=True)
+        files, size = 0, 0
+        try:
+            for file in self.dir.iterdir():
+                end = self.file_end(file)
+                if end is not None:
+                    destination = new_dir / new_filepath.stem
+                    destination = Path(f"{destination}{end}")
+                    if end in self.blob_ends:
+                        self.blobs.store(file, destination)
+                    else:
+                        link_or_copy(file, destination, link_mode)
+                    files += 1
+                    size += file.stat().st_size
+
+            destination = new_dir / new_filepath.stem
+            destination = destination.with_suffix(".xyz")
+            copy2(self.filename, destination)
+            self.write_sidecars(new_dir.name, candidate_xyz)
+
+            destination = new_dir / new_filepath.stem
+            destination = destination.with_suffix(".inp")
+            if not destination.exists():
+                copy2(self.header_filename, destination)
+
+            # Katalogeintrag erst, wenn alle Dateien liegen; kurze Transaktion für parallele Worker
+            with self.index.transaction():
+                self.index.add(new_dir.name, *key, *fp)
+        except BaseException:
+            rmtree(new_dir, ignore_errors=True)
+            raise
 
         end_time = time.time()
         logging.info("Calculation files copied to database folder: %s", new_dir)
         logging.info("Time taken to add calculation: %.2f seconds", end_time - start_time)
+        return files, size
+
+    def store_artifacts(self, name: str) -> int:
+        """Move the artifacts of an entry into the blob store; the entry names keep resolving.
+
+        Files hardlinked to a blob by older versions are replaced by a symlink to it.
+        """
+        stored = 0
+        for end in self.blob_ends:
+            path = self.base / name / f"{name}{end}"
+            if path.is_symlink() or not path.is_file():
+                continue
+            self.blobs.store(path, path)
+            stored += 1
+        return stored
+
+    def compact(self) -> None:
+        """Store the artifacts of all finished entries as blobs and drop unreferenced blobs.
+
+        Entries still running are skipped, their placeholders are overwritten by the job.
+        """
+        start_time = time.time()
+        stored = sum(self.store_artifacts(name) for name in self.index.names() if self.is_finished(name))
+        self.blobs.prune(self.base)
+        logging.info("Stored %d artifacts as blobs in %.2f seconds", stored, time.time() - start_time)
+
+    def open_artifact(self, name: str, end: str, mode: str = "rb"):
+        return self.blobs.open(self.base / name / f"{name}{end}", mode)
+
+    def is_finished(self, name: str) -> bool:
+        out_path = self.base / name / f"{name}.out"
+        if not out_path.exists():
+            return False
+        with out_path.open("rb") as f:
+            f.seek(max(out_path.stat().st_size - 4096, 0))
+            return b"****ORCA TERMINATED NORMALLY****" in f.read()
+
+    def cluster_entries(self, names: list) -> list:
+        """Split same-key entries into clusters of duplicates, each as ``(keep, [duplicates])``.
+
+        The oldest entry of a cluster is kept. Every representative is compared once
+        against all entries not yet clustered.
+        """
+        remaining = sorted(names)
+        clusters = []
+        while remaining:
+            keep, remaining = remaining[0], remaining[1:]
+            if not remaining:
+                clusters.append((keep, []))
+                break
+            content = (self.base / keep / f"{keep}.xyz").read_text()
+            open_names = set(remaining)
+            rows = [row for row in self.index.lookup_fingerprints(*self.index.key_of(keep)) if row[0] in open_names]
+            candidates = self.fingerprint_filter(content, rows)
+            results = self.rmsd_batch(content, candidates) if candidates else []
+            duplicates = [name for name, (value, _) in zip(candidates, results) if value < self.rmsd_value]
+            clusters.append((keep, duplicates))
+            merged = set(duplicates)
+            remaining = [name for name in remaining if name not in merged]
+        return clusters
 
     def cleanup(self):
         start_time = time.time()
-        database_names = self.get_database_names()
-        for folder in self.base.iterdir():
+        merged = 0
+        for names in self.index.groups():
+            # Laufende Rechnungen schreiben noch in ihren Eintrag und werden nicht zusammengeführt
+            names = [name for name in names if self.is_finished(name)]
+            if len(names) < 2:
+                continue
             try:
-                matched = self.find_matches(folder.name, database_names)
-                if len(matched) > 1:
-                    xyz_files = [self.base / m / f"{m}.xyz" for m in matched if (self.base / m / f"{m}.xyz").exists()]
-                    if not (xyz_files[0].exists() and xyz_files[1].exists()):
-                        continue
-                    with xyz_files[0].open("r") as f:
-                        content0 = f.read()
-                    with xyz_files[1].open("r") as f:
-                        content1 = f.read()
-                    current_rmsd = self.rmsd(content0, content1)
-                    if current_rmsd < self.rmsd_value:
-                        self.syslink_merge(xyz_files[0], xyz_files[1])
-                        rm = self.base / matched[0]
-                        for file in rm.iterdir():
-                            file.unlink()
-                        rm.rmdir()
+                for keep, duplicates in self.cluster_entries(names):
+                    for duplicate in duplicates:
+                        self.syslink_merge(duplicate, keep)
+                        merged += 1
             except Exception as e:
-                logging.error("Error in folder %s: %s", folder.name, e)
+                logging.error("Error while cleaning up %s: %s", names[0], e)
         end_time = time.time()
+        logging.info("Merged %d duplicate entries", merged)
         logging.info("Time taken to clean up: %.2f seconds", end_time - start_time)
 
-    def syslink_merge(self, original: Path, merged: Path):
-        for folder in BASE_PATH.iterdir():
-            if folder.is_dir():
-                for subfolder in folder.iterdir():
-                    if subfolder.is_dir() and any(file.suffix == ".xyz" for file in folder.iterdir()):
-                        for file in subfolder.iterdir():
-                            if file.is_symlink() and file.resolve() == original:
-                                file.unlink()
-                                file.symlink_to(merged)
-
-    def copy_to_db(self):
+    def syslink_merge(self, original: str, merged: str):
+        """Point every symlink of entry ``original`` at ``merged`` and delete ``original``.
+
+        If the index has no links to ``original`` the calculations are scanned for them,
+        so deleting it never leaves a symlink dangling.
+        """
+        links = self.index.links_to(original)
+        if not links:
+            links = [(link, end) for link, entry, end in self.scan_links() if entry == original]
+        with self.index.transaction():
+            for link, end in links:
+                if link.is_symlink():
+                    link.unlink()
+                    link.symlink_to(self.base / merged / f"{merged}{end}")
+                self.index.add_link(link, merged, end)
+            self.index.retarget_links(original, merged)
+            self.index.remove(original)
+            rmtree(self.base / original)
+
+    def calculation_folders(self):
+        """Job folders below calculations/<topic>/<structure>/ that are not in the database yet"""
+        for topic in self.calculations.iterdir():
+            if not topic.is_dir():
+                continue
+            for folder in topic.iterdir():
+                if folder.is_dir() and any(file.suffix == ".xyz" for file in folder.iterdir()):
+                    for subfolder in folder.iterdir():
+                        if subfolder.is_dir() and not self.is_catalogued(subfolder):
+                            yield subfolder
+
+    def copy_to_db(self, link_mode: str = "auto", workers: int = 8):
+        """Ingest all finished calculations, one worker per job folder.
+
+        Large artifacts go to the blob store. With ``link_mode="auto"`` the remaining files
+        are reflinked where the filesystem supports it and copied otherwise; hardlinks
+        (``link_mode="hardlink"``) share the inode with the calculation folder.
+        """
         start_time = time.time()
-        for folder in BASE_PATH.iterdir():
-            if folder.is_dir():
-                for subfolder in folder.iterdir():
-                    if subfolder.is_dir() and any(file.suffix == ".xyz" for file in folder.iterdir()):
-                        Database(subfolder).add_calculation()
+
+        def ingest(subfolder):
+            return Database(subfolder, self.file_cache).add_calculation(link_mode)
+
+        files, size = 0, 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(ingest, subfolder): subfolder for subfolder in self.calculation_folders()}
+            for future in as_completed(futures):
+                try:
+                    n, nbytes = future.result()
+                    files += n
+                    size += nbytes
+                except Exception as e:
+                    logging.error("Error while ingesting %s: %s", futures[future], e)
+        elapsed = max(time.time() - start_time, 1e-9)
+        logging.info(
+            "Ingested %d files (%.2f GB) in %.2f seconds: %.1f files/s, %.3f GB/s",
+            files, size / 1024**3, elapsed, files / elapsed, size / 1024**3 / elapsed,
+        )
         self.cleanup()
+        self.compact()
         end_time = time.time()
         logging.info("Time taken to copy to database: %.2f seconds", end_time - start_time)
+
+    def is_catalogued(self, folder: Path) -> bool:
+        """True if the calculation in ``folder`` already points into an indexed database entry"""
+        out_path = folder / f"{folder.name}.out"
+        if not out_path.is_symlink():
+            return False
+        # nur eine Ebene auflösen, der Eintrag selbst verweist ggf. weiter in den Blob-Speicher
+        return self.index.contains(Path(os.readlink(out_path)).parent.name)
+
+    def read_entry(self, folder: Path):
+        xyz_path = folder / f"{folder.name}.xyz"
+        inp_path = folder / f"{folder.name}.inp"
+        if not (xyz_path.exists() and inp_path.exists()):
+            return None
+        content = xyz_path.read_text()
+        atoms = self.atoms_from_filecontent(content)
+        with inp_path.open("r") as f:
+            header = "".join(line.strip() for line in f)
+        fp_hash, fp_vector = fingerprint(self.coords_from_filecontent(content))
+        return self.atoms_to_str(atoms), self.header_key(header), len(atoms), fp_hash, fp_vector
+
+    def rebuild_index(self) -> int:
+        return self.index.rebuild(self.base, self.read_entry)
+
+    def scan_links(self):
+        """All symlinks below calculations/ that point into a database entry"""
+        base = self.base.resolve()
+        for root, dirs, files in os.walk(self.calculations):
+            for file in files:
+                link = Path(root) / file
+                if not link.is_symlink():
+                    continue
+                target = Path(os.readlink(link))
+                if target.parent.parent.resolve() != base:
+                    continue
+                entry = target.parent.name
+                if target.name.startswith(entry):
+                    yield link, entry, target.name[len(entry):]
+
+    def rebuild_links(self) -> int:
+        return self.index.rebuild_links(self.scan_links())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintenance of the calculation database")
+    parser.add_argument("--rebuild-index", action="store_true", help="re-create database.sqlite from database/ and calculations/")
+    parser.add_argument("--cleanup", action="store_true", help="merge duplicate database entries")
+    parser.add_argument("--copy-to-db", action="store_true", help="ingest finished calculations (runs cleanup and compact afterwards)")
+    parser.add_argument("--compact", action="store_true", help="move artifacts of finished entries into the blob store")
+    parser.add_argument("--link-mode", default="auto", choices=["auto", "hardlink", "reflink", "copy"],
+                        help="auto: reflink, else copy; hardlink shares the files with calculations/")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    db = Database(BASE_PATH)
+    if args.rebuild_index:
+        db.rebuild_index()
+        db.rebuild_links()
+    if args.copy_to_db:
+        db.copy_to_db(args.link_mode, args.workers)
+    elif args.cleanup:
+        db.cleanup()
+    if args.compact and not args.copy_to_db:
+        db.compact()
@@ -0,0 +1,210 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class DatabaseIndex:
+    """SQLite catalog of the database entries.
+
+    Entries are keyed by formula string, canonical method header and atom count so
+    that duplicate lookups are a single indexed query instead of a directory scan.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            name TEXT PRIMARY KEY,
+            formula TEXT NOT NULL,
+            header TEXT NOT NULL,
+            atom_count INTEGER NOT NULL,
+            created FLOAT,
+            fp_hash TEXT,
+            fp_vector BLOB
+        );
+        CREATE INDEX IF NOT EXISTS entries_lookup ON entries (formula, header, atom_count);
+        CREATE TABLE IF NOT EXISTS links (
+            link TEXT PRIMARY KEY,
+            entry TEXT NOT NULL,
+            end TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS links_entry ON links (entry);
+        CREATE TABLE IF NOT EXISTS meta (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+    """
+    COLUMNS = {"fp_hash": "TEXT", "fp_vector": "BLOB"}
+    # Version of the header key format; a catalog built with an older one is rebuilt
+    KEY_VERSION = 3
+    # Version of the reverse symlink index; older or never built ones are rescanned
+    LINKS_VERSION = 1
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.RLock()
+        # Threads share the connection, ``self.lock`` keeps them from using it at the same time
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.migrate()
+        self.conn.commit()
+        self.inode = os.stat(self.path).st_ino
+
+    @classmethod
+    def shared(cls, path: Path) -> "DatabaseIndex":
+        """The index of ``path`` for this process; reopened after a fork or if the file was replaced"""
+        key = (os.getpid(), str(Path(path).resolve()))
+        with cls._shared_lock:
+            index = cls._shared.get(key)
+            try:
+                valid = index is not None and os.stat(index.path).st_ino == index.inode
+            except FileNotFoundError:
+                valid = False
+            if not valid:
+                index = cls._shared[key] = cls(path)
+            return index
+
+    def migrate(self) -> None:
+        """Add columns introduced after the catalog file was created"""
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(entries)")}
+        for column, kind in self.COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE entries ADD COLUMN {column} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS entries_fp_hash ON entries (fp_hash)")
+
+    def execute(self, sql: str, parameters=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, parameters).fetchall()
+
+    def outdated(self) -> bool:
+        return self.execute("PRAGMA user_version")[0][0] < self.KEY_VERSION
+
+    def links_outdated(self) -> bool:
+        rows = self.execute("SELECT version FROM meta WHERE name = 'links'")
+        return not rows or rows[0][0] < self.LINKS_VERSION
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything done inside the block, or nothing if it raises.
+
+        Other threads of the process wait until the block is done.
+        """
+        with self.lock:
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            else:
+                self.conn.commit()
+
+    def add(self, name: str, formula: str, header: str, atom_count: int, fp_hash: str = None, fp_vector: np.ndarray = None) -> None:
+        blob = None if fp_vector is None else np.asarray(fp_vector, dtype=np.float64).tobytes()
+        self.execute(
+            "INSERT OR REPLACE INTO entries (name, formula, header, atom_count, created, fp_hash, fp_vector) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, formula, header, atom_count, time.time(), fp_hash, blob),
+        )
+
+    def remove(self, name: str) -> None:
+        self.execute("DELETE FROM entries WHERE name = ?", (name,))
+
+    def contains(self, name: str) -> bool:
+        return bool(self.execute("SELECT 1 FROM entries WHERE name = ?", (name,)))
+
+    def is_empty(self) -> bool:
+        return not self.execute("SELECT 1 FROM entries LIMIT 1")
+
+    def lookup(self, formula: str, header: str, atom_count: int) -> list:
+        rows = self.execute(
+            "SELECT name FROM entries WHERE formula = ? AND header = ? AND atom_count = ? ORDER BY name",
+            (formula, header, atom_count),
+        )
+        return [row[0] for row in rows]
+
+    def lookup_fingerprints(self, formula: str, header: str, atom_count: int) -> list:
+        """Like ``lookup`` but returns ``(name, fp_hash, fp_vector)``; the fingerprint may be ``None``"""
+        rows = self.execute(
+            "SELECT name, fp_hash, fp_vector FROM entries WHERE formula = ? AND header = ? AND atom_count = ? ORDER BY name",
+            (formula, header, atom_count),
+        )
+        return [
+            (name, fp_hash, None if blob is None else np.frombuffer(blob, dtype=np.float64))
+            for name, fp_hash, blob in rows
+        ]
+
+    def key_of(self, name: str):
+        """``(formula, header, atom_count)`` of an entry, or ``None`` if it is not catalogued"""
+        rows = self.execute("SELECT formula, header, atom_count FROM entries WHERE name = ?", (name,))
+        return tuple(rows[0]) if rows else None
+
+    def groups(self) -> list:
+        """Names of all entries sharing formula, header and atom count, for keys with more than one entry"""
+        rows = self.execute(
+            "SELECT group_concat(name, char(10)) FROM entries "
+            "GROUP BY formula, header, atom_count HAVING count(*) > 1"
+        )
+        return [sorted(row[0].split("\n")) for row in rows]
+
+    def add_link(self, link: Path, entry: str, end: str) -> None:
+        """Record that the symlink ``link`` points at file ``end`` of database entry ``entry``"""
+        self.execute("INSERT OR REPLACE INTO links (link, entry, end) VALUES (?, ?, ?)", (str(link), entry, end))
+
+    def links_to(self, entry: str) -> list:
+        rows = self.execute("SELECT link, end FROM links WHERE entry = ?", (entry,))
+        return [(Path(link), end) for link, end in rows]
+
+    def retarget_links(self, entry: str, new_entry: str) -> None:
+        self.execute("UPDATE links SET entry = ? WHERE entry = ?", (new_entry, entry))
+
+    def rebuild_links(self, links) -> int:
+        """Replace the reverse symlink index with ``links``, an iterable of ``(link, entry, end)``"""
+        count = 0
+        with self.transaction():
+            self.conn.execute("DELETE FROM links")
+            for link, entry, end in links:
+                self.add_link(link, entry, end)
+                count += 1
+            self.conn.execute("INSERT OR REPLACE INTO meta (name, version) VALUES ('links', ?)", (self.LINKS_VERSION,))
+        logging.info("Indexed %d symlinks into the database", count)
+        return count
+
+    def names(self) -> list:
+        return [row[0] for row in self.execute("SELECT name FROM entries ORDER BY name")]
+
+    def rebuild(self, base: Path, read_entry) -> int:
+        """Re-create the catalog from the entry folders below ``base``.
+
+        ``read_entry(folder)`` returns the arguments of ``add`` after the name, or ``None``
+        for folders that are not complete database entries.
+        """
+        start_time = time.time()
+        count = 0
+        with self.transaction():
+            self.conn.execute("DELETE FROM entries")
+            for folder in Path(base).iterdir():
+                if not folder.is_dir() or folder.name.startswith("."):
+                    continue
+                try:
+                    key = read_entry(folder)
+                except Exception as e:
+                    logging.error("Could not index %s: %s", folder.name, e)
+                    continue
+                if key is None:
+                    continue
+                self.add(folder.name, *key)
+                count += 1
+            self.conn.execute(f"PRAGMA user_version = {self.KEY_VERSION}")
+        logging.info("Indexed %d database entries in %.2f seconds", count, time.time() - start_time)
+        return count
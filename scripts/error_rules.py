@@ -0,0 +1,101 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Regeln für NAME_err.err: (Regex, Ergebnis). Die erste passende Regel der Tabelle gewinnt,
+# egal wo in der Datei sie steht. Neue ORCA-Fehler einfach an passender Stelle eintragen.
+ERROR_RULES = [
+    (r"multiplicity", "multiplicity"),
+    (r"OUT OF MEMORY ERROR!", "memory"),
+    (r"Segmentation fault", "Seg fault"),
+    (r"Wrong syntax in xyz coordinates", "Syntax"),
+    (r"Tool-Scanner", "Scanner"),
+    (r"CANCELLED AT", "CANCELLED"),
+    (r"mpirun noticed that process", "mpirun"),
+    (r"CalcSigma", "CalcSigma"),
+    (r"out of memory", "memory"),
+    (r"CANCELLED", "CANCELLED"),
+    (r"aborting the run", "aborted"),
+]
+
+# Regeln für NAME_out.out (Slurm/seff); ``(?P<value>...)`` liefert zusätzlich einen Wert
+SLURM_RULES = [
+    (r"DUE TO TIME LIMIT", "Failed: Time Limit"),
+    (r"CANCELLED", "Cancelled"),
+    (r"CPU Utilized:(?P<value>[^\n]*)", "runtime"),
+]
+
+
+class RuleSet:
+    """Eine Regeltabelle, kompiliert zu einer einzigen Regex, die die Datei einmal durchläuft.
+
+    Jede Regel steht in einem Lookahead, so werden auch überlappende Treffer gefunden und das
+    Ergebnis ist dasselbe wie bei einzelnen ``in``-Abfragen in Tabellenreihenfolge. Gelesen wird
+    in zeilenweise abgeschnittenen Blöcken (Regeln gehen nie über ein Zeilenende), das Ergebnis
+    wird pro Pfad mit ``(mtime, size)`` zwischengespeichert, für höchstens ``max_entries`` Pfade
+    (die am längsten nicht gefragten fallen heraus).
+    """
+
+    def __init__(self, rules: list, chunk_size: int = 4 * 1024**2, max_entries: int = 20000) -> None:
+        self.rules = list(rules)
+        self.chunk_size = chunk_size
+        self.max_entries = max_entries
+        parts = []
+        for i, (pattern, _) in enumerate(self.rules):
+            pattern = pattern.replace("(?P<value>", f"(?P<v{i}>")
+            parts.append(f"(?P<r{i}>{pattern})")
+        self.regex = re.compile(f"(?=(?:{'|'.join(parts)}))".encode())
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def scan(self, data: bytes, best):
+        """Beste Regel (Index, Wert) in ``data`` unter Berücksichtigung des bisher besten Treffers"""
+        for match in self.regex.finditer(data):
+            # r{i} umschließt ein v{i} und wird als letzte Gruppe geschlossen
+            i = int(match.lastgroup[1:])
+            if best is None or i < best[0]:
+                value = match.groupdict().get(f"v{i}")
+                best = (i, value.decode(errors="replace") if value is not None else None)
+                if i == 0:
+                    break
+        return best
+
+    def match_file(self, path):
+        best = None
+        rest = b""
+        with open(path, "rb") as f:
+            while best is None or best[0] > 0:
+                data = f.read(self.chunk_size)
+                if not data:
+                    if rest:
+                        best = self.scan(rest, best)
+                    break
+                data = rest + data
+                cut = data.rfind(b"\n") + 1
+                data, rest = data[:cut], data[cut:]
+                best = self.scan(data, best)
+        return best
+
+    def classify(self, path):
+        """``(Ergebnis, Wert)`` der ersten passenden Regel oder ``None``"""
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = str(path)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                self.cache.move_to_end(key)
+                return cached[1]
+        best = self.match_file(path)
+        result = (self.rules[best[0]][1], best[1]) if best is not None else None
+        with self.lock:
+            self.cache[key] = (stamp, result)
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return result
+
+
+error_rules = RuleSet(ERROR_RULES)
+slurm_rules = RuleSet(SLURM_RULES)
@@ -0,0 +1,88 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def read_text(path: Path) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def read_header(path: Path) -> str:
+    """Inhalt einer .inp-Datei ohne Zeilenumbrüche und Einrückung, wie ihn Database vergleicht"""
+    with open(path, "r") as f:
+        return "".join(line.strip() for line in f)
+
+
+class FileCache:
+    """LRU cache for file contents with a byte budget.
+
+    Every hit is validated against ``(mtime, size)`` of the file, so rewritten files are
+    reloaded instead of served stale. The budget is counted in bytes on disk.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024**2) -> None:
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, loader=read_text, kind: str = "text"):
+        """Return ``loader(path)``, cached per ``(path, kind)`` until the file changes"""
+        stat = os.stat(path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = (str(path), kind)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = loader(path)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[0][1]
+            if stat.st_size <= self.max_bytes:
+                self.entries[key] = (stamp, value)
+                self.bytes += stat.st_size
+                while self.bytes > self.max_bytes:
+                    _, (evicted_stamp, _) = self.entries.popitem(last=False)
+                    self.bytes -= evicted_stamp[1]
+                    self.evictions += 1
+        return value
+
+    def read_text(self, path) -> str:
+        return self.get(path)
+
+    def read_header(self, path) -> str:
+        return self.get(path, read_header, "header")
+
+    def invalidate(self, path) -> None:
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == str(path)]:
+                self.bytes -= self.entries.pop(key)[0][1]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+shared_cache = FileCache(int(os.environ.get("ORCA_LED_FILE_CACHE_MB", 256)) * 1024**2)
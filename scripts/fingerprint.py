@@ -0,0 +1,52 @@
+import hashlib
+import numpy as np
+
+BLOCKS = 32
+
+
+def distance_spectrum(coords: np.ndarray) -> np.ndarray:
+    """Sorted interatomic distances (upper triangle), invariant to rotation and atom order"""
+    coords = np.asarray(coords, dtype=float)
+    diff = coords[:, None, :] - coords[None, :, :]
+    distances = np.sqrt(np.sum(diff**2, axis=-1))
+    return np.sort(distances[np.triu_indices(len(coords), k=1)])
+
+
+def block_sizes(atom_count: int, blocks: int = BLOCKS) -> np.ndarray:
+    """Sizes of the contiguous spectrum blocks, identical to ``np.array_split``"""
+    pairs = atom_count * (atom_count - 1) // 2
+    blocks = min(blocks, pairs)
+    if blocks == 0:
+        return np.zeros(0, dtype=int)
+    sizes = np.full(blocks, pairs // blocks, dtype=int)
+    sizes[:pairs % blocks] += 1
+    return sizes
+
+
+def fingerprint(coords: np.ndarray, blocks: int = BLOCKS) -> tuple[str, np.ndarray]:
+    """Quantized hash and coarse vector (block means of the distance spectrum)"""
+    spectrum = distance_spectrum(coords)
+    sizes = block_sizes(len(coords), blocks)
+    if sizes.size == 0:
+        vector = np.zeros(0)
+    else:
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        vector = np.add.reduceat(spectrum, starts) / sizes
+    quantized = np.round(vector, 3) + 0.0
+    fp_hash = hashlib.sha1(quantized.tobytes()).hexdigest()
+    return fp_hash, vector
+
+
+def rmsd_lower_bound(vector1: np.ndarray, vector2: np.ndarray, atom_count: int) -> float:
+    """Lower bound of the distance-matrix RMSD of two geometries from their coarse vectors.
+
+    Sorting both distance lists gives the smallest possible squared difference over all
+    atom permutations, and by Cauchy-Schwarz a block of ``L`` sorted distances differs by
+    at least ``L * (mean1 - mean2)**2``. Pruning entries whose bound exceeds the RMSD
+    threshold therefore never drops a true duplicate.
+    """
+    if atom_count == 0 or len(vector1) != len(vector2):
+        return 0.0
+    sizes = block_sizes(atom_count, len(vector1))
+    squared = np.sum(sizes * (np.asarray(vector1) - np.asarray(vector2))**2)
+    return float(np.sqrt(2 * squared / atom_count**2))
@@ -0,0 +1,106 @@
+import logging
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+from molecule import Molecule
+
+# Kovalenzradien in Å (Cordero et al. 2008), unbekannte Elemente bekommen DEFAULT_RADIUS
+COVALENT_RADII = {
+    "H": 0.31, "He": 0.28, "Li": 1.28, "Be": 0.96, "B": 0.84, "C": 0.76, "N": 0.71, "O": 0.66, "F": 0.57,
+    "Ne": 0.58, "Na": 1.66, "Mg": 1.41, "Al": 1.21, "Si": 1.11, "P": 1.07, "S": 1.05, "Cl": 1.02, "Ar": 1.06,
+    "K": 2.03, "Ca": 1.76, "Fe": 1.32, "Co": 1.26, "Ni": 1.24, "Cu": 1.32, "Zn": 1.22, "Ga": 1.22, "Ge": 1.20,
+    "As": 1.19, "Se": 1.20, "Br": 1.20, "Kr": 1.16, "Rb": 2.20, "Sr": 1.95, "Ag": 1.45, "Cd": 1.44, "In": 1.42,
+    "Sn": 1.39, "Sb": 1.39, "Te": 1.38, "I": 1.39, "Xe": 1.40, "Cs": 2.44, "Ba": 2.15, "Pt": 1.36, "Au": 1.36,
+    "Hg": 1.32, "Pb": 1.46, "Bi": 1.48,
+}
+DEFAULT_RADIUS = 1.5
+STRATEGIES = ("connectivity", "shell", "nearest", "count")
+
+
+class Fragmenter:
+    """Zerlegt eine Struktur über KD-Baum-Nachbarsuche in Ligand und Umgebung.
+
+    Fragmente sind die Zusammenhangskomponenten des Bindungsgraphen (Abstand kleiner als
+    ``bond_scale`` mal die Summe der Kovalenzradien). Ligand ist das Fragment mit dem Atom,
+    das dem Mittelpunkt am nächsten liegt. Welche übrigen Fragmente in die Rechnung kommen,
+    bestimmt ``strategy``:
+
+    - ``connectivity``: alle (wie ``Mol.get_fragments``)
+    - ``shell``: erste Schale, mindestens ein Atom näher als ``cutoff`` Å am Liganden
+    - ``nearest``: die ``k`` Fragmente mit dem kleinsten Atomabstand zum Liganden
+    - ``count``: alle, zusammengefasst zu ``count`` räumlichen Gruppen
+
+    ``count`` lässt sich auch mit ``shell`` und ``nearest`` kombinieren.
+    """
+
+    def __init__(self, strategy: str = "connectivity", cutoff: float = 4.0, k: int = 6, count: int = None, bond_scale: float = 1.2) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown fragmentation strategy {strategy}, expected one of {', '.join(STRATEGIES)}")
+        if strategy == "count" and not count:
+            raise ValueError("The count strategy needs count")
+        self.strategy = strategy
+        self.cutoff = cutoff
+        self.k = k
+        self.count = count
+        self.bond_scale = bond_scale
+
+    def connected_fragments(self, molecule: Molecule) -> tuple[np.ndarray, int]:
+        """Fragmentnummer pro Atom und Anzahl der Fragmente"""
+        radii = np.array([COVALENT_RADII.get(element, DEFAULT_RADIUS) for element in molecule.elements])
+        tree = cKDTree(molecule.coords)
+        pairs = tree.query_pairs(self.bond_scale * 2 * radii.max(), output_type="ndarray")
+        if len(pairs):
+            distances = np.linalg.norm(molecule.coords[pairs[:, 0]] - molecule.coords[pairs[:, 1]], axis=1)
+            pairs = pairs[distances < self.bond_scale * (radii[pairs[:, 0]] + radii[pairs[:, 1]])]
+        graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(len(molecule), len(molecule)))
+        count, labels = connected_components(graph, directed=False)
+        return labels, count
+
+    def partition(self, molecule: Molecule) -> list[np.ndarray]:
+        """Atomindizes (0-basiert) der Fragmente; das erste ist der Ligand"""
+        labels, count = self.connected_fragments(molecule)
+        order = np.argsort(labels, kind="stable")
+        fragments = np.split(order, np.flatnonzero(np.diff(labels[order])) + 1)
+        ligand = labels[molecule.closest_to_centroid()]
+
+        # kleinster Abstand jedes Fragments zum Liganden
+        distance, _ = cKDTree(molecule.coords[fragments[ligand]]).query(molecule.coords)
+        fragment_distance = np.full(count, np.inf)
+        np.minimum.at(fragment_distance, labels, distance)
+        fragment_distance[ligand] = np.inf
+
+        environment = np.argsort(fragment_distance, kind="stable")[:count - 1]
+        if self.strategy == "shell":
+            environment = environment[fragment_distance[environment] <= self.cutoff]
+        elif self.strategy == "nearest":
+            environment = environment[:self.k]
+        environment = np.sort(environment)
+        groups = [fragments[j] for j in environment]
+        if self.count and len(groups) > self.count:
+            groups = self.group(molecule, groups)
+        logging.info(f"Fragmentation ({self.strategy}): ligand with {len(fragments[ligand])} atoms, {len(groups)} of {count - 1} environment fragments")
+        return [fragments[ligand]] + groups
+
+    def group(self, molecule: Molecule, fragments: list[np.ndarray]) -> list[np.ndarray]:
+        """Fragmente zu ``count`` räumlichen Gruppen zusammenfassen (Startpunkte maximal weit auseinander)"""
+        centroids = np.array([molecule.coords[fragment].mean(axis=0) for fragment in fragments])
+        seeds = [0]
+        distance = np.linalg.norm(centroids - centroids[0], axis=1)
+        for _ in range(self.count - 1):
+            seeds.append(int(np.argmax(distance)))
+            distance = np.minimum(distance, np.linalg.norm(centroids - centroids[seeds[-1]], axis=1))
+        _, assignment = cKDTree(centroids[seeds]).query(centroids)
+        return [np.sort(np.concatenate([fragments[i] for i in np.flatnonzero(assignment == j)])) for j in range(self.count)]
+
+    @staticmethod
+    def fragment_string(fragments: list[np.ndarray]) -> str:
+        """Format von ``parse_fragments``: Ligand ``#`` Umgebung, Fragmente mit ``,``, Atome 1-basiert"""
+        parts = [" ".join(map(str, np.asarray(fragment) + 1)) for fragment in fragments]
+        return parts[0] + ("#" + ",".join(parts[1:]) if len(parts) > 1 else "")
+
+    @staticmethod
+    def trim(fragments: list[np.ndarray]) -> tuple[np.ndarray, list[np.ndarray]]:
+        """Nur die Atome der Fragmente behalten: (behaltene Indizes, Fragmente in neuer Nummerierung)"""
+        kept = np.sort(np.concatenate(fragments))
+        return kept, [np.searchsorted(kept, fragment) for fragment in fragments]
@@ -0,0 +1,47 @@
+import logging
+import re
+from pathlib import Path
+import numpy as np
+from molecule import Molecule
+
+# MORead-Zeilen einer Startvermutung, die der Header-Key ignoriert
+INITIAL_GUESS_SETTINGS = re.compile(r"%moinp\s*\"[^\"]*\"|\bMORead\b", re.IGNORECASE)
+
+
+class InitialGuess:
+    """Orbitale (``.gbw``) eines fast gleichen Datenbankeintrags als Startvermutung.
+
+    ``col_ind`` ist die Atomzuordnung aus ``Database.rmsd``: Atom ``i`` des Kandidaten
+    entspricht Atom ``col_ind[i]`` des Eintrags. ORCA liest die Orbitale in der Atomreihenfolge
+    des Eintrags, deshalb werden Koordinaten und Fragmentzeilen der neuen Rechnung in diese
+    Reihenfolge gebracht.
+    """
+
+    def __init__(self, gbw: Path, col_ind, rmsd: float) -> None:
+        self.gbw = Path(gbw)
+        self.col_ind = np.asarray(col_ind, dtype=int)
+        self.rmsd = rmsd
+
+    def reorder(self, molecule: Molecule) -> Molecule:
+        order = np.empty_like(self.col_ind)
+        order[self.col_ind] = np.arange(len(self.col_ind))
+        return molecule.subset(order)
+
+    def reorder_xyz(self, path: Path) -> bool:
+        """XYZ-Datei in der Atomreihenfolge des Eintrags neu schreiben; ``False``, wenn die Zuordnung nicht passt"""
+        molecule = Molecule.from_xyz(path)
+        if len(molecule) != len(self.col_ind):
+            logging.warning(f"Atom mapping for {path} covers {len(self.col_ind)} of {len(molecule)} atoms, not reusing {self.gbw.name}")
+            return False
+        self.reorder(molecule).write_xyz(path, f"Atom order of {self.gbw.stem}")
+        return True
+
+    def remap_fragment_line(self, fragment_line: list[str]) -> list[str]:
+        """``  i {a b c} end`` der %geom-Fragmente auf die neue Atomreihenfolge umschreiben"""
+        def remap(match):
+            return "{" + " ".join(str(self.col_ind[int(atom)]) for atom in match.group(1).split()) + "}"
+        return [re.sub(r"\{([^}]*)\}", remap, line) for line in fragment_line]
+
+    def header(self, header: str) -> str:
+        header = INITIAL_GUESS_SETTINGS.sub("", header)
+        return f"! MORead\n%moinp \"{self.gbw}\"\n\n{header}"
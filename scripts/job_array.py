@@ -0,0 +1,122 @@
+import logging
+import os
+import re
+import shlex
+import subprocess
+import time
+import uuid
+from pathlib import Path
+import database
+
+# Befehl für sbatch, z.B. ORCA_LED_SBATCH="ssh login sbatch" oder ein Stub für Tests
+SBATCH = os.environ.get("ORCA_LED_SBATCH", "sbatch")
+ORCA = "/opt/bwhpc/common/chem/orca/6.0.1_shared_openmpi-4.1.6_avx2/orca"
+
+
+class JobArray:
+    """Gleich dimensionierte Rechnungen (nprocs, mem, time), die als ein Slurm-Job-Array laufen"""
+
+    def __init__(self, nprocs: int, mem: int, time: str) -> None:
+        self.nprocs = nprocs
+        self.mem = mem
+        self.time = time
+        self.paths: list[str] = []
+
+    @property
+    def name(self) -> str:
+        return f"n{self.nprocs}_m{self.mem}_t{self.time.replace(':', '')}"
+
+    def create_sh_script_content(self, folder: Path, manifest: Path, count: int, max_parallel: int = None) -> str:
+        throttle = f"%{max_parallel}" if max_parallel else ""
+        return f"""#!/bin/bash
+#SBATCH --nodes=1
+#SBATCH --mem={self.mem}gb
+#SBATCH --ntasks-per-node={self.nprocs}
+#SBATCH --time={self.time}
+#SBATCH --array=1-{count}{throttle}
+#SBATCH --output={folder}/%a_out.out
+#SBATCH --error={folder}/%a_err.err
+
+# Zeile SLURM_ARRAY_TASK_ID des Manifests: Datenbankeintrag ohne Endung
+path=$(sed -n "${{SLURM_ARRAY_TASK_ID}}p" {manifest})
+name=$(basename "$path")
+orca={ORCA}
+
+echo $name
+module load chem/orca/6.0.1
+module load mpi/openmpi/4.1
+module list
+
+echo "ausführen"
+$orca $path.inp > $path.out
+"""
+
+
+class JobArraySubmitter:
+    """Sammelt eingereichte Rechnungen und schickt sie gruppiert als Slurm-Job-Arrays ab.
+
+    Pro Ressourcenklasse entsteht unter ``root`` (Standard: ``database/.arrays``) ein Ordner
+    mit ``manifest.txt`` (eine Zeile pro Rechnung) und ``array.sh``. Slurm schreibt die Logs
+    der Tasks in diesen Ordner, ``NAME_out.out`` und ``NAME_err.err`` des Datenbankeintrags
+    werden Symlinks darauf. So lesen Dashboard und die Symlinks der Topic-Ordner weiterhin
+    dieselben Pfade.
+    """
+
+    def __init__(self, root: Path = None, sbatch: str = None, max_size: int = 1000, max_parallel: int = None) -> None:
+        self.root = Path(root) if root is not None else database.BASE_PATH / "database" / ".arrays"
+        self.sbatch = shlex.split(sbatch or SBATCH)
+        self.max_size = max_size
+        self.max_parallel = max_parallel
+        self.arrays: dict[tuple, JobArray] = {}
+        self.tasks: dict[Path, list[str]] = {}
+
+    def add(self, path: str, nprocs: int, mem: int, time: str) -> None:
+        """``path`` ist die .xyz (oder .inp) des Datenbankeintrags, wie ShellScriptCreator sie bekommt"""
+        key = (nprocs, mem, time)
+        if key not in self.arrays:
+            self.arrays[key] = JobArray(nprocs, mem, time)
+        self.arrays[key].paths.append(str(path).split(".")[0])
+
+    def link_logs(self, path: str, folder: Path, task: int) -> None:
+        for end in ("_out.out", "_err.err"):
+            link = Path(f"{path}{end}")
+            if link.exists() or link.is_symlink():
+                link.unlink()
+            link.symlink_to(folder / f"{task}{end}")
+
+    def write(self) -> list[Path]:
+        """Manifeste und Array-Skripte schreiben; gibt die Skriptpfade zurück"""
+        scripts = []
+        stamp = f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        for array in self.arrays.values():
+            chunks = [array.paths[i:i + self.max_size] for i in range(0, len(array.paths), self.max_size)]
+            for n, chunk in enumerate(chunks, 1):
+                folder = self.root / f"{stamp}_{array.name}_{n:03}"
+                folder.mkdir(parents=True, exist_ok=False)
+                manifest = folder / "manifest.txt"
+                manifest.write_text("".join(f"{path}\n" for path in chunk))
+                for task, path in enumerate(chunk, 1):
+                    self.link_logs(path, folder, task)
+                script = folder / "array.sh"
+                script.write_text(array.create_sh_script_content(folder, manifest, len(chunk), self.max_parallel))
+                self.tasks[script] = chunk
+                scripts.append(script)
+        return scripts
+
+    def submit(self) -> list[str]:
+        """Alle gesammelten Arrays schreiben und mit sbatch abschicken; gibt die Job-IDs zurück.
+
+        Jeder Eintrag bekommt ``NAME.jobid`` mit ``ARRAYID_TASK``, damit Folgejobs darauf warten können.
+        """
+        job_ids = []
+        for script in self.write():
+            result = subprocess.run([*self.sbatch, str(script)], capture_output=True, text=True, check=True)
+            match = re.search(r"(\d+)", result.stdout)
+            job_id = match.group(1) if match else result.stdout.strip()
+            (script.parent / "jobid").write_text(f"{job_id}\n")
+            for task, path in enumerate(self.tasks.pop(script), 1):
+                Path(f"{path}.jobid").write_text(f"{job_id}_{task}\n")
+            logging.info(f"Submitted job array {script.parent.name} as {job_id}")
+            job_ids.append(job_id)
+        self.arrays.clear()
+        return job_ids
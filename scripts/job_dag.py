@@ -0,0 +1,110 @@
+import logging
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+from job_array import SBATCH
+
+SCRIPTS_PATH = Path(__file__).resolve().parent
+
+
+class Job:
+    """Ein Knoten des DAG: ein Skript, das nach ``dependencies`` (Jobs) und ``external`` (Job-IDs) läuft"""
+
+    def __init__(self, name: str, script: Path, dependencies: list = None, external: list = None) -> None:
+        self.name = name
+        self.script = Path(script)
+        self.dependencies: list[Job] = list(dependencies or [])
+        self.external: list[str] = list(external or [])
+        self.job_id: str = None
+
+    @property
+    def jobid_path(self) -> Path:
+        return self.script.with_suffix(".jobid")
+
+
+class JobDAG:
+    """Jobs mit Abhängigkeiten, die ein Backend in topologischer Reihenfolge abschickt.
+
+    Die Rechnungen einer Struktur (Supersystem und ``subsys_*``) kommen zuerst, der
+    Nachbearbeitungsjob (``postprocess.py``) hängt von allen ab. Ein Backend braucht nur
+    ``submit(job, dependency_ids) -> job_id``.
+    """
+
+    def __init__(self) -> None:
+        self.jobs: dict[str, Job] = {}
+
+    def add(self, job: Job) -> Job:
+        if job.name in self.jobs:
+            raise ValueError(f"Job {job.name} is already part of the DAG")
+        self.jobs[job.name] = job
+        return job
+
+    def order(self) -> list[Job]:
+        """Topologische Reihenfolge; ein Zyklus ist ein Fehler"""
+        ordered = []
+        state = {}
+
+        def visit(job, path):
+            if state.get(job.name) == "done":
+                return
+            if state.get(job.name) == "visiting":
+                raise ValueError(f"Cycle in job DAG: {' -> '.join(path + [job.name])}")
+            state[job.name] = "visiting"
+            for dependency in job.dependencies:
+                visit(dependency, path + [job.name])
+            state[job.name] = "done"
+            ordered.append(job)
+
+        for job in self.jobs.values():
+            visit(job, [])
+        return ordered
+
+    def submit(self, backend) -> dict:
+        """Alle Jobs abschicken; die ID landet in ``NAME.jobid`` neben dem Skript"""
+        for job in self.order():
+            dependency_ids = [dependency.job_id for dependency in job.dependencies] + job.external
+            job.job_id = backend.submit(job, dependency_ids)
+            job.jobid_path.write_text(f"{job.job_id}\n")
+            logging.info(f"Submitted {job.name} as {job.job_id} after {dependency_ids or 'nothing'}")
+        return {name: job.job_id for name, job in self.jobs.items()}
+
+
+class SlurmBackend:
+    """Schickt Jobs mit ``sbatch --parsable`` ab, Abhängigkeiten als ``afterok``"""
+
+    def __init__(self, sbatch: str = None) -> None:
+        self.sbatch = shlex.split(sbatch or SBATCH)
+
+    def submit(self, job: Job, dependency_ids: list) -> str:
+        command = [*self.sbatch, "--parsable"]
+        if dependency_ids:
+            command.append(f"--dependency=afterok:{':'.join(dependency_ids)}")
+        command.append(str(job.script))
+        result = subprocess.run(command, capture_output=True, text=True, check=True)
+        # --parsable gibt "jobid" oder "jobid;cluster" aus
+        return result.stdout.strip().split(";")[0]
+
+
+def read_job_id(entry: Path):
+    """Job-ID eines Datenbankeintrags (``NAME.jobid``), ``None`` wenn keine abgeschickt wurde"""
+    jobid_path = entry / f"{entry.name}.jobid"
+    if not jobid_path.exists():
+        return None
+    return jobid_path.read_text().strip() or None
+
+
+def create_postprocess_script(folder: Path) -> Path:
+    """Kleiner Slurm-Job, der ``postprocess.py`` für eine Struktur ausführt"""
+    script = folder / "postprocess.sh"
+    script.write_text(f"""#!/bin/bash
+#SBATCH --nodes=1
+#SBATCH --mem=8gb
+#SBATCH --ntasks-per-node=1
+#SBATCH --time=01:00:00
+#SBATCH --output={folder}/postprocess_out.out
+#SBATCH --error={folder}/postprocess_err.err
+
+{sys.executable} {SCRIPTS_PATH / "postprocess.py"} {folder}
+""")
+    return script
@@ -0,0 +1,173 @@
+"""Status, Laufzeit und Energie aller Rechnungen unter ``calculations/``.
+
+Wird vom Dashboard direkt oder vom Hintergrunddienst ``status_watcher.py`` benutzt, der das
+Ergebnis in einer SQLite-Datei ablegt. Kein Streamlit hier.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from error_rules import error_rules, slurm_rules
+from output_reader import shared_reader
+from scheduler_status import entry_job_id, shared_scheduler
+
+# gleichzeitige Verzeichnis-/Datei-Zugriffe beim Scan, klein halten auf Lustre/NFS
+SCAN_WORKERS = int(os.environ.get("ORCA_LED_SCAN_WORKERS", 8))
+scan_pool = ThreadPoolExecutor(SCAN_WORKERS, thread_name_prefix="job-status")
+
+
+class JobHandler:
+    @staticmethod
+    def get_progress_of_job(output, path, job_id=None, scheduler=None):
+        """``output`` ist der OutputState der .out-Datei (OutputTailReader)"""
+        status, runtime = JobHandler.check_slurm_job_status_and_duration(path, job_id, scheduler)
+        if status != "Not Finished":
+            return status, runtime
+
+        if output.finished:
+            return "Progress: 100%", runtime
+
+        error_status = JobHandler.get_error_file(path)
+        if error_status is not None:
+            return error_status, None
+        return f"Progress: {int(output.progress_count *50)}%", runtime
+
+    @staticmethod
+    def get_error_file(path):
+        total_path = Path(f"{path}_err.err")
+        try:
+            # Regeltabelle in error_rules.ERROR_RULES, ein Durchlauf pro geänderter Datei
+            match = error_rules.classify(total_path)
+            if match is not None:
+                return match[0]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error reading error file: {str(e)}")
+            return f"Error: {str(e)}"
+        return None
+
+    @staticmethod
+    def check_slurm_job_status_and_duration(base_path: Path, job_id: str = None, scheduler=None) -> tuple:
+        """Gibt Status und Laufzeit für SLURM-Job zurück; zuerst aus sacct (SchedulerStatus), sonst aus ``_out.out``"""
+        if scheduler is not None:
+            result = scheduler.job_status(job_id)
+            if result is not None:
+                return result
+        slurm_output_path = base_path.with_name(base_path.name + "_out.out")
+
+        status = "Not Finished"
+        runtime = None
+        try:
+            match = slurm_rules.classify(slurm_output_path)
+        except FileNotFoundError:
+            return status, runtime
+
+        if match is None:
+            pass
+        elif match[0] == "runtime":
+            runtime = ":".join(match[1].split(":")[0:3]).strip()
+        else:
+            status = match[0]
+        return status, runtime
+
+    @staticmethod
+    def get_color_and_progress(progress: str) -> tuple:
+        """Gibt Farbe und Prozentwert für Progress-Balken zurück"""
+        if progress == "Not Started":
+            return "grey", 100
+        if "Progress:" not in progress:
+            return "red", 100
+        if "100%" in progress:
+            return "green", 100
+
+        progress_value = float(progress.replace("Progress:", "").replace("%", "").strip())
+        return "orange", progress_value
+
+
+def check_progress_of_single_file(path: Path, job_id: str = None, scheduler=None) -> tuple:
+    """(Status, Laufzeit, Name, letzte Energie) einer Rechnung ``structure/NAME``"""
+    output_file = path / f"{path.stem}.out"
+    try:
+        # nur der seit dem letzten Check angehängte Teil wird gelesen; stat statt exists() + open
+        output = shared_reader.read(output_file)
+    except FileNotFoundError:
+        return "Not Started", None, path.stem, None
+    progress, runtime = JobHandler.get_progress_of_job(output, path / path.stem, job_id, scheduler)
+    return progress, runtime, path.stem, output.last_energy
+
+
+def subdirectories(path: Path) -> list[str]:
+    """Namen der Unterordner ohne Punkt-Einträge; ``DirEntry.is_dir`` braucht meist kein eigenes stat"""
+    with os.scandir(path) as entries:
+        return [entry.name for entry in entries if not entry.name.startswith(".") and entry.is_dir()]
+
+
+def job_folders(structure_path: Path) -> list[Path]:
+    """Rechnungsordner einer Struktur: Supersystem zuerst, dann subsys_*"""
+    names = sorted(subdirectories(structure_path), key=lambda name: ("subsys_" in name, name))
+    return [Path(structure_path) / name for name in names]
+
+
+def structure_jobs(structure_path: Path, with_ids: bool) -> list[tuple]:
+    """``[(Rechnungsordner, Job-ID)]`` einer Struktur, leer wenn keine subsys_/fragment_-Ordner"""
+    folders = job_folders(structure_path)
+    if not any(folder.name.startswith(("fragment_", "subsys_")) for folder in folders):
+        return []
+    return [(folder, entry_job_id(folder) if with_ids else None) for folder in folders]
+
+
+def check_progress_of_topics(topic_paths: list, scheduler=shared_scheduler, pool: ThreadPoolExecutor = None) -> dict:
+    """``{Topic: {Struktur: ({Rechnungsordner: (Status, Laufzeit, Name, Energie)}, Strukturordner)}}``
+
+    Strukturordner und Rechnungen aller Topics laufen über einen gemeinsamen Thread-Pool
+    (``scan_pool``, ``ORCA_LED_SCAN_WORKERS`` Threads), damit auf Lustre/NFS nie mehr als so
+    viele Metadaten-Anfragen gleichzeitig unterwegs sind. Die Slurm-Zustände eines Topics
+    kommen aus einem gemeinsamen ``sacct``-Aufruf.
+    """
+    pool = pool or scan_pool
+    listings = {}
+    for topic_path in map(Path, topic_paths):
+        try:
+            structures = sorted(subdirectories(topic_path))
+        except FileNotFoundError:
+            continue
+        for name in structures:
+            listings[topic_path.name, name] = (topic_path / name, pool.submit(structure_jobs, topic_path / name, scheduler is not None))
+
+    structures = {}
+    for (topic, name), (structure_path, future) in listings.items():
+        try:
+            jobs = future.result()
+        except FileNotFoundError:  # während des Scans gelöscht
+            continue
+        if jobs:
+            structures.setdefault(topic, {})[name] = (jobs, structure_path)
+
+    progress = {}
+    for topic, topic_structures in structures.items():
+        if scheduler is not None:
+            scheduler.query([job_id for jobs, _ in topic_structures.values() for _, job_id in jobs if job_id])
+        for name, (jobs, structure_path) in topic_structures.items():
+            progress[topic, name] = ({job_path: pool.submit(check_progress_of_single_file, job_path, job_id, scheduler)
+                                      for job_path, job_id in jobs}, structure_path)
+
+    topics = {}
+    for (topic, name), (futures, structure_path) in progress.items():
+        jobs_progress = {job_path: future.result() for job_path, future in futures.items()}
+        topics.setdefault(topic, {})[name] = (jobs_progress, structure_path)
+    return topics
+
+
+def check_progress_of_single_topic(topic_path: Path, scheduler=shared_scheduler, pool: ThreadPoolExecutor = None) -> dict:
+    """``{Struktur: ({Rechnungsordner: (Status, Laufzeit, Name, Energie)}, Strukturordner)}``"""
+    return check_progress_of_topics([topic_path], scheduler, pool).get(Path(topic_path).name, {})
+
+
+def topic_names(base_path: Path) -> list[str]:
+    return subdirectories(base_path)
+
+
+def check_progress_of_all_topics(base_path: Path, scheduler=shared_scheduler, pool: ThreadPoolExecutor = None) -> dict:
+    """``{Topic: check_progress_of_single_topic}`` für alle Topics mit Rechnungen"""
+    return check_progress_of_topics([Path(base_path) / name for name in topic_names(base_path)], scheduler, pool)
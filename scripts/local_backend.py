@@ -0,0 +1,156 @@
+import itertools
+import logging
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import job_array
+from resources import format_time
+
+# ORCA für lokale Rechnungen, z.B. ORCA_LED_ORCA=/opt/orca/orca oder ein Mock für Tests
+ORCA = os.environ.get("ORCA_LED_ORCA", job_array.ORCA)
+
+
+class LocalExecutor:
+    """Führt kleine Rechnungen ohne Slurm in einem begrenzten lokalen Prozesspool aus.
+
+    Jede Rechnung belegt ``nprocs`` Kerne aus einem gemeinsamen Budget von ``cores``;
+    eine Rechnung startet erst, wenn genug Kerne frei sind. Geschrieben wird dasselbe
+    Layout wie unter Slurm: ``NAME.out`` (ORCA), ``NAME_err.err`` (stderr) und
+    ``NAME_out.out`` mit einer seff-artigen Zusammenfassung (``CPU Utilized:``,
+    ``Job Wall-clock time:``, ``Memory Utilized:``), damit Dashboard, Laufzeitmodell und
+    LED-Auswertung nichts davon merken.
+
+    Der Executor kann als ``job_array`` (``add``/``submit()``) und als Backend des JobDAG
+    (``submit(job, dependency_ids)``) an ``create_inp_files_batch`` übergeben werden.
+    """
+
+    def __init__(self, orca: str = None, cores: int = None) -> None:
+        self.orca = shlex.split(orca or ORCA)
+        self.cores = cores or os.cpu_count() or 1
+        self.free = self.cores
+        self.condition = threading.Condition()
+        # Threads warten nur auf die Kindprozesse, das Kernbudget begrenzt die Last
+        self.pool = ThreadPoolExecutor(self.cores, thread_name_prefix="orca-local")
+        self.futures: dict = {}
+        self.pending: list[tuple[str, int]] = []
+        self.ids = itertools.count(1)
+
+    def acquire(self, nprocs: int) -> int:
+        nprocs = max(1, min(nprocs, self.cores))
+        with self.condition:
+            self.condition.wait_for(lambda: self.free >= nprocs)
+            self.free -= nprocs
+        return nprocs
+
+    def release(self, nprocs: int) -> None:
+        with self.condition:
+            self.free += nprocs
+            self.condition.notify_all()
+
+    def run(self, command: list, cwd: Path, out_path: Path, err_path: Path, log_path: Path, nprocs: int, job_id: str) -> int:
+        """Einen Prozess mit ``nprocs`` Kernen aus dem Budget laufen lassen und ``log_path`` schreiben.
+
+        Ist ``log_path`` zugleich die stdout-Datei, wird die Zusammenfassung wie von Slurms
+        Epilog angehängt.
+        """
+        nprocs = self.acquire(nprocs)
+        try:
+            start = time.time()
+            with open(out_path, "w") as out, open(err_path, "w") as err:
+                try:
+                    process = subprocess.Popen(command, cwd=cwd, stdout=out, stderr=err)
+                except OSError as e:
+                    err.write(f"{e}\n")
+                    returncode, usage = 127, None
+                else:
+                    # wait4 liefert die Ressourcen genau dieses Kindprozesses
+                    _, status, usage = os.wait4(process.pid, 0)
+                    returncode = process.returncode = os.waitstatus_to_exitcode(status)
+            wall = time.time() - start
+        finally:
+            self.release(nprocs)
+        state = "COMPLETED" if returncode == 0 else "FAILED"
+        cpu = usage.ru_utime + usage.ru_stime if usage else 0.0
+        memory = usage.ru_maxrss / 1024 if usage else 0.0
+        with open(log_path, "a" if log_path == out_path else "w") as log:
+            log.write(
+                f"Job ID: {job_id}\n"
+                f"State: {state} (exit code {returncode})\n"
+                f"Cores: {nprocs}\n"
+                f"CPU Utilized: {format_time(cpu)}\n"
+                f"Job Wall-clock time: {format_time(wall)}\n"
+                f"Memory Utilized: {memory:.2f} MB\n"
+            )
+        logging.info(f"Local job {job_id} ({command[-1]}) {state.lower()} after {wall:.1f} s")
+        return returncode
+
+    def run_orca(self, path: str, nprocs: int, job_id: str) -> int:
+        """``path`` ist der Datenbankeintrag mit oder ohne Endung, wie bei JobArraySubmitter"""
+        path = Path(str(path).split(".")[0])
+        return self.run(
+            [*self.orca, f"{path}.inp"], path.parent,
+            Path(f"{path}.out"), Path(f"{path}_err.err"), Path(f"{path}_out.out"), nprocs, job_id,
+        )
+
+    def run_script(self, script: Path, job_id: str) -> int:
+        """Sonstige Jobs (z.B. ``postprocess.sh``) mit bash; Ausgabe und Zusammenfassung nach ``NAME_out.out``"""
+        out_path = script.with_name(f"{script.stem}_out.out")
+        err_path = script.with_name(f"{script.stem}_err.err")
+        return self.run(["bash", str(script)], script.parent, out_path, err_path, out_path, 1, job_id)
+
+    def start(self, function, *args, dependency_ids=()) -> str:
+        job_id = f"local-{next(self.ids)}"
+        dependencies = []
+        for dependency_id in dependency_ids:
+            if dependency_id in self.futures:
+                dependencies.append(self.futures[dependency_id])
+            else:
+                logging.warning(f"Local job {job_id} cannot wait for external job {dependency_id}")
+
+        def task():
+            # wie afterok: nur starten, wenn alle Vorgänger erfolgreich waren
+            if any(dependency.result() != 0 for dependency in dependencies):
+                logging.error(f"Local job {job_id} skipped, a dependency failed")
+                return -1
+            return function(*args, job_id)
+
+        self.futures[job_id] = self.pool.submit(task)
+        return job_id
+
+    def add(self, path: str, nprocs: int, mem: int = None, time: str = None) -> None:
+        """Wie ``JobArraySubmitter.add``; Speicher und Laufzeit werden lokal nicht begrenzt"""
+        self.pending.append((str(path).split(".")[0], nprocs))
+
+    def submit(self, job=None, dependency_ids=None):
+        """Ohne ``job``: alle mit ``add`` gesammelten Rechnungen starten (wie ``JobArraySubmitter``).
+
+        Mit ``job``: einen Job des JobDAG nach ``dependency_ids`` starten. Liegt neben dem
+        Skript eine ``.inp``, wird ORCA direkt mit den Kernen aus ``--ntasks-per-node`` gestartet.
+        Jede gestartete Rechnung bekommt ``NAME.jobid`` mit der lokalen ID.
+        """
+        if job is None:
+            job_ids = []
+            for path, nprocs in self.pending:
+                job_id = self.start(self.run_orca, path, nprocs)
+                Path(f"{path}.jobid").write_text(f"{job_id}\n")
+                job_ids.append(job_id)
+            self.pending.clear()
+            return job_ids
+        inp_path = job.script.with_suffix(".inp")
+        if inp_path.exists():
+            match = re.search(r"--ntasks-per-node=(\d+)", job.script.read_text())
+            nprocs = int(match.group(1)) if match else 1
+            return self.start(self.run_orca, inp_path, nprocs, dependency_ids=dependency_ids or ())
+        return self.start(self.run_script, job.script, dependency_ids=dependency_ids or ())
+
+    def wait(self) -> dict:
+        """Auf alle gestarteten Jobs warten; gibt Job-ID -> Exit-Code zurück"""
+        return {job_id: future.result() for job_id, future in list(self.futures.items())}
+
+    def shutdown(self) -> None:
+        self.pool.shutdown(wait=True)
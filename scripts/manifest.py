@@ -0,0 +1,110 @@
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+MANIFEST_NAME = ".manifest.json"
+
+
+def file_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(*settings) -> str:
+    """Hash der Einstellungen, die das Ergebnis von prepare() bestimmen (Header, Fragmenter, ...)"""
+    parts = []
+    for setting in settings:
+        if setting is not None and hasattr(setting, "__dict__"):
+            setting = {"class": type(setting).__name__, **vars(setting)}
+        parts.append(setting)
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class TopicManifest:
+    """Hashes der Eingaben und erzeugten Dateien aller Strukturen eines Topics (``topic/.manifest.json``).
+
+    Eine Struktur gilt als unverändert, wenn Eingabedatei und Einstellungen denselben Hash
+    haben, alle erzeugten ``.xyz`` noch denselben Inhalt haben und jede Rechnung ihren
+    ``.out``-Symlink in die Datenbank hat. Solche Strukturen werden gar nicht erst neu
+    vorbereitet, damit keine Datei und keine mtime angefasst wird.
+    """
+
+    def __init__(self, topic: Path) -> None:
+        self.topic = Path(topic).resolve()
+        self.path = self.topic / MANIFEST_NAME
+        self.entries = self.load()
+
+    @classmethod
+    def for_file(cls, file) -> "TopicManifest":
+        """Manifest des Topics einer Struktur ``topic/struktur/NAME.xyz``"""
+        return cls(Path(file).resolve().parents[1])
+
+    def load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text())
+        except ValueError:
+            logging.warning(f"Ignoring unreadable manifest {self.path}")
+            return {}
+
+    def key(self, file) -> str:
+        return str(Path(file).resolve().relative_to(self.topic))
+
+    @staticmethod
+    def source(file) -> Path:
+        """Eingabedatei; nach einem Zuschnitt (Fragmenter) ist das ``NAME_full.xyz``"""
+        file = Path(file)
+        full = file.with_name(f"{file.stem}_full.xyz")
+        return full if file.suffix == ".xyz" and full.exists() else file
+
+    @staticmethod
+    def artifacts(file) -> list[Path]:
+        """Erzeugte Strukturdateien neben der Eingabe"""
+        file = Path(file)
+        folder = file.parent
+        paths = sorted(glob.glob(str(folder / "fragment_*.xyz")) + glob.glob(str(folder / "subsys_*.xyz")))
+        return [Path(path) for path in paths] + [file.with_suffix(".xyz")]
+
+    def unchanged(self, file, settings: str) -> bool:
+        entry = self.entries.get(self.key(file))
+        if entry is None or entry.get("settings") != settings:
+            return False
+        source = self.source(file)
+        if not source.exists() or file_hash(source) != entry.get("input"):
+            return False
+        for name, digest in entry.get("artifacts", {}).items():
+            path = self.topic / name
+            if not path.exists() or file_hash(path) != digest:
+                return False
+        for job_dir in entry.get("jobs", []):
+            out_link = self.topic / job_dir / f"{Path(job_dir).name}.out"
+            if not os.path.lexists(out_link):
+                return False
+        return True
+
+    def record(self, file, settings: str, job_dirs: list) -> None:
+        self.entries[self.key(file)] = {
+            "settings": settings,
+            "input": file_hash(self.source(file)),
+            "artifacts": {str(path.resolve().relative_to(self.topic)): file_hash(path) for path in self.artifacts(file) if path.exists()},
+            "jobs": [str(Path(job_dir).resolve().relative_to(self.topic)) for job_dir in job_dirs],
+        }
+
+    def save(self) -> None:
+        """Unter Sperre mit dem Stand auf der Platte zusammenführen und atomar ersetzen"""
+        with open(self.topic / ".manifest.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = self.load()
+            entries.update(self.entries)
+            self.entries = entries
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(entries, indent=1, sort_keys=True))
+            os.replace(tmp_path, self.path)
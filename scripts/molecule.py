@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class Molecule:
+    """Elemente, Koordinaten und Formalladungen einer Struktur, einmal eingelesen.
+
+    Fragmentierung, Aufteilen in Subsysteme und das Schreiben der .inp-Dateien arbeiten
+    nur noch mit Indexarrays auf diesen Arrays, statt die XYZ-Datei neu zu lesen.
+    """
+
+    def __init__(self, elements, coords, charges=None, rows=None) -> None:
+        self.elements = np.asarray(elements, dtype=str)
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+        self.charges = np.zeros(len(self.elements), dtype=int) if charges is None else np.asarray(charges, dtype=int)
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    @classmethod
+    def from_xyz(cls, path) -> "Molecule":
+        with open(path, "r") as xyz_file:
+            lines = xyz_file.readlines()
+        atom_count = int(lines[0].strip())
+        rows = [line.split() for line in lines[2:2 + atom_count]]
+        return cls([row[0] for row in rows], [[float(x) for x in row[1:4]] for row in rows])
+
+    @classmethod
+    def from_rdkit(cls, mol) -> "Molecule":
+        atoms = mol.GetAtoms()
+        return cls(
+            [atom.GetSymbol() for atom in atoms],
+            mol.GetConformer().GetPositions(),
+            [atom.GetFormalCharge() for atom in atoms],
+        )
+
+    @property
+    def charge(self) -> int:
+        return int(self.charges.sum())
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Formatierte XYZ-Atomzeilen, einmal erzeugt und mit allen Teilmengen geteilt"""
+        if self._rows is None:
+            self._rows = np.array(
+                [f"{element} {x:.8f} {y:.8f} {z:.8f}\n" for element, (x, y, z) in zip(self.elements, self.coords.tolist())],
+                dtype=object,
+            )
+        return self._rows
+
+    def subset(self, indices) -> "Molecule":
+        indices = np.asarray(indices, dtype=int)
+        return Molecule(self.elements[indices], self.coords[indices], self.charges[indices], self.rows[indices])
+
+    def closest_to_centroid(self) -> int:
+        """Index des Atoms, das dem geometrischen Mittelpunkt am nächsten liegt"""
+        return int(np.argmin(np.linalg.norm(self.coords - self.coords.mean(axis=0), axis=1)))
+
+    def multi_letter_atoms(self) -> np.ndarray:
+        """Indizes der Atome mit zweibuchstabigem Elementsymbol (Br, Cl, ...)"""
+        return np.flatnonzero(np.char.str_len(self.elements) > 1)
+
+    def to_xyz(self, comment: str = "") -> str:
+        return f"{len(self)}\n{comment}\n" + "".join(self.rows)
+
+    def write_xyz(self, path, comment: str = "") -> None:
+        with open(path, "w") as output_file:
+            output_file.write(self.to_xyz(comment))
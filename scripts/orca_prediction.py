@@ -1,113 +1,344 @@
+import logging
+import math
+import os
+import re
 import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
 import numpy as np
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-
-# Datenbank initialisieren
-def init_db():
-    conn = sqlite3.connect("orca_data.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS calculations (
-            id INTEGER PRIMARY KEY,
-            atoms INTEGER,
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+PNO_SETTINGS = ("LOOSEPNO", "NORMALPNO", "TIGHTPNO", "VERYTIGHTPNO")
+
+
+def parse_run_time(content: str):
+    """Sekunden aus ``TOTAL RUN TIME: 0 days 1 hours 2 minutes 3 seconds 456 msec`` der ORCA-Ausgabe"""
+    match = re.search(r"TOTAL RUN TIME:\s*(\d+) days (\d+) hours (\d+) minutes (\d+) seconds (\d+) msec", content)
+    if not match:
+        return None
+    days, hours, minutes, seconds, msec = map(int, match.groups())
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds + msec / 1000
+
+
+def parse_slurm_time(value: str) -> float:
+    """``[D-]HH:MM:SS`` (auch ``MM:SS``) in Sekunden"""
+    days = 0
+    if "-" in value:
+        days, value = value.split("-", 1)
+    parts = [float(part) for part in value.strip().split(":")]
+    while len(parts) < 3:
+        parts.insert(0, 0.0)
+    return int(days) * 86400 + parts[0] * 3600 + parts[1] * 60 + parts[2]
+
+
+def parse_seff(content: str) -> tuple:
+    """Wall-Clock-Zeit (s) und Speicher (GB) aus der seff-Ausgabe in ``_out.out``"""
+    wall = None
+    memory = None
+    match = re.search(r"Job Wall-clock time:\s*([\d:-]+)", content)
+    if match:
+        wall = parse_slurm_time(match.group(1))
+    match = re.search(r"Memory Utilized:\s*([\d.]+)\s*([KMGT]B)", content)
+    if match:
+        factor = {"KB": 1 / 1024**2, "MB": 1 / 1024, "GB": 1.0, "TB": 1024.0}[match.group(2)]
+        memory = float(match.group(1)) * factor
+    return wall, memory
+
+
+def parse_nprocs(header: str):
+    match = re.search(r"nprocs\s*(\d+)", header, re.IGNORECASE)
+    return int(match.group(1)) if match else None
+
+
+def method_key(header: str) -> tuple[str, str, str]:
+    """(Methode, Basis, PNO-Einstellung) aus der ``!``-Zeile des Headers"""
+    keywords = []
+    for line in header.splitlines():
+        line = line.strip()
+        if line.startswith("!"):
+            keywords.extend(line[1:].upper().split())
+    method = next((k for k in keywords if "CC" in k or "HF" in k or "MP2" in k), keywords[0] if keywords else "")
+    basis = next((k for k in keywords if k.startswith(("DEF2-", "CC-P", "AUG-CC", "MA-DEF2")) and "/" not in k), "")
+    pno = next((k for k in keywords if k in PNO_SETTINGS), "NORMALPNO")
+    return method, basis, pno
+
+
+def read_head_and_tail(path, head: int = 65536, tail: int = 8192) -> tuple[str, str]:
+    """Anfang (Eingabe-Echo) und Ende (Laufzeit) einer ORCA-Ausgabe, ohne die ganze Datei zu lesen"""
+    with open(path, "rb") as f:
+        start = f.read(head)
+        f.seek(0, 2)
+        f.seek(max(f.tell() - tail, len(start)))
+        end = f.read()
+    if len(end) < tail:
+        end = (start + end)[-tail:]
+    return start.decode(errors="replace"), end.decode(errors="replace")
+
+
+def content_to_params(content_out: str) -> dict:
+    """Einstellungen aus dem Anfang einer ORCA-Ausgabe: Eingabe-Echo, Atomzahl, Ladung, nprocs"""
+    header = "\n".join(re.findall(r"^\|\s*\d+>\s?(.*)$", content_out, re.MULTILINE))
+    params = {"header": header, "atoms": None, "charge": None, "nprocs": parse_nprocs(header)}
+    match = re.search(r"Number of atoms\s*\.+\s*(\d+)", content_out)
+    if match:
+        params["atoms"] = int(match.group(1))
+    match = re.search(r"Total Charge\s+Charge\s*\.+\s*(-?\d+)", content_out)
+    if match:
+        params["charge"] = int(match.group(1))
+    match = re.search(r"running with\s+(\d+)\s+parallel MPI-processes", content_out)
+    if params["nprocs"] is None and match:
+        params["nprocs"] = int(match.group(1))
+    return params
+
+
+class RunHistory:
+    """SQLite-Tabelle der fertigen ORCA-Rechnungen (Einstellungen, Laufzeit, Speicher).
+
+    Jede ``.out`` wird mit ``(mtime, size)`` gespeichert und nur neu gelesen, wenn sie sich ändert.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            atoms INTEGER NOT NULL,
             charge INTEGER,
-            basis_set TEXT,
-            method TEXT,
+            method TEXT NOT NULL,
+            basis_set TEXT NOT NULL,
+            pno TEXT NOT NULL,
             other_params TEXT,
-            memory FLOAT,
-            time FLOAT
-        )
-    ''')
-    conn.commit()
-    conn.close()
-
-# Neue Rechnung in die Datenbank einfügen
-def insert_calculation(atoms, charge, basis_set, method, other_params, memory, time):
-    conn = sqlite3.connect("orca_data.db")
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO calculations (atoms, charge, basis_set, method, other_params, memory, time)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (atoms, charge, basis_set, method, other_params, memory, time))
-    conn.commit()
-    conn.close()
-
-# Vorhersage der Rechenzeit basierend auf vergangenen Daten
-def predict_time(atoms, charge, basis_set, method, other_params, reserve_factor=1.2):
-    conn = sqlite3.connect("orca_data.db")
-    df = pd.read_sql_query("SELECT * FROM calculations", conn)
-    conn.close()
-    
-    if df.empty:
-        return "Keine Daten vorhanden, um eine Vorhersage zu treffen."
-    
-    # Feature Engineering: Basis-Satz und Methode in numerische Werte umwandeln
-    df['basis_set'] = df['basis_set'].astype('category').cat.codes
-    df['method'] = df['method'].astype('category').cat.codes
-    df['other_params'] = df['other_params'].astype('category').cat.codes
-    
-    X = df[['atoms', 'charge', 'basis_set', 'method', 'other_params']]
-    y = df['time']
-    
-    model = LinearRegression()
-    model.fit(X, y)
-    
-    new_input = np.array([[atoms, charge, 
-                            pd.Series([basis_set]).astype('category').cat.codes[0],
-                            pd.Series([method]).astype('category').cat.codes[0],
-                            pd.Series([other_params]).astype('category').cat.codes[0]]])
-    
-    predicted_time = model.predict(new_input)[0] * reserve_factor
-    return max(predicted_time, 0)  # Keine negativen Zeiten
-
-def process_directory(subdir, filename):
-    # Beispiel: Datei einlesen und Parameter extrahieren
-    with open(f"{subdir}/{filename}.out", "r") as f:
-        content = f.read()
-    
-    atoms = 10
-    charge = 0
-    basis_set = 'def2-TZVP'
-    method = 'PBE0'
-    other_params = 'tightSCF'
-    memory = 4.5
-    time = 3600
-    
-    insert_calculation(atoms, charge, basis_set, method, other_params, memory, time)
-
-def content_to_params(content_inp):
+            nprocs INTEGER NOT NULL,
+            wall_seconds FLOAT NOT NULL,
+            cpu_seconds FLOAT NOT NULL,
+            memory_gb FLOAT,
+            added FLOAT
+        );
+        CREATE INDEX IF NOT EXISTS runs_group ON runs (method, basis_set, pno);
     """
-    Extracts the relevant parameters from the ORCA output file content.
-    
-    Parameters:
-    content_inp (str): The content of the ORCA output file.
 
-    Returns:
-    tuple: A tuple containing the extracted parameters (charge, basis_set, method, other_params).
+    def __init__(self, path: Path = None) -> None:
+        self.path = Path(path) if path is not None else BASE_PATH / "orca_data.db"
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        self.conn.executescript(self.SCHEMA)
+        self.conn.commit()
+        self.lock = threading.Lock()
+        # (mtime, size) of outputs that were read but are not finished yet
+        self.pending = {}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def insert_calculation(self, path: str, stamp: tuple, atoms: int, charge, key: tuple, other_params: str,
+                           nprocs: int, wall_seconds: float, cpu_seconds: float, memory_gb=None) -> None:
+        with self.lock:
+            # REPLACE gibt der Zeile eine neue id, damit das Modell sie als neu erkennt
+            self.conn.execute(
+                "INSERT OR REPLACE INTO runs (path, mtime_ns, size, atoms, charge, method, basis_set, pno, other_params, "
+                "nprocs, wall_seconds, cpu_seconds, memory_gb, added) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, *stamp, atoms, charge, *key, other_params, nprocs, wall_seconds, cpu_seconds, memory_gb, time.time()),
+            )
+            self.conn.commit()
+
+    def known(self) -> dict:
+        with self.lock:
+            return {path: (mtime, size) for path, mtime, size in self.conn.execute("SELECT path, mtime_ns, size FROM runs")}
+
+    def process_output(self, out_path: Path, known: dict = None) -> bool:
+        """Eine fertige ``NAME.out`` (mit ``NAME_out.out``, ``NAME.inp`` und ``NAME.xyz`` daneben) aufnehmen"""
+        out_path = Path(out_path)
+        stat = os.stat(out_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if known is not None and known.get(str(out_path)) == stamp:
+            return False
+        head, tail = read_head_and_tail(out_path)
+        wall = parse_run_time(tail)
+        if wall is None:
+            return False
+        params = content_to_params(head)
+        base = out_path.with_suffix("")
+        header = params["header"]
+        inp_path = Path(f"{base}.inp")
+        if not header and inp_path.exists():
+            header = inp_path.read_text()
+        nprocs = params["nprocs"] or parse_nprocs(header)
+        atoms = params["atoms"]
+        xyz_path = Path(f"{base}.xyz")
+        if atoms is None and xyz_path.exists():
+            atoms = int(xyz_path.read_text().split()[0])
+        slurm_path = Path(f"{base}_out.out")
+        memory = None
+        if slurm_path.exists():
+            _, memory = parse_seff(slurm_path.read_text())
+        if not (atoms and nprocs and header):
+            return False
+        other = " ".join(line.strip() for line in header.splitlines() if line.strip().startswith("!"))
+        self.insert_calculation(str(out_path), stamp, atoms, params["charge"], method_key(header), other,
+                                nprocs, wall, nprocs * wall, memory)
+        return True
+
+    def process_directory(self, root: Path) -> int:
+        """Alle fertigen ``.out`` unterhalb von ``root`` aufnehmen; bekannte, unveränderte werden übersprungen"""
+        known = self.known()
+        added = 0
+        inside = os.path.realpath(root) + os.sep
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for file in files:
+                if not file.endswith(".out") or file.endswith("_out.out"):
+                    continue
+                path = Path(dirpath) / file
+                # Links nach außen sind Verweise auf anderswo gezählte Läufe, Blob-Links bleiben drin
+                if path.is_symlink() and not os.path.realpath(path).startswith(inside):
+                    continue
+                try:
+                    added += self.process_output(path, known)
+                except (OSError, ValueError) as e:
+                    logging.error(f"Could not read run {path}: {e}")
+        logging.info(f"Added {added} finished runs to the run history")
+        return added
+
+    def process_new(self, root: Path) -> int:
+        """Wie ``process_directory`` für die Einträge direkt unter ``root``, aber ohne rekursiven Durchlauf.
+
+        Ausgaben, die schon in der Historie stehen, werden nicht angefasst; noch nicht fertige
+        nur neu gelesen, wenn sich ``(mtime, size)`` seit dem letzten Blick geändert hat.
+        """
+        known = self.known()
+        added = 0
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_dir():
+                    continue
+                path = Path(entry.path) / f"{entry.name}.out"
+                if str(path) in known:
+                    continue
+                try:
+                    stat = os.stat(path)
+                    stamp = (stat.st_mtime_ns, stat.st_size)
+                    if self.pending.get(str(path)) == stamp:
+                        continue
+                    if self.process_output(path):
+                        self.pending.pop(str(path), None)
+                        added += 1
+                    else:
+                        self.pending[str(path)] = stamp
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError) as e:
+                    logging.error(f"Could not read run {path}: {e}")
+        if added:
+            logging.info(f"Added {added} finished runs to the run history")
+        return added
+
+    def rows_after(self, row_id: int) -> list:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, path, method, basis_set, pno, atoms, cpu_seconds, memory_gb FROM runs WHERE id > ? ORDER BY id",
+                (row_id,),
+            ).fetchall()
+
+
+class CostModel:
+    """Power-law fits of CPU time and memory against the atom count per (method, basis, PNO).
+
+    The model keeps the sums of the least-squares normal equations per group, so new rows
+    of the run history are folded in without refitting the old ones; predictions only
+    evaluate a line. A row that replaces an older one of the same output (re-read after a
+    change) first takes the old row's terms out of the sums.
     """
 
-    charge = None
-    basis_set = None
-    method = None
-    other_params = None
-    lines = content_inp.split("\n")
-    for line in lines:
-        if "Charge" in line:
-            charge = int(line.split()[-1])
-        if "Basis set" in line:
-            basis_set = line.split()[-1]
-        if "Functional" in line:
-            method = line.split()[-1]
-        if "SCF" in line:
-            other_params = line
-    return charge, basis_set, method, other_params
-
-# Beispiel: Datenbank initialisieren
-init_db()
-
-# Beispiel: Neue Rechnung hinzufügen
-# insert_calculation(10, 0, 'def2-TZVP', 'PBE0', 'tightSCF', 4.5, 3600)
-
-# Beispiel: Vorhersage abrufen
-# print(predict_time(12, 0, 'def2-TZVP', 'PBE0', 'tightSCF'))
+    def __init__(self, history: RunHistory = None, min_runs: int = 3) -> None:
+        self.history = history
+        self.min_runs = min_runs
+        self.last_id = 0
+        # n, sum x, sum x^2, sum y, sum xy in log-log space
+        self.cpu = defaultdict(lambda: np.zeros(5))
+        self.memory = defaultdict(lambda: np.zeros(5))
+        # Beitrag jeder Zeile der Historie, nach Pfad der Ausgabe
+        self.terms = {}
+        # Streamlit-Sitzungen teilen sich ein Modell (``shared``)
+        self.lock = threading.RLock()
+
+    def add(self, key: tuple, atoms: int, cpu_seconds: float, memory_gb: float = None) -> tuple:
+        """Eine Rechnung in die Summen aufnehmen; gibt ``(key, cpu_terms, memory_terms)`` für ``remove`` zurück"""
+        x = math.log(atoms)
+        cpu = np.array((1, x, x * x, math.log(cpu_seconds), x * math.log(cpu_seconds)))
+        self.cpu[key] += cpu
+        memory = None
+        if memory_gb:
+            memory = np.array((1, x, x * x, math.log(memory_gb), x * math.log(memory_gb)))
+            self.memory[key] += memory
+        return key, cpu, memory
+
+    def remove(self, terms: tuple) -> None:
+        key, cpu, memory = terms
+        self.cpu[key] -= cpu
+        if memory is not None:
+            self.memory[key] -= memory
+
+    def refresh(self) -> int:
+        """Neue Zeilen der Historie übernehmen; gibt deren Anzahl zurück"""
+        if self.history is None:
+            return 0
+        with self.lock:
+            rows = self.history.rows_after(self.last_id)
+            for row_id, path, method, basis, pno, atoms, cpu_seconds, memory_gb in rows:
+                if path in self.terms:
+                    self.remove(self.terms.pop(path))
+                if atoms and cpu_seconds:
+                    self.terms[path] = self.add((method, basis, pno), atoms, cpu_seconds, memory_gb)
+                self.last_id = row_id
+        return len(rows)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.last_id = 0
+            self.cpu.clear()
+            self.memory.clear()
+            self.terms.clear()
+
+    def line(self, sums: np.ndarray):
+        n, sx, sxx, sy, sxy = sums
+        spread = n * sxx - sx * sx
+        if n < self.min_runs or spread <= 1e-9 * max(n * sxx, 1.0):
+            return None
+        slope = (n * sxy - sx * sy) / spread
+        return slope, (sy - slope * sx) / n
+
+    def predict(self, atoms: int, key: tuple):
+        """CPU-Sekunden und Speicher (GB, oder ``None``) für ``atoms`` Atome, ``None`` ohne genug Historie"""
+        with self.lock:
+            cpu = self.line(self.cpu[key]) if key in self.cpu else None
+            memory = self.line(self.memory[key]) if key in self.memory else None
+        if cpu is None:
+            return None
+        x = math.log(atoms)
+        memory_gb = math.exp(memory[0] * x + memory[1]) if memory is not None else None
+        return math.exp(cpu[0] * x + cpu[1]), memory_gb
+
+    @classmethod
+    def shared(cls, history_path: Path = None) -> "CostModel":
+        """Ein Modell pro Historie und Prozess, das beim Aufruf nur neue Zeilen nachlädt"""
+        history_path = Path(history_path) if history_path is not None else BASE_PATH / "orca_data.db"
+        with _shared_lock:
+            model = _shared_models.get(history_path)
+            if model is None:
+                model = _shared_models[history_path] = cls(RunHistory(history_path))
+        model.refresh()
+        return model
+
+
+_shared_models = {}
+_shared_lock = threading.Lock()
+
+
+def predict_time(atoms: int, basis_set: str, method: str, pno: str = "NORMALPNO", reserve_factor: float = 1.2, nprocs: int = 1):
+    """Vorhergesagte Wall-Clock-Zeit in Sekunden bei ``nprocs`` Kernen, ``None`` ohne Daten"""
+    prediction = CostModel.shared().predict(atoms, (method.upper(), basis_set.upper(), pno.upper()))
+    if prediction is None:
+        return None
+    return prediction[0] / nprocs * reserve_factor
@@ -0,0 +1,131 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+ENERGY = re.compile(rb"FINAL SINGLE POINT ENERGY \s+([-+]?\d+\.\d+)")
+TERMINATED = b"****ORCA TERMINATED NORMALLY****"
+INITIAL_GUESS = b"INITIAL GUESS DONE"
+TIMINGS = b"TIMINGS"
+# So viele Bytes vor ``offset`` werden gemerkt, um eine an Ort und Stelle neu geschriebene Datei zu erkennen
+TAIL = 256
+
+
+class OutputState:
+    """Was der Fortschrittscheck aus einer ORCA-Ausgabe braucht, bis ``offset`` gelesen.
+
+    ``partial`` ist die noch unvollständige letzte Zeile. Sie zählt für Fortschritt und
+    Terminierung mit (wie beim Lesen der ganzen Datei), wird aber erst verbucht, wenn ihr
+    Zeilenumbruch geschrieben ist. ``tail`` sind die letzten gelesenen Bytes vor ``offset``.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.stamp = None
+        self.inode = None
+        self.offset = 0
+        self.tail = b""
+        self.partial = b""
+        self.initial_guess_done = False
+        self.timings = 0
+        self.energy = None
+        self.terminated = False
+
+    @property
+    def progress_count(self) -> int:
+        """Wie ``get_progress_of_job``: ``INITIAL GUESS DONE`` als ganze Zeile plus jede Zeile mit ``TIMINGS``"""
+        initial_guess = self.initial_guess_done or self.partial == INITIAL_GUESS
+        return int(initial_guess) + self.timings + int(TIMINGS in self.partial)
+
+    @property
+    def finished(self) -> bool:
+        return self.terminated or TERMINATED in self.partial
+
+    @property
+    def last_energy(self):
+        match = None
+        for match in ENERGY.finditer(self.partial):
+            pass
+        return float(match.group(1)) if match else self.energy
+
+    def feed(self, data: bytes) -> None:
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        for line in lines:
+            if line == INITIAL_GUESS:
+                self.initial_guess_done = True
+            if TIMINGS in line:
+                self.timings += 1
+            if TERMINATED in line:
+                self.terminated = True
+            if b"FINAL SINGLE POINT ENERGY" in line:
+                match = ENERGY.search(line)
+                if match:
+                    self.energy = float(match.group(1))
+
+
+class OutputTailReader:
+    """Liest ORCA-Ausgaben inkrementell: pro Datei Byte-Offset und Parserzustand.
+
+    Bei unveränderter Größe und mtime wird die Datei gar nicht geöffnet, sonst nur der
+    angehängte Teil gelesen. Wird eine Datei kürzer, ersetzt (neue Inode), bekommt eine
+    ältere mtime oder stehen vor ``offset`` andere Bytes als beim letzten Lesen (Neustart,
+    der die Datei an Ort und Stelle kürzt und wieder darüber hinaus schreibt), beginnt der
+    Zustand von vorn.
+    """
+
+    def __init__(self, chunk_size: int = 8 * 1024**2) -> None:
+        self.chunk_size = chunk_size
+        self.states: dict[str, OutputState] = {}
+        self.lock = threading.Lock()
+        self.bytes_read = 0
+        self.skipped = 0
+
+    def state(self, path) -> OutputState:
+        with self.lock:
+            return self.states.setdefault(str(path), OutputState())
+
+    def read(self, path: Path) -> OutputState:
+        state = self.state(path)
+        with state.lock:
+            stat = os.stat(path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if stamp == state.stamp:
+                self.skipped += 1
+                return state
+            if (stat.st_ino != state.inode or stat.st_size < state.offset
+                    or (state.stamp is not None and stat.st_mtime_ns < state.stamp[0])):
+                state.reset()
+            with open(path, "rb") as f:
+                if state.tail:
+                    f.seek(state.offset - len(state.tail))
+                    if f.read(len(state.tail)) != state.tail:
+                        state.reset()
+                        f.seek(0)
+                else:
+                    f.seek(state.offset)
+                while True:
+                    data = f.read(self.chunk_size)
+                    if not data:
+                        break
+                    state.feed(data)
+                    state.offset += len(data)
+                    state.tail = (state.tail + data)[-TAIL:]
+                    self.bytes_read += len(data)
+            state.stamp = stamp
+            state.inode = stat.st_ino
+            return state
+
+    def forget(self, path) -> None:
+        with self.lock:
+            self.states.pop(str(path), None)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"files": len(self.states), "bytes_read": self.bytes_read, "skipped": self.skipped}
+
+
+shared_reader = OutputTailReader()
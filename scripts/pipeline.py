@@ -1,17 +1,26 @@
 import os
+import re
 import glob
+import shutil
 import logging
 import time
 from pathlib import Path
 import subprocess
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from openbabel import openbabel
 from database import Database
+from batch_dedup import BatchDeduplicator
+from molecule import Molecule
+from fragmentation import Fragmenter
+from manifest import TopicManifest, settings_hash
+from resources import ResourceModel
+from job_dag import Job, JobDAG, create_postprocess_script, read_job_id
+from scheduler_status import SchedulerStatus, shared_scheduler
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from xbpy.rdutil.io import read_molecules
-from rdkit.Chem.rdmolops import GetFormalCharge, GetMolFrags
-from rdkit.Chem.rdmolfiles import MolToXYZBlock
-from rdkit import Chem
+from rdkit.Chem.rdmolops import GetMolFrags
 import numpy as np
 
 # Configure logging
@@ -28,31 +37,21 @@ def track_time(func):
     return wrapper
 
 class XYZFileHandler:
-    def __init__(self, input_xyz: str) -> None:
-        self.input_xyz: str = input_xyz
-        self.atom_count: int
-        self.atom_data: list[str]
-        self.atom_count, self.atom_data = self.read_xyz_file()
+    def __init__(self, input_xyz) -> None:
+        """``input_xyz`` ist ein Dateipfad oder ein bereits eingelesenes ``Molecule``"""
+        self.molecule: Molecule = input_xyz if isinstance(input_xyz, Molecule) else Molecule.from_xyz(input_xyz)
+        self.atom_count: int = len(self.molecule)
 
-    @track_time
-    def read_xyz_file(self) -> tuple[int, list[str]]:
-        with open(self.input_xyz, "r") as xyz_file:
-            lines = xyz_file.readlines()
-        atom_count = int(lines[0].strip())
-        atom_data = [line.replace("\t", " ") for line in lines[2:2 + atom_count]]
-        return atom_count, atom_data
-
-    def write_fragment_xyz(self, fragment_atoms: list[str], output_filename: str) -> None:
-        header = f"{len(fragment_atoms)}\nFragment generated by split_xyz\n"
-        with open(output_filename, 'w') as output_file:
-            output_file.write(header)
-            output_file.writelines(fragment_atoms)
-
-    def split_xyz(self, fragments_list: list[list[int]], output_prefix: str, name="fragment") -> None:
+    def write_fragment_xyz(self, fragment: Molecule, output_filename: str) -> None:
+        fragment.write_xyz(output_filename, "Fragment generated by split_xyz")
+
+    def split_xyz(self, fragments_list: list, output_prefix: str, name="fragment") -> dict:
+        fragments = {}
         for i, fragment_indices in enumerate(fragments_list):
-            fragment_atoms = [self.atom_data[idx] for idx in fragment_indices]
             output_filename = f"{output_prefix}/{name}_{i + 1:03}.xyz"
-            self.write_fragment_xyz(fragment_atoms, output_filename)
+            fragments[output_filename] = self.molecule.subset(fragment_indices)
+            self.write_fragment_xyz(fragments[output_filename], output_filename)
+        return fragments
 
 
 class Mol2FileHandler:
@@ -74,8 +73,10 @@ class Mol2FileHandler:
 
 
 class ORCAInputFileCreator:
-    def __init__(self, file: str, header_in=None) -> None:
+    def __init__(self, file: str, header_in=None, fragmenter: Fragmenter = None) -> None:
         self.file: str = file
+        self.header_in = header_in
+        self.fragmenter = fragmenter
         self.mols: dict[Mol] = {}
         self.header: str = header_in or """! DLPNO-CCSD(T) def2-svp def2-svp/C DEF2/J RIJCOSX veryTIGHTSCF TIGHTPNO LED
 
@@ -92,36 +93,36 @@ end"""
         os.makedirs(self.xyz_folder, exist_ok=True)
         self.frag_len: list[int] = []
 
-    def create_inp_file_content(self, charge: int, npros: int, xyz_file: str, fragment_lines: list[str]) -> str:
-        inp_content = f"{self.header}{npros}\nend\n*XYZfile {charge} 1 {xyz_file}\n\n"
-        inp_content += "".join(fragment_lines)
-        return inp_content
-
-    def fragment_cleaning(self, xyz_file: str, fragment_groups: list[list[int]]) -> list[list[int]]:
+    def fragment_cleaning(self, molecule: Molecule, fragment_groups: list[np.ndarray]) -> list[np.ndarray]:
         """
         sortiert fragmente so das elemente mit doppelten buchstaben in den einstellungen fragmenten ist
         """
-
-        atom_names = []
-        with open(xyz_file, "r") as file:
-            lines = file.readlines()[2:]
-            atom_names = [line.split()[0] for line in lines]
-
-        for i, atom in enumerate(atom_names):
-            if len(atom) > 1:
-                for j, fragment in enumerate(fragment_groups):
-                    for atom in fragment:
-                        if atom == i:
-                            fragment_groups.insert(0, fragment_groups.pop(j))
-                            break
+        owner = np.full(len(molecule), -1)
+        for j, fragment in enumerate(fragment_groups):
+            owner[fragment] = j
+        # Fragment des letzten zweibuchstabigen Atoms nach vorne, davor das des vorletzten usw.
+        touched = []
+        for j in owner[molecule.multi_letter_atoms()][::-1]:
+            if j >= 0 and j not in touched:
+                touched.append(j)
+        order = touched + [j for j in range(len(fragment_groups)) if j not in touched]
+        fragment_groups[:] = [fragment_groups[j] for j in order]
         return fragment_groups
-    
-    @track_time
-    def create_inp_files(self, file_cache) -> None:
+
+    def prepare(self) -> list:
+        """Konvertiert, fragmentiert, teilt auf und schreibt die .inp-Dateien im Topic-Ordner.
+
+        Gibt die einzelnen Rechnungen (subsys_* und Supersystem) zurück, ohne die Datenbank zu fragen.
+        """
         if self.file.endswith(".mol2"):
             Mol2FileHandler(self.file).convert_mol2_to_xyz(self.xyz_file)
-        self.mols[self.xyz_file] = Mol(self.xyz_file, self.mols)
-        self.fragments = self.mols[self.xyz_file].get_fragments()
+        if self.fragmenter is None:
+            self.mols[self.xyz_file] = Mol(self.xyz_file, self.mols)
+            self.fragments = self.mols[self.xyz_file].get_fragments()
+            self.molecule = self.mols[self.xyz_file].get_molecule()
+        else:
+            self.molecule, self.fragments = self.apply_fragmenter()
+        self.subsystems = {self.xyz_file: self.molecule}
 
         fragment_lines = self.handle_fragments()
 
@@ -129,33 +130,57 @@ end"""
         # alle die mit subsys anfangen sortieren alle andetren aussortieren
         xyz_files = [file for file in xyz_files if "subsys_" in file]
         xyz_files.append(self.xyz_file)
-        if not xyz_files:
-            return
+        calculations = []
         for i, xyz_file_i in enumerate(xyz_files):
-            mol = self.mols[xyz_file_i]
-            self.create_single_inp_file(mol, xyz_file_i, Path(xyz_file_i).parent, self.frag_len[i], fragment_lines[i])
-            path = Database.process_candidate(Path(xyz_file_i.split(".")[0]), file_cache)
-            if path:
-                self.create_single_inp_file(mol, path, Path(path).parents[1], self.frag_len[i], fragment_lines[i])
-                sh_path = ShellScriptCreator.single_sh_script_erstellen(path, Path(path).parents[1], i, self.frag_len[i])
-                # subprocess.run(["sbatch", sh_path])
+            molecule = self.subsystems[xyz_file_i]
+            calculation = Calculation(xyz_file_i, i, molecule.charge, self.frag_len[i], fragment_lines[i], self.header, len(molecule))
+            calculation.write_inp(xyz_file_i, Path(xyz_file_i).parent)
+            calculations.append(calculation)
+        return calculations
+
+    @track_time
+    def create_inp_files(self, file_cache=None) -> None:
+        manifest = TopicManifest.for_file(self.file)
+        settings = settings_hash(self.header_in, self.fragmenter, None)
+        if manifest.unchanged(self.file, settings):
+            logging.info(f"{self.file} is unchanged since the last run, skipping")
+            return
+        calculations = self.prepare()
+        for calculation in calculations:
+            calculation.submit(file_cache)
+        manifest.record(self.file, settings, [calculation.job_dir for calculation in calculations])
+        manifest.save()
+
+    def apply_fragmenter(self) -> tuple[Molecule, str]:
+        """Fragmente über den Fragmenter statt über GetMolFrags.
+
+        Bleiben Atome außen vor (``shell``, ``nearest``), wird die Struktur auf Ligand und
+        Umgebung zugeschnitten: das Original bleibt als ``NAME_full.xyz``, ``NAME.xyz`` ist
+        danach der Ausschnitt, den Supersystem, LED-Auswertung und Visualisierung verwenden.
+        """
+        full_xyz = self.xyz_file.replace(".xyz", "_full.xyz")
+        source = full_xyz if os.path.exists(full_xyz) else self.xyz_file
+        self.mols[source] = Mol(source, self.mols)
+        molecule = self.mols[source].get_molecule()
+        fragments = self.fragmenter.partition(molecule)
+        if sum(len(fragment) for fragment in fragments) < len(molecule):
+            if source != full_xyz:
+                shutil.copyfile(self.xyz_file, full_xyz)
+            kept, fragments = Fragmenter.trim(fragments)
+            molecule = molecule.subset(kept)
+            molecule.write_xyz(self.xyz_file, f"{self.fragmenter.strategy} cut-out of {os.path.basename(full_xyz)}")
+        return molecule, Fragmenter.fragment_string(fragments)
 
     def handle_fragments(self) -> list[str]:
         subsys_groups = self.parse_fragments(self.fragments)
         self.calculate_frag_len(subsys_groups)
         for fragment_groups in subsys_groups:
-            fragment_groups = self.fragment_cleaning(self.xyz_file, fragment_groups)
-
-            xyz_handler = XYZFileHandler(self.xyz_file)
-        frag_list = []
-        for groups in subsys_groups[:-1]:
-            group_list = []
-            for group in groups:
-                group_list.extend(group)
-            frag_list.append(group_list)
-        xyz_handler.split_xyz(subsys_groups[-1], self.xyz_folder)
-        xyz_handler.split_xyz(frag_list, self.xyz_folder, name="subsys")
+            self.fragment_cleaning(self.molecule, fragment_groups)
 
+        xyz_handler = XYZFileHandler(self.molecule)
+        frag_list = [np.concatenate(groups) for groups in subsys_groups[:-1]]
+        xyz_handler.split_xyz(subsys_groups[-1], self.xyz_folder)
+        self.subsystems.update(xyz_handler.split_xyz(frag_list, self.xyz_folder, name="subsys"))
 
         fragment_lines = [self.create_fragment_lines(groups) for groups in subsys_groups]
         return fragment_lines
@@ -174,7 +199,7 @@ end"""
                         fragment_indices.extend(range(start-1, end))
                     else:
                         fragment_indices.append(int(part)-1)
-                fragment_groups.append(fragment_indices)
+                fragment_groups.append(np.array(fragment_indices, dtype=int))
             if fragment_groups:
                 subsys_groups.append(fragment_groups)
                 supersys.extend(fragment_groups)
@@ -185,35 +210,265 @@ end"""
     def create_fragment_lines(self, fragment_groups: list[list[int]]) -> list[str]:
         logging.info("Creating fragment lines")
         fragment_lines = ["%geom\n Fragments\n"]
-        all = []
-        for group in fragment_groups:
-            all.extend(group)
-        all_sorted = sorted(all)
-        index_mapping = {old_index: new_index for new_index, old_index in enumerate(all_sorted)}
+        all_sorted = np.sort(np.concatenate(fragment_groups))
         for i, group in enumerate(fragment_groups, start=1):
-            group = [index_mapping[old_index] for old_index in group]
+            group = np.searchsorted(all_sorted, group)
             fragment_atoms = " ".join(map(str, group))
             fragment_lines.append(f"  {i} {{{fragment_atoms}}} end\n")
         fragment_lines.append(" end\nend\n")
         return fragment_lines
 
-    def create_single_inp_file(self, mol, xyz_file_i: str, base: Path, frag_len: int, fragment_line: str) -> Path:
+    def calculate_frag_len(self, subsys_groups: list[list]) -> None:
+        for fragments_group in subsys_groups:
+            self.frag_len.append(min(sum(len(group) for group in fragments_group), 48))
+
+
+class Calculation:
+    """Eine ORCA-Rechnung (Supersystem oder subsys_*) einer Struktur, fertig zum Einreichen"""
+
+    def __init__(self, xyz_file: str, index: int, charge: int, frag_len: int, fragment_line: list[str], header: str, atom_count: int = None) -> None:
+        self.xyz_file = xyz_file
+        self.index = index
+        self.charge = charge
+        self.frag_len = frag_len
+        self.fragment_line = fragment_line
+        self.header = header
+        self.atom_count = atom_count
+        self.nprocs = frag_len
+        self.maxcore = None
+        self.guess = None
+
+    @property
+    def job_dir(self) -> Path:
+        return Path(self.xyz_file.split(".")[0])
+
+    def inp_content(self, xyz_file: str) -> str:
+        header = self.header
+        fragment_line = self.fragment_line
+        if self.guess is not None:
+            header = self.guess.header(header)
+            fragment_line = self.guess.remap_fragment_line(fragment_line)
+        if self.maxcore:
+            if re.search(r"%maxcore\s+\d+", header):
+                header = re.sub(r"%maxcore\s+\d+", f"%maxcore {self.maxcore}", header)
+            else:
+                header = header.replace("%pal", f"%maxcore {self.maxcore}\n\n%pal", 1)
+        inp_content = f"{header}{self.nprocs}\nend\n*XYZfile {self.charge} 1 {xyz_file}\n\n"
+        inp_content += "".join(fragment_line)
+        return inp_content
+
+    def write_inp(self, xyz_file_i: str, base: Path) -> Path:
         logging.info(f"Creating single ORCA input file for: {xyz_file_i}")
-        charge = mol.get_charge()
-        inp_content = self.create_inp_file_content(charge, frag_len, xyz_file_i, fragment_line)
+        inp_content = self.inp_content(xyz_file_i)
         base_name = os.path.splitext(os.path.basename(xyz_file_i))[0]
         base_path = base / base_name
         inp_path = base_path / f"{base_name}.inp"
         os.makedirs(base_path, exist_ok=True)
-        
+
         with open(inp_path, 'w') as inp_file:
             inp_file.write(inp_content)
-        
+
         return inp_path
 
-    def calculate_frag_len(self, subsys_groups: list[list]) -> None:
-        for fragments_group in subsys_groups:
-            self.frag_len.append(min(sum(len(group) for group in fragments_group), 48))
+    def size(self, resource_model=None) -> tuple[int, int, str]:
+        """nprocs, Speicher und Laufzeit aus dem ResourceModel, sonst nach der bisherigen Faustregel"""
+        resources = None
+        if resource_model is not None and self.atom_count:
+            resources = resource_model.predict(self.atom_count, self.header, self.frag_len)
+        if resources is None:
+            resources = (*ShellScriptCreator.resources(self.frag_len), None)
+        self.nprocs, mem, time, self.maxcore = resources
+        return self.nprocs, mem, time
+
+    def submit(self, file_cache=None, job_array=None, resource_model=None, guess_tolerance: float = None):
+        """Gegen die Datenbank prüfen; nur neue Rechnungen bekommen .inp und .sh im Datenbankeintrag.
+
+        Mit ``job_array`` (JobArraySubmitter) wird die Rechnung zusätzlich für ein Job-Array vorgemerkt.
+        Mit ``guess_tolerance`` startet sie von den Orbitalen des nächsten fast gleichen Eintrags (MORead).
+        """
+        path, self.guess = Database.find_or_insert(self.job_dir, file_cache, guess_tolerance)
+        if path:
+            resources = self.size(resource_model)
+            self.write_inp(path, Path(path).parents[1])
+            sh_path = ShellScriptCreator.single_sh_script_erstellen(path, Path(path).parents[1], self.index, self.nprocs, resources=resources)
+            # subprocess.run(["sbatch", sh_path])
+            if job_array is not None:
+                job_array.add(path, *resources)
+        return path
+
+    def link_to(self, other: "Calculation", file_cache=None) -> None:
+        """Symlinks auf den Datenbankeintrag einer gleichen Rechnung aus demselben Upload setzen"""
+        out_link = other.job_dir / f"{other.job_dir.name}.out"
+        db = Database(self.job_dir, file_cache)
+        with db.index.transaction():
+            db.create_symlink(Path(os.readlink(out_link)))
+
+
+def prepare_file(file: str, header_in=None, fragmenter: Fragmenter = None) -> list:
+    """Worker für den Prozesspool: eine hochgeladene Struktur vorbereiten"""
+    return ORCAInputFileCreator(str(file), header_in, fragmenter).prepare()
+
+
+def create_inp_files_batch(files: list, header_in=None, file_cache=None, workers: int = None, progress_callback=None, job_array=None, resource_model=None, backend=None, fragmenter: Fragmenter = None,
+                          guess_tolerance: float = None) -> tuple[dict, dict]:
+    """Bereitet alle Strukturen eines Uploads parallel vor und reicht jede gleiche Rechnung nur einmal ein.
+
+    Konvertierung und Fragmentierung laufen in einem Prozesspool, Dedup, Datenbank und
+    ``.sh``-Dateien im Hauptprozess. Ein Fehler betrifft nur die eine Struktur.
+    ``progress_callback(done, total, file)`` wird nach jeder vorbereiteten Struktur aufgerufen.
+    Mit ``job_array`` (JobArraySubmitter) werden die neuen Rechnungen als Job-Arrays abgeschickt.
+    Ohne ``resource_model`` wird es aus den fertigen Rechnungen der Datenbank trainiert.
+    Mit ``backend`` (z.B. ``SlurmBackend``) wird pro Struktur ein JobDAG mit Nachbearbeitung abgeschickt.
+    Mit ``fragmenter`` (Fragmenter) wird über Nachbarsuche statt über GetMolFrags fragmentiert.
+    Mit ``guess_tolerance`` (RMSD) starten neue Rechnungen von den Orbitalen fast gleicher Einträge.
+    Strukturen, die laut ``topic/.manifest.json`` unverändert sind, werden übersprungen.
+
+    Gibt ``(duplicates, errors)`` zurück: Duplikat-Ordner -> Ordner der eingereichten Rechnung
+    und Datei/Ordner -> Fehlermeldung.
+    """
+    settings = settings_hash(header_in, fragmenter, guess_tolerance)
+    manifests = {}
+    changed = []
+    for file in files:
+        manifest = TopicManifest.for_file(file)
+        manifest = manifests.setdefault(manifest.topic, manifest)
+        if not manifest.unchanged(file, settings):
+            changed.append(str(file))
+    logging.info(f"Manifest: {len(files) - len(changed)} of {len(files)} structures unchanged, skipped")
+    files = changed
+    if not files:
+        return {}, {}
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    prepared = [None] * len(files)
+    errors = {}
+
+    def finished(i, done, result=None, error=None):
+        if error is None:
+            prepared[i] = result
+        else:
+            logging.error(f"Preparing {files[i]} failed: {error}")
+            errors[files[i]] = str(error)
+        if progress_callback is not None:
+            progress_callback(done, len(files), files[i])
+
+    if workers <= 1:
+        for i, file in enumerate(files):
+            try:
+                finished(i, i + 1, prepare_file(file, header_in, fragmenter))
+            except Exception as e:
+                finished(i, i + 1, error=e)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {pool.submit(prepare_file, file, header_in, fragmenter): i for i, file in enumerate(files)}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    finished(futures[future], done, future.result())
+                except Exception as e:
+                    finished(futures[future], done, error=e)
+
+    calculations = [calculation for result in prepared if result for calculation in result]
+    duplicates, submit_errors = submit_calculations(calculations, file_cache, job_array, resource_model, backend, guess_tolerance)
+    errors.update(submit_errors)
+    if "job_array" not in errors and "job_dag" not in errors:
+        for file, result in zip(files, prepared):
+            if result and not any(str(calculation.job_dir) in errors for calculation in result):
+                manifests[TopicManifest.for_file(file).topic].record(file, settings, [calculation.job_dir for calculation in result])
+        for manifest in manifests.values():
+            manifest.save()
+    return duplicates, errors
+
+
+@track_time
+def submit_calculations(calculations: list, file_cache=None, job_array=None, resource_model=None, backend=None, guess_tolerance: float = None) -> tuple[dict, dict]:
+    """Dedup, Datenbank und .inp/.sh für alle Rechnungen; mit ``backend`` zusätzlich der JobDAG"""
+    if not calculations:
+        return {}, {}
+    db = Database(calculations[0].job_dir, file_cache)
+    if resource_model is None:
+        resource_model = ResourceModel.from_database(db)
+    deduplicator = BatchDeduplicator(db)
+    unique, duplicates = deduplicator.cluster(calculations)
+    errors = {}
+    new_entries = set()
+    for calculation in unique:
+        try:
+            path = calculation.submit(file_cache, job_array, resource_model, guess_tolerance)
+            if path:
+                new_entries.add(Path(path).parent)
+        except Exception as e:
+            logging.error(f"Submitting {calculation.job_dir} failed: {e}")
+            errors[str(calculation.job_dir)] = str(e)
+    for calculation, representative in duplicates.items():
+        if str(representative.job_dir) in errors:
+            errors[str(calculation.job_dir)] = errors[str(representative.job_dir)]
+            continue
+        try:
+            calculation.link_to(representative, file_cache)
+        except Exception as e:
+            logging.error(f"Linking {calculation.job_dir} failed: {e}")
+            errors[str(calculation.job_dir)] = str(e)
+    if job_array is not None:
+        try:
+            job_array.submit()
+        except Exception as e:
+            logging.error(f"Submitting the job arrays failed: {e}")
+            errors["job_array"] = str(e)
+    if backend is not None:
+        try:
+            build_job_dag(db, calculations, new_entries, errors, job_array is not None).submit(backend)
+        except Exception as e:
+            logging.error(f"Submitting the job DAG failed: {e}")
+            errors["job_dag"] = str(e)
+    logging.info(f"Batch: {len(calculations)} calculations, {len(unique)} unique, {len(duplicates)} duplicates within the upload")
+    duplicates = {str(calc.job_dir): str(rep.job_dir) for calc, rep in duplicates.items()}
+    return duplicates, errors
+
+
+def build_job_dag(db: Database, calculations: list, new_entries: set, errors: dict, with_arrays: bool = False,
+                  scheduler: SchedulerStatus = shared_scheduler) -> JobDAG:
+    """Pro Struktur: Supersystem und subsys_* zuerst, dann postprocess.py (afterok auf alle).
+
+    Neue Datenbankeinträge werden als Jobs des DAG abgeschickt (außer sie laufen schon als
+    Job-Array). Für Einträge, die schon vorher liefen, wird auf deren ``NAME.jobid`` gewartet,
+    sofern sacct den Job noch als wartend oder laufend kennt. Ist ein Eintrag weder fertig noch
+    in der Queue, gibt es kein postprocess für die Struktur, sondern einen Eintrag in ``errors``.
+    """
+    dag = JobDAG()
+    structures = defaultdict(list)
+    entries = {}
+    for calculation in calculations:
+        structures[calculation.job_dir.parent].append(calculation)
+        entries[calculation] = Path(os.readlink(calculation.job_dir / f"{calculation.job_dir.name}.out")).parent
+    waiting = {
+        entry: read_job_id(entry) for entry in set(entries.values())
+        if not (entry in new_entries and not with_arrays) and not db.is_finished(entry.name)
+    }
+    scheduler.query([job_id for job_id in waiting.values() if job_id])
+    for folder, members in structures.items():
+        if any(str(calculation.job_dir) in errors for calculation in members):
+            logging.warning(f"Not scheduling post-processing for {folder}, a calculation failed")
+            continue
+        dependencies = []
+        external = []
+        problems = []
+        for calculation in members:
+            entry = entries[calculation]
+            if entry in new_entries and not with_arrays:
+                dependencies.append(dag.jobs.get(entry.name) or dag.add(Job(entry.name, entry / f"{entry.name}.sh")))
+            elif entry in waiting:
+                job_id = waiting[entry]
+                state = scheduler.dependency_state(job_id) if job_id else "not submitted"
+                if state in ("active", "unknown"):
+                    external.append(job_id)
+                elif state != "completed" or not db.is_finished(entry.name):
+                    problems.append(f"{entry.name} is neither finished nor queued ({state})")
+        if problems:
+            logging.warning(f"Not scheduling post-processing for {folder}: {'; '.join(problems)}")
+            errors[str(folder)] = "; ".join(problems)
+            continue
+        dag.add(Job(f"postprocess_{folder.parent.name}_{folder.name}", create_postprocess_script(folder), dependencies, external))
+    return dag
+
 
 class ShellScriptCreator:
     def __init__(self, mem: int, nprocs: int, time: str, path: str, name: str, base: Path):
@@ -250,12 +505,17 @@ $orca $workspace_directory/$name/$name.inp > $workspace_directory/$name/$name.ou
         return script_content
 
     @staticmethod
-    def single_sh_script_erstellen(path: str, base: Path, i: int, frag_len: int, time: str = "20:00:00", mem: int = 720) -> Path:
+    def resources(frag_len: int, time: str = "20:00:00", mem: int = 720) -> tuple[int, int, str]:
+        """nprocs, Speicher in GB und Laufzeit einer Rechnung"""
+        return frag_len, int(mem * frag_len / 48), time
+
+    @staticmethod
+    def single_sh_script_erstellen(path: str, base: Path, i: int, frag_len: int, time: str = "20:00:00", mem: int = 720, resources: tuple = None) -> Path:
+        """``resources`` (nprocs, Speicher, Laufzeit), z.B. vom ResourceModel, ersetzt die Faustregel"""
         name = Path(path).stem
         total_path = base / f"{name}/{name}.sh"
-        script_content = ShellScriptCreator(
-            int(mem * frag_len / 48), frag_len, time, path, name, base
-        ).create_sh_script_content()
+        nprocs, mem, time = resources or ShellScriptCreator.resources(frag_len, time, mem)
+        script_content = ShellScriptCreator(mem, nprocs, time, path, name, base).create_sh_script_content()
         with open(total_path, "w") as file:
             file.write(script_content)
         return total_path
@@ -266,6 +526,7 @@ class Mol:
         self.filename: str = filename
         self.mols[self.filename] = self
         self.mol = None
+        self.molecule: Molecule = None
         self.charge: int = None
         self.fragments: str = None
         if filename in self.mols:
@@ -275,40 +536,26 @@ class Mol:
         mol = read_molecules(self.filename)
         self.mol = next(mol)
 
+    def get_molecule(self) -> Molecule:
+        """Einmal aus dem RDKit-Molekül erzeugte Arrays (Elemente, Koordinaten, Formalladungen)"""
+        if self.molecule is None:
+            if self.mol is None:
+                self.read_mol()
+            self.molecule = Molecule.from_rdkit(self.mol)
+        return self.molecule
+
     def get_charge(self) -> int:
-        if self.mol is None:
-            self.read_mol()
-        self.charge = GetFormalCharge(self.mol)
+        self.charge = self.get_molecule().charge
         return self.charge
     
     def get_fragments(self) -> str:
         if self.fragments is not None:
             return self.fragments
-        if self.mol is None:
-            self.read_mol()
-        mol_block = MolToXYZBlock(self.mol).strip().split('\n')[2:]
-        coords = np.mean([np.array(atom.split()[1:], dtype=float) for atom in mol_block], axis=0)
-        distances = [np.linalg.norm(np.array(atom.split()[1:], dtype=float) - coords) for atom in mol_block]
-        closest_atom = np.argmin(distances) + 1
+        closest_atom = self.get_molecule().closest_to_centroid() + 1
 
         frags = [list(frag) for frag in GetMolFrags(self.mol, sanitizeFrags=False, asMols=False)]
-        mols = [mol for mol in GetMolFrags(self.mol, sanitizeFrags=False, asMols=True)]
         closest_frag_index = next(i for i, frag in enumerate(frags) if closest_atom in frag)
         frags.insert(0, frags.pop(closest_frag_index))
-        mols.insert(0, mols.pop(closest_frag_index))
-
-        ligand_mol = mols[0]
-        combined_mol = mols[1]
-        for mol in mols[2:]:
-            combined_mol = Chem.CombineMols(combined_mol, mol)
-        
-        ligand_path = Path(self.filename).parent / "subsys_001.xyz"
-        self.mols[str(ligand_path)] = Mol(ligand_path, self.mols)
-        self.mols[str(ligand_path)].mol = ligand_mol
-
-        combined_path = Path(self.filename).parent / "subsys_002.xyz"
-        self.mols[str(combined_path)] = Mol(combined_path, self.mols)
-        self.mols[str(combined_path)].mol = combined_mol
 
         frag_str = ",".join(" ".join(str(atom + 1) for atom in frag) for frag in frags)
         frag_str = frag_str.replace(",", "#", 1)
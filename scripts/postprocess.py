@@ -0,0 +1,53 @@
+"""Nachbearbeitung einer Struktur, sobald ihre Rechnungen fertig sind.
+
+LED-Auswertung (LEDExtractor), Visualisierung (csv_to_viz.extract) und das Zusammenführen
+in die SDF-Datei des Topics. Läuft als letzter Job des JobDAG einer Struktur:
+
+    python scripts/postprocess.py calculations/topic/structure
+"""
+import argparse
+import fcntl
+import logging
+from pathlib import Path
+from rdkit import Chem
+from LED_extraction import LEDExtractor
+from csv_to_viz import extract
+from xlsx_to_sdf import SdfXyzMerger
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def merge_into_topic_sdf(folder: Path) -> None:
+    """Ergebnisse der Struktur in ``topic/topic.sdf`` und ``topic/topic.py`` übernehmen"""
+    topic = folder.parent
+    sdf_file = topic / f"{topic.name}.sdf"
+    viz_file = topic / f"{topic.name}.py"
+    # mehrere Strukturen eines Topics können gleichzeitig fertig werden
+    with open(topic / ".sdf.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        mols = []
+        if sdf_file.exists() and sdf_file.stat().st_size > 0:
+            mols = [mol for mol in Chem.SDMolSupplier(str(sdf_file), removeHs=False) if mol is not None]
+        viz = viz_file.read_text() if viz_file.exists() else ""
+        mols, viz = SdfXyzMerger(folder / f"{folder.name}.xyz", folder, mols, viz).run()
+        writer = Chem.SDWriter(str(sdf_file))
+        for mol in mols:
+            writer.write(mol)
+        writer.close()
+        viz_file.write_text(viz)
+
+
+def postprocess(folder: Path) -> None:
+    folder = Path(folder)
+    logging.info(f"Post-processing {folder}")
+    LEDExtractor(folder).extract_LED_energy()
+    extract(folder)
+    merge_into_topic_sdf(folder)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LED-Auswertung, Visualisierung und SDF einer Struktur")
+    parser.add_argument("folders", nargs="+", type=Path)
+    args = parser.parse_args()
+    for folder in args.folders:
+        postprocess(folder)
@@ -0,0 +1,65 @@
+import math
+from orca_prediction import CostModel, method_key, parse_run_time, parse_seff
+
+# Stufen für nprocs, damit gleich große Rechnungen in dasselbe Job-Array fallen
+NPROCS_STEPS = (1, 2, 4, 8, 12, 16, 24, 32, 48)
+
+
+def format_time(seconds: float) -> str:
+    """Sekunden in das Slurm-Format ``[D-]HH:MM:SS``"""
+    seconds = int(math.ceil(seconds))
+    days, rest = divmod(seconds, 86400)
+    text = f"{rest // 3600:02}:{rest % 3600 // 60:02}:{rest % 60:02}"
+    return f"{days}-{text}" if days else text
+
+
+class ResourceModel:
+    """Sizes nprocs, memory, wall time and ``%maxcore`` from finished runs in the database.
+
+    CPU time and peak memory come from the ``CostModel`` (power laws of the atom count per
+    method, basis and PNO setting). A prediction is multiplied by ``safety``; without
+    enough history ``predict`` returns ``None`` and the caller keeps the old heuristic
+    (``ShellScriptCreator.resources``).
+    """
+
+    def __init__(self, cost_model: CostModel = None, safety: float = 1.5, min_runs: int = 3, max_nprocs: int = 48,
+                 node_memory: int = 720, target_hours: float = 12.0, max_hours: float = 72.0) -> None:
+        self.cost_model = cost_model if cost_model is not None else CostModel(min_runs=min_runs)
+        self.safety = safety
+        self.max_nprocs = max_nprocs
+        self.node_memory = node_memory
+        self.target_hours = target_hours
+        self.max_hours = max_hours
+
+    @classmethod
+    def from_database(cls, db, **kwargs) -> "ResourceModel":
+        """Neue fertige Rechnungen in die Historie (``orca_data.db``) übernehmen und das geteilte Modell nutzen.
+
+        Nur Einträge, die noch nicht in der Historie stehen, werden gelesen (``RunHistory.process_new``).
+        """
+        cost_model = CostModel.shared(db.base.parent / "orca_data.db")
+        with cost_model.lock:
+            if cost_model.history.process_new(db.base):
+                cost_model.refresh()
+        return cls(cost_model, **kwargs)
+
+    def predict(self, atom_count: int, header: str, frag_len: int):
+        """nprocs, Speicher (GB), Laufzeit und ``%maxcore`` (MB) für eine neue Rechnung, ``None`` ohne Historie"""
+        prediction = self.cost_model.predict(atom_count, method_key(header))
+        if prediction is None:
+            return None
+        cpu_seconds, memory = prediction
+        cpu_seconds *= self.safety
+        wanted = cpu_seconds / (self.target_hours * 3600)
+        nprocs = next((n for n in NPROCS_STEPS if n >= wanted and n <= self.max_nprocs), self.max_nprocs)
+        nprocs = min(nprocs, max(frag_len, 1))
+        wall = min(cpu_seconds / nprocs, self.max_hours * 3600)
+        # volle Stunden, damit gleiche Rechnungen dieselbe Ressourcenklasse bekommen
+        time = format_time(max(math.ceil(wall / 3600), 1) * 3600)
+        if memory is not None:
+            mem = int(min(max(math.ceil(memory * self.safety / 10) * 10, 10), self.node_memory))
+        else:
+            mem = int(self.node_memory / self.max_nprocs * nprocs)
+        # ORCA bekommt 75 % des Speichers pro Kern, der Rest bleibt für das Betriebssystem
+        maxcore = int(mem * 1024 * 0.75 / nprocs)
+        return nprocs, mem, time, maxcore
@@ -0,0 +1,133 @@
+import logging
+import os
+import re
+import shlex
+import subprocess
+import threading
+import time
+from pathlib import Path
+from job_dag import read_job_id
+from orca_prediction import parse_slurm_time
+from resources import format_time
+
+# Befehl für sacct, z.B. ORCA_LED_SACCT="ssh login sacct" oder ein Stub für Tests
+SACCT = os.environ.get("ORCA_LED_SACCT", "sacct")
+SLURM_JOB_ID = re.compile(r"^\d+(_\d+)?$")
+PENDING_ARRAY = re.compile(r"^(\d+)_\[(.+)\]$")
+ACTIVE_STATES = ("PENDING", "RUNNING", "REQUEUED", "REQUEUE_HOLD", "CONFIGURING", "COMPLETING", "SUSPENDED", "RESIZING")
+
+
+def expand_array_ids(job_id: str) -> list[str]:
+    """``123_[1-3,7%2]`` (noch wartende Array-Tasks) in ``123_1``, ``123_2``, ``123_3``, ``123_7``"""
+    match = PENDING_ARRAY.match(job_id)
+    if not match:
+        return [job_id]
+    ids = []
+    for part in match.group(2).split("%")[0].split(","):
+        start, _, end = part.partition("-")
+        ids.extend(f"{match.group(1)}_{task}" for task in range(int(start), int(end or start) + 1))
+    return ids
+
+
+class SchedulerStatus:
+    """Slurm-Zustand vieler Jobs mit einem ``sacct``-Aufruf, zwischengespeichert für ``ttl`` Sekunden.
+
+    Die Job-IDs stehen in ``NAME.jobid`` der Datenbankeinträge (JobArraySubmitter, JobDAG).
+    Schlägt ``sacct`` fehl oder kennt einen Job nicht, liefert ``job_status`` ``None`` und der
+    Aufrufer parst wie bisher ``NAME_out.out``. Nach einem Fehler wird ``ttl`` Sekunden nicht
+    erneut gefragt.
+    """
+
+    def __init__(self, command: str = None, ttl: float = 60.0, timeout: float = 30.0) -> None:
+        self.command = shlex.split(command or SACCT)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.cache: dict[str, tuple] = {}
+        self.failed_until = 0.0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def query(self, job_ids: list) -> None:
+        """Zustände aller noch nicht (oder nicht mehr frisch) bekannten Jobs in einem Aufruf holen"""
+        now = time.time()
+        with self.lock:
+            if now < self.failed_until:
+                return
+            missing = sorted({job_id for job_id in job_ids if SLURM_JOB_ID.match(job_id)
+                              and (job_id not in self.cache or now - self.cache[job_id][0] > self.ttl)})
+        if not missing:
+            return
+        command = [*self.command, "--noheader", "--parsable2", "--allocations",
+                   "--format=JobID,State,TotalCPU", f"--jobs={','.join(missing)}"]
+        try:
+            self.calls += 1
+            result = subprocess.run(command, capture_output=True, text=True, check=True, timeout=self.timeout)
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning(f"sacct failed, falling back to the Slurm output files: {e}")
+            with self.lock:
+                self.failed_until = now + self.ttl
+            return
+        with self.lock:
+            # von sacct nicht gemeldete Jobs ebenfalls für ttl merken, als unbekannt
+            for job_id in missing:
+                self.cache[job_id] = (now, None, None)
+            for line in result.stdout.splitlines():
+                fields = line.strip().split("|")
+                if len(fields) < 3:
+                    continue
+                state = fields[1].split()[0] if fields[1].strip() else None
+                for job_id in expand_array_ids(fields[0]):
+                    self.cache[job_id] = (now, state, fields[2])
+
+    def state(self, job_id: str):
+        """``(State, TotalCPU)`` aus dem Cache oder ``None``"""
+        with self.lock:
+            entry = self.cache.get(job_id)
+        return entry[1:] if entry is not None and entry[1] is not None else None
+
+    def dependency_state(self, job_id: str) -> str:
+        """Ob ``afterok:job_id`` noch erfüllbar ist, nach ``query``.
+
+        ``"active"`` (wartet oder läuft), ``"completed"``, ``"failed"``, ``"gone"`` (sacct kennt den
+        Job nicht mehr) oder ``"unknown"`` (sacct nicht erreichbar, kein Slurm-Job).
+        """
+        with self.lock:
+            entry = self.cache.get(job_id)
+        if entry is None:
+            return "unknown"
+        state = entry[1]
+        if state is None:
+            return "gone"
+        if state in ACTIVE_STATES:
+            return "active"
+        return "completed" if state == "COMPLETED" else "failed"
+
+    def job_status(self, job_id: str):
+        """(Status, Laufzeit) im Vokabular von ``check_slurm_job_status_and_duration`` oder ``None``"""
+        entry = self.state(job_id) if job_id else None
+        if entry is None:
+            return None
+        state, total_cpu = entry
+        if state == "TIMEOUT":
+            return "Failed: Time Limit", None
+        if state == "CANCELLED":
+            return "Cancelled", None
+        if state == "OUT_OF_MEMORY":
+            return "memory", None
+        if state in ("PENDING", "REQUEUED", "CONFIGURING"):
+            return "Not Started", None
+        runtime = None
+        if state == "COMPLETED" and total_cpu:
+            runtime = format_time(parse_slurm_time(total_cpu))
+        return "Not Finished", runtime
+
+
+def entry_job_id(job_path: Path):
+    """Job-ID des Datenbankeintrags, auf den die Rechnung ``structure/NAME`` verlinkt"""
+    out_link = job_path / f"{job_path.name}.out"
+    if not out_link.is_symlink():
+        return None
+    return read_job_id(Path(os.readlink(out_link)).parent)
+
+
+shared_scheduler = SchedulerStatus()
@@ -0,0 +1,196 @@
+"""Hintergrunddienst, der den Status aller Rechnungen in einer SQLite-Datei aktuell hält.
+
+Das Dashboard liest nur noch diesen Schnappschuss, statt bei jedem Aufruf den ganzen
+``calculations/``-Baum zu durchsuchen:
+
+    python scripts/status_watcher.py --interval 60
+
+Mit ``watchdog`` (inotify) werden geänderte Topics sofort neu eingelesen, ohne wird alle
+``interval`` Sekunden gepollt. Auch mit inotify gibt es die regelmäßige Runde, weil Änderungen
+anderer Knoten auf Lustre/NFS keine Ereignisse auslösen. Dank OutputTailReader und dem
+Cache der Regeltabellen kostet eine Runde für unveränderte Dateien nur ``stat``-Aufrufe.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+import database
+from job_status import check_progress_of_single_topic, check_progress_of_topics, scan_pool, topic_names
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+CALCULATIONS_PATH = database.BASE_PATH / "calculations"
+STATUS_DB = Path(os.environ.get("ORCA_LED_STATUS_DB", database.BASE_PATH / "job_status.sqlite"))
+
+
+class StatusStore:
+    """Schnappschuss der Job-Status: eine Zeile pro Rechnung, ersetzt pro Topic in einer Transaktion"""
+
+    def __init__(self, path: Path = None) -> None:
+        self.path = Path(path) if path is not None else STATUS_DB
+        with closing(self.connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                topic TEXT, structure TEXT, position INTEGER, job TEXT, structure_path TEXT,
+                progress TEXT, runtime TEXT, name TEXT, energy REAL,
+                PRIMARY KEY (topic, structure, position))""")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def replace_topic(self, topic: str, subtopics: dict) -> None:
+        rows = [
+            (topic, structure, position, str(job_path), str(structure_path), *info)
+            for structure, (jobs, structure_path) in subtopics.items()
+            for position, (job_path, info) in enumerate(jobs.items())
+        ]
+        with closing(self.connect()) as conn, conn:
+            conn.execute("DELETE FROM jobs WHERE topic = ?", (topic,))
+            conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def remove_missing(self, topics: list) -> None:
+        with closing(self.connect()) as conn, conn:
+            known = [row[0] for row in conn.execute("SELECT DISTINCT topic FROM jobs")]
+            conn.executemany("DELETE FROM jobs WHERE topic = ?", [(topic,) for topic in known if topic not in topics])
+
+    def mark_updated(self) -> None:
+        with closing(self.connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated', ?)", (time.time(),))
+
+    def updated(self):
+        """Zeitpunkt der letzten vollständigen Runde, ``None`` wenn noch keine lief"""
+        with closing(self.connect()) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'updated'").fetchone()
+        return row[0] if row else None
+
+    def snapshot(self) -> dict:
+        """Dieselbe Struktur wie ``check_progress_of_all_topics``"""
+        topics = {}
+        with closing(self.connect()) as conn:
+            rows = conn.execute("SELECT topic, structure, job, structure_path, progress, runtime, name, energy FROM jobs ORDER BY topic, structure, position")
+            for topic, structure, job, structure_path, progress, runtime, name, energy in rows:
+                subtopics = topics.setdefault(topic, {})
+                if structure not in subtopics:
+                    subtopics[structure] = ({}, Path(structure_path))
+                subtopics[structure][0][Path(job)] = (progress, runtime, name, energy)
+        return topics
+
+
+class TopicEvents(FileSystemEventHandler):
+    """Merkt sich, in welchen Topics sich etwas geändert hat"""
+
+    def __init__(self, base_path: Path) -> None:
+        self.base_path = Path(base_path)
+        self.dirty: set[str] = set()
+        self.lock = threading.Lock()
+
+    def on_any_event(self, event) -> None:
+        try:
+            relative = Path(event.src_path).relative_to(self.base_path)
+        except ValueError:
+            return
+        if relative.parts and not relative.parts[0].startswith("."):
+            with self.lock:
+                self.dirty.add(relative.parts[0])
+
+    def take(self) -> set[str]:
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        return dirty
+
+
+class StatusWatcher:
+    """Hält den StatusStore für ``base_path`` aktuell"""
+
+    def __init__(self, base_path: Path = None, store: StatusStore = None, interval: float = 60.0, debounce: float = 2.0, workers: int = None) -> None:
+        self.base_path = Path(base_path) if base_path is not None else CALCULATIONS_PATH
+        self.store = store if store is not None else StatusStore()
+        self.interval = interval
+        self.debounce = debounce
+        # eigener Pool nur, wenn ``workers`` vom Standard (ORCA_LED_SCAN_WORKERS) abweichen soll
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="job-status") if workers else scan_pool
+
+    def scan_topic(self, topic: str) -> None:
+        topic_path = self.base_path / topic
+        if not topic_path.is_dir():
+            self.store.replace_topic(topic, {})
+            return
+        try:
+            self.store.replace_topic(topic, check_progress_of_single_topic(topic_path, pool=self.pool))
+        except Exception as e:
+            logging.error(f"Scanning topic {topic} failed: {e}")
+
+    def scan_all(self) -> None:
+        start_time = time.time()
+        topics = topic_names(self.base_path)
+        try:
+            # alle Topics in einem Durchlauf über den gemeinsamen Pool
+            progress = check_progress_of_topics([self.base_path / topic for topic in topics], pool=self.pool)
+            for topic in topics:
+                self.store.replace_topic(topic, progress.get(topic, {}))
+        except Exception as e:
+            logging.error(f"Full scan failed, scanning topics one by one: {e}")
+            for topic in topics:
+                self.scan_topic(topic)
+        self.store.remove_missing(topics)
+        self.store.mark_updated()
+        logging.info(f"Scanned {len(topics)} topics in {time.time() - start_time:.2f} seconds")
+
+    def run(self, stop: threading.Event = None) -> None:
+        stop = stop or threading.Event()
+        observer = None
+        events = None
+        if Observer is not None:
+            events = TopicEvents(self.base_path)
+            observer = Observer()
+            observer.schedule(events, str(self.base_path), recursive=True)
+            observer.start()
+            logging.info(f"Watching {self.base_path} with inotify, full scan every {self.interval} s")
+        else:
+            logging.info(f"watchdog not installed, polling {self.base_path} every {self.interval} s")
+        try:
+            next_scan = 0.0
+            while not stop.is_set():
+                if time.time() >= next_scan:
+                    self.scan_all()
+                    next_scan = time.time() + self.interval
+                elif events is not None:
+                    for topic in events.take():
+                        self.scan_topic(topic)
+                stop.wait(self.debounce if events is not None else max(next_scan - time.time(), 0))
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hält den Job-Status aller Rechnungen in einer SQLite-Datei aktuell")
+    parser.add_argument("--base", type=Path, default=CALCULATIONS_PATH)
+    parser.add_argument("--db", type=Path, default=STATUS_DB)
+    parser.add_argument("--interval", type=float, default=60.0, help="Sekunden zwischen vollständigen Runden")
+    parser.add_argument("--workers", type=int, default=None, help="gleichzeitige Zugriffe beim Scan (Standard: ORCA_LED_SCAN_WORKERS oder 8)")
+    parser.add_argument("--once", action="store_true", help="nur eine Runde, dann beenden")
+    args = parser.parse_args()
+    watcher = StatusWatcher(args.base, StatusStore(args.db), args.interval, workers=args.workers)
+    if args.once:
+        watcher.scan_all()
+    else:
+        watcher.run()
+
+
+if __name__ == "__main__":
+    main()
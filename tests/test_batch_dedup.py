@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import database
+from database import Database
+from batch_dedup import BatchDeduplicator
+
+HEADER = "! DLPNO-CCSD(T) def2-svp def2-svp/C DEF2/J RIJCOSX tightSCF normalPNO LED\n%pal\n  nprocs "
+
+
+class FakeCalculation:
+    """Das, was BatchDeduplicator von pipeline.Calculation braucht (ohne RDKit)"""
+
+    def __init__(self, xyz_file: Path) -> None:
+        self.xyz_file = str(xyz_file)
+        self.job_dir = Path(self.xyz_file.split(".")[0])
+
+    def inp_content(self, xyz_file: str) -> str:
+        return f"{HEADER}6\nend\n*XYZfile 0 1 {xyz_file}\n\n"
+
+
+def write_xyz(path: Path, atoms: list, coords: np.ndarray) -> FakeCalculation:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [str(len(atoms)), "comment"] + [f"{a} {x:.8f} {y:.8f} {z:.8f}" for a, (x, y, z) in zip(atoms, coords)]
+    path.write_text("\n".join(lines) + "\n")
+    return FakeCalculation(path)
+
+
+def test_upload_duplicates_are_clustered(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    rng = np.random.default_rng(0)
+    atoms = ["C", "C", "H", "H", "H", "H", "O"]
+    coords = rng.normal(scale=1.5, size=(len(atoms), 3))
+    q, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+    order = rng.permutation(len(atoms))
+
+    first = write_xyz(tmp_path / "topic" / "a" / "subsys_001.xyz", atoms, coords)
+    # gleiche Geometrie, gedreht und umnummeriert, in einer anderen Struktur des Uploads
+    same = write_xyz(tmp_path / "topic" / "b" / "subsys_001.xyz", [atoms[i] for i in order], (coords @ q.T)[order])
+    other = write_xyz(tmp_path / "topic" / "c" / "subsys_001.xyz", atoms, coords + rng.normal(scale=0.3, size=coords.shape))
+
+    db = Database(first.job_dir)
+    unique, duplicates = BatchDeduplicator(db).cluster([first, same, other])
+
+    assert unique == [first, other]
+    assert duplicates == {same: first}
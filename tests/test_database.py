@@ -0,0 +1,384 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import database
+from database import Database
+
+HEADER = """! DLPNO-CCSD(T) def2-svp def2-svp/C DEF2/J RIJCOSX tightSCF normalPNO LED
+%pal
+  nprocs 6
+end
+*XYZfile 0 1 {xyz}
+
+"""
+
+
+def make_candidate(topic: Path, name: str, xyz_text: str) -> Path:
+    """Legt eine Kandidatenrechnung so an, wie ORCAInputFileCreator sie hinterlässt"""
+    topic.mkdir(parents=True, exist_ok=True)
+    xyz_path = topic / f"{name}.xyz"
+    xyz_path.write_text(xyz_text)
+    job_dir = topic / name
+    job_dir.mkdir(exist_ok=True)
+    (job_dir / f"{name}.inp").write_text(HEADER.format(xyz=xyz_path))
+    return job_dir
+
+
+def test_index_lookup_and_dedup(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/BrBr_FCCH.xyz").read_text()
+
+    first = Database.process_candidate(make_candidate(tmp_path / "topic_a", "BrBr_FCCH", xyz_text))
+    assert first is not None
+    Path(first).with_suffix(".inp").write_text(HEADER.format(xyz=first))
+    second = Database.process_candidate(make_candidate(tmp_path / "topic_b", "BrBr_FCCH", xyz_text))
+    assert second is None
+
+    db = Database(tmp_path / "topic_a" / "BrBr_FCCH")
+    names = db.index.names()
+    assert names == [Path(first).parent.name]
+    assert db.index.lookup(*db.catalog_key()) == names
+    assert (tmp_path / "topic_b" / "BrBr_FCCH" / "BrBr_FCCH.out").resolve().parent.name == names[0]
+
+
+def test_rebuild_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/BrBr_FCCH.xyz").read_text()
+    path = Database.process_candidate(make_candidate(tmp_path / "topic", "BrBr_FCCH", xyz_text))
+    Path(path).with_suffix(".inp").write_text(HEADER.format(xyz=path))
+
+    (tmp_path / "database.sqlite").unlink()
+    db = Database(tmp_path / "topic" / "BrBr_FCCH")
+    assert db.index.names() == [Path(path).parent.name]
+
+
+def test_fingerprint_is_invariant_and_bounds_rmsd(tmp_path, monkeypatch):
+    import numpy as np
+    from fingerprint import fingerprint, rmsd_lower_bound
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    db = Database(tmp_path / "topic" / "input")
+    coords = db.coords_from_filecontent((BASE_PATH / "tests/input.xyz").read_text())
+
+    rng = np.random.default_rng(0)
+    rotation, _ = np.linalg.qr(rng.normal(size=(3, 3)))
+    moved = (coords @ rotation.T + 1.5)[rng.permutation(len(coords))]
+    assert fingerprint(coords)[0] == fingerprint(moved)[0]
+
+    distorted = coords + rng.normal(scale=0.05, size=coords.shape)
+    D1 = db.compute_distance_matrix(coords)
+    D2 = db.compute_distance_matrix(distorted)
+    identity = np.arange(len(coords))
+    bound = rmsd_lower_bound(fingerprint(coords)[1], fingerprint(distorted)[1], len(coords))
+    assert 0 < bound <= db.rmsd_of_distance_matrices(D1, D2, identity, identity)
+
+
+def test_element_blocked_assignment_matches_reference(tmp_path, monkeypatch):
+    import numpy as np
+    from scipy.optimize import linear_sum_assignment
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    db = Database(tmp_path / "topic" / "input")
+    rng = np.random.default_rng(1)
+    for name in ["BrBr_FCCH.xyz", "input.xyz"]:
+        content = (BASE_PATH / "tests" / name).read_text()
+        atoms = db.atoms_from_filecontent(content)
+        coords = db.coords_from_filecontent(content)
+        noisy = coords + rng.normal(scale=0.01, size=coords.shape)
+        D1 = db.compute_distance_matrix(coords)
+        D2 = db.compute_distance_matrix(noisy)
+
+        # bisherige Zuordnung über den vollen N x N x N Tensor
+        reference = np.sum((D1[:, None, :] - D2[None, :, :])**2, axis=-1)
+        _, reference_col = linear_sum_assignment(reference)
+
+        _, col_ind, _ = db.match_distance_matrices(D1, D2, atoms, atoms)
+        assert np.array_equal(col_ind, reference_col)
+
+        order = rng.permutation(len(atoms))
+        shuffled = "\n".join([str(len(atoms)), "shuffled"] + [
+            f"{atoms[i]} {x} {y} {z}" for i, (x, y, z) in zip(order, coords[order])
+        ])
+        value, col_ind = db.rmsd(content, shuffled)
+        assert value < db.rmsd_value
+        assert [atoms[order[j]] for j in col_ind] == atoms
+
+
+def test_rmsd_batch_matches_pairwise(tmp_path, monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    db = Database(tmp_path / "topic" / "input")
+    content = (BASE_PATH / "tests/input.xyz").read_text()
+    atoms = db.atoms_from_filecontent(content)
+    coords = db.coords_from_filecontent(content)
+
+    rng = np.random.default_rng(2)
+    folders, texts = [], []
+    for k in range(5):
+        order = rng.permutation(len(atoms))
+        moved = coords[order] + rng.normal(scale=0.02 * k, size=coords.shape)
+        text = "\n".join([str(len(atoms)), "entry"] + [f"{atoms[i]} {x} {y} {z}" for i, (x, y, z) in zip(order, moved)])
+        folder = f"C6_{k}"
+        (db.base / folder).mkdir()
+        (db.base / folder / f"{folder}.xyz").write_text(text)
+        folders.append(folder)
+        texts.append(text)
+
+    expected = [db.rmsd(content, text) for text in texts]
+    db.batch_size = 2
+    for workers in [None, 2]:
+        db.workers = workers
+        db.parallel_threshold = 1
+        results = db.rmsd_batch(content, folders)
+        for (value, col), (ref_value, ref_col) in zip(results, expected):
+            assert np.isclose(value, ref_value)
+            assert np.array_equal(col, ref_col)
+    assert np.load(db.sidecar_paths(folders[0])[0], mmap_mode="r").shape == (len(atoms), len(atoms))
+
+
+def test_cleanup_merges_all_duplicates_and_retargets_links(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+
+    jobs = []
+    for topic in ["t1", "t2", "t3"]:
+        job_dir = make_candidate(tmp_path / "calculations" / topic, "input", xyz_text)
+        (job_dir / "input.out").write_text("running")
+        Database(job_dir).add_calculation()
+        jobs.append(job_dir)
+
+    db = Database(jobs[0])
+    names = db.index.names()
+    assert len(names) == 3
+    for name in names[1:]:
+        finished = db.base / name / f"{name}.out"
+        finished.unlink()
+        finished.write_text("****ORCA TERMINATED NORMALLY****\n")
+    for job_dir, name in zip(jobs, names):
+        for file in job_dir.iterdir():
+            file.unlink()
+        job_db = Database(job_dir)
+        with job_db.index.transaction():
+            job_db.create_symlink(db.base / name / f"{name}.out")
+
+    db.index.rebuild_links([])
+    assert db.rebuild_links() == 3 * len(db.ends)
+
+    db.cleanup()
+    # names[0] läuft noch und bleibt unangetastet
+    assert db.index.names() == names[:2]
+    assert (jobs[0] / "input.out").resolve() == (db.base / names[0] / f"{names[0]}.out").resolve()
+    for job_dir in jobs[1:]:
+        assert (job_dir / "input.out").resolve() == (db.base / names[1] / f"{names[1]}.out").resolve()
+    assert len(db.index.links_to(names[1])) == 2 * len(db.ends)
+
+
+def test_copy_to_db_links_outputs(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    job_dir = make_candidate(tmp_path / "calculations" / "topic" / "input", "input", xyz_text)
+    (job_dir / "input.cube").write_bytes(b"\0" * 4096)
+
+    (job_dir / "input.bibtex").write_text("@article{orca}")
+
+    db = Database(job_dir)
+    db.copy_to_db(link_mode="auto", workers=2)
+    names = db.index.names()
+    assert len(names) == 1
+    bibtex = db.base / names[0] / f"{names[0]}.bibtex"
+    assert not os.path.samefile(bibtex, job_dir / "input.bibtex")
+    assert bibtex.read_text() == "@article{orca}"
+    assert (db.base / names[0] / f"{names[0]}.inp").read_text() == (job_dir / "input.inp").read_text()
+
+
+def test_artifacts_are_deduplicated_and_compressed(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    cube = b"cube data " * 1000
+    for topic in ["t1", "t2"]:
+        job_dir = make_candidate(tmp_path / "calculations" / topic / "input", "input", xyz_text)
+        (job_dir / "input.cube").write_bytes(cube)
+        (job_dir / "input.out").write_text("****ORCA TERMINATED NORMALLY****\n")
+        Database(job_dir).add_calculation()
+
+    db = Database(job_dir)
+    first, second = db.index.names()
+    assert (db.base / first / f"{first}.cube").resolve() == (db.base / second / f"{second}.cube").resolve()
+    assert (db.base / first / f"{first}.cube").resolve().suffix in (".zst", ".gz")
+    with db.open_artifact(first, ".cube") as f:
+        assert f.read() == cube
+    assert (db.base / second / f"{second}.out").read_text().startswith("****ORCA")
+
+    db.syslink_merge(second, first)
+    db.blobs.prune(db.base)
+    with db.open_artifact(first, ".cube") as f:
+        assert f.read() == cube
+
+
+def submit(job_dir):
+    return Database.process_candidate(job_dir)
+
+
+def test_parallel_submitters_create_one_entry(tmp_path, monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    jobs = [make_candidate(tmp_path / "calculations" / f"t{i}" / "input", "input", xyz_text) for i in range(8)]
+    Database(jobs[0])  # Katalog anlegen, bevor die Prozesse starten
+
+    with ProcessPoolExecutor(4) as pool:
+        results = list(pool.map(submit, jobs))
+
+    created = [path for path in results if path is not None]
+    assert len(created) == 1
+    db = Database(jobs[0])
+    assert db.index.names() == [Path(created[0]).parent.name]
+    for job_dir in jobs:
+        assert (job_dir / "input.out").resolve().parent == Path(created[0]).parent
+
+
+def test_near_duplicate_provides_initial_guess(tmp_path, monkeypatch):
+    from molecule import Molecule
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = "4\nreference\nO 0.0 0.0 0.0\nH 0.96 0.0 0.0\nH -0.24 0.93 0.0\nF 3.0 0.0 0.0\n"
+    first = Database.process_candidate(make_candidate(tmp_path / "topic_a", "HOHF", xyz_text))
+    Path(first).with_suffix(".inp").write_text(HEADER.format(xyz=first))
+    Path(first).with_suffix(".out").write_text("****ORCA TERMINATED NORMALLY****\n")
+    Path(first).with_suffix(".gbw").write_text("orbitals")
+
+    # andere Atomreihenfolge, F um 0.05 Å verschoben: kein Duplikat, aber nah genug
+    shifted = "4\nshifted\nF 3.05 0.0 0.0\nH -0.24 0.93 0.0\nO 0.0 0.0 0.0\nH 0.96 0.0 0.0\n"
+    path, guess = Database.find_or_insert(make_candidate(tmp_path / "topic_b", "HOHF", shifted), guess_tolerance=0.1)
+    assert path is not None and path != first
+    assert guess.gbw == Path(first).with_suffix(".gbw")
+    reordered = Molecule.from_xyz(path)
+    assert reordered.elements.tolist() == ["O", "H", "H", "F"]
+    assert reordered.coords[3, 0] == 3.05
+
+    assert guess.remap_fragment_line(["  1 {0} end\n"]) == [f"  1 {{{guess.col_ind[0]}}} end\n"]
+    header = guess.header(HEADER.format(xyz=path))
+    assert header.startswith(f"! MORead\n%moinp \"{guess.gbw}\"")
+    db = Database(tmp_path / "topic_b" / "HOHF")
+    assert db.header_key(header) == db.header_key(HEADER.format(xyz=path))
+
+    # ohne Toleranz bleibt alles wie bisher
+    path, guess = Database.find_or_insert(make_candidate(tmp_path / "topic_c", "HOHF", shifted.replace("3.05", "3.10")))
+    assert path is not None and guess is None
+
+
+def test_index_is_shared_and_rebuilt_once(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    path = Database.process_candidate(make_candidate(tmp_path / "topic", "input", xyz_text))
+    Path(path).with_suffix(".inp").write_text(HEADER.format(xyz=path))
+
+    (tmp_path / "database.sqlite").unlink()
+    rebuilds = []
+    monkeypatch.setattr(Database, "rebuild_index", lambda self: rebuilds.append(self.index.rebuild(self.base, self.read_entry)))
+    with ThreadPoolExecutor(4) as pool:
+        dbs = list(pool.map(Database, [tmp_path / "topic" / "input"] * 8))
+    assert rebuilds == [1]
+    assert all(db.index is dbs[0].index for db in dbs)
+    assert dbs[0].index.names() == [Path(path).parent.name]
+
+
+def test_cleanup_without_catalog_keeps_symlinks_valid(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+
+    jobs = []
+    for topic in ["t1", "t2"]:
+        job_dir = make_candidate(tmp_path / "calculations" / topic / "input", "input", xyz_text)
+        (job_dir / "input.out").write_text("****ORCA TERMINATED NORMALLY****\n")
+        Database(job_dir).add_calculation()
+        jobs.append(job_dir)
+    db = Database(jobs[0])
+    for job_dir, name in zip(jobs, db.index.names()):
+        for file in job_dir.iterdir():
+            file.unlink()
+        job_db = Database(job_dir)
+        with job_db.index.transaction():
+            job_db.create_symlink(db.base / name / f"{name}.out")
+
+    # vorhandener Baum, Katalog fehlt: Einträge und Links werden beim Öffnen neu aufgebaut
+    (tmp_path / "database.sqlite").unlink()
+    db = Database(jobs[0])
+    assert len(db.index.names()) == 2
+    db.cleanup()
+    assert len(db.index.names()) == 1
+    for job_dir in jobs:
+        assert (job_dir / "input.out").read_text().startswith("****ORCA")
+        for end in db.ends:
+            assert Path(os.readlink(job_dir / f"input{end}")).parent.name == db.index.names()[0]
+
+
+def test_blobs_do_not_share_the_source_inode(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    job_dir = make_candidate(tmp_path / "calculations" / "topic" / "input", "input", xyz_text)
+    source = job_dir / "input.out"
+    source.write_text("****ORCA TERMINATED NORMALLY****\n")
+    mode = source.stat().st_mode
+
+    db = Database(job_dir)
+    db.add_calculation(link_mode="hardlink")
+    name = db.index.names()[0]
+    assert source.stat().st_mode == mode and source.stat().st_nlink == 1
+    assert not os.path.samefile(source, db.base / name / f"{name}.out")
+
+
+def test_editing_the_source_leaves_the_blob_unchanged(tmp_path, monkeypatch):
+    import os
+
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    job_dir = make_candidate(tmp_path / "calculations" / "topic" / "input", "input", xyz_text)
+    source = job_dir / "input.out"
+    source.write_text("****ORCA TERMINATED NORMALLY****\n")
+
+    db = Database(job_dir)
+    db.add_calculation(link_mode="auto")
+    name = db.index.names()[0]
+    entry = db.base / name / f"{name}.out"
+    blob = db.blobs.find(db.blobs.hash_file(entry))
+    assert entry.resolve() == blob.resolve()
+    assert not os.path.samefile(source, blob)
+
+    with source.open("a") as f:
+        f.write("rerun\n")
+    assert entry.read_text() == "****ORCA TERMINATED NORMALLY****\n"
+    assert db.blobs.hash_file(blob) == blob.name
+
+    db.compact()
+    assert entry.read_text() == "****ORCA TERMINATED NORMALLY****\n"
+
+
+def test_identical_outputs_share_one_blob_after_compact(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/input.xyz").read_text()
+    for topic in ["t1", "t2"]:
+        job_dir = make_candidate(tmp_path / "calculations" / topic / "input", "input", xyz_text)
+        (job_dir / "input.out").write_text("****ORCA TERMINATED NORMALLY****\n")
+        Database(job_dir).add_calculation()
+
+    db = Database(job_dir)
+    db.compact()
+    first, second = db.index.names()
+    blob = (db.base / first / f"{first}.out").resolve()
+    assert blob == (db.base / second / f"{second}.out").resolve()
+    assert blob.parent.parent == db.blobs.root.resolve() and blob.exists()
+    assert len([path for path in db.blobs.root.glob("*/*") if path.name == blob.name]) == 1
+    assert (db.base / second / f"{second}.out").read_text().startswith("****ORCA")
@@ -0,0 +1,62 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from error_rules import ERROR_RULES, RuleSet, slurm_rules
+
+
+def sequential(content: str):
+    """Die frühere Kette von ``in``-Abfragen"""
+    return next((result for pattern, result in ERROR_RULES if pattern in content), None)
+
+
+def test_first_rule_of_the_table_wins_across_chunks(tmp_path):
+    rules = RuleSet(ERROR_RULES, chunk_size=16)
+    cases = [
+        "all fine\n",
+        "step 1\nslurmstepd: error: *** JOB 1 CANCELLED AT 2024-01-01 ***\n",
+        "mpirun noticed that process rank 0 exited\nout of memory\n",
+        # weiter unten, aber in der Tabelle weiter oben: Syntax vor mpirun
+        "mpirun noticed that process rank 3\n" + "x" * 100 + "\nWrong syntax in xyz coordinates",
+        "aborting the run\n" + "filler line\n" * 50 + "multiplicity does not fit\n",
+    ]
+    for n, content in enumerate(cases):
+        path = tmp_path / f"job{n}_err.err"
+        path.write_text(content)
+        result = rules.classify(path)
+        assert (result[0] if result else None) == sequential(content)
+
+
+def test_results_are_cached_until_the_file_changes(tmp_path):
+    rules = RuleSet(ERROR_RULES)
+    path = tmp_path / "job_err.err"
+    path.write_text("Segmentation fault\n")
+    assert rules.classify(path) == ("Seg fault", None)
+    rules.match_file = None  # ein Cache-Treffer darf die Datei nicht lesen
+    assert rules.classify(path) == ("Seg fault", None)
+    del rules.match_file
+    path.write_text("Segmentation fault\nwrong multiplicity\n")
+    assert rules.classify(path) == ("multiplicity", None)
+
+
+def test_slurm_rules_return_runtime_value(tmp_path):
+    path = tmp_path / "job_out.out"
+    path.write_text("Job ID: 1\nCPU Utilized: 01:02:03\nCPU Efficiency: 99%\n")
+    assert slurm_rules.classify(path) == ("runtime", " 01:02:03")
+    path.write_text("CPU Utilized: 01:02:03\nslurmstepd: CANCELLED AT 10:00 DUE TO TIME LIMIT\n")
+    assert slurm_rules.classify(path) == ("Failed: Time Limit", None)
+
+
+def test_cache_is_bounded(tmp_path):
+    rules = RuleSet(ERROR_RULES, max_entries=3)
+    paths = []
+    for n in range(5):
+        path = tmp_path / f"job{n}_err.err"
+        path.write_text("Segmentation fault\n")
+        paths.append(path)
+        rules.classify(path)
+    rules.classify(paths[2])
+    rules.classify(paths[0])
+    assert list(rules.cache) == [str(paths[4]), str(paths[2]), str(paths[0])]
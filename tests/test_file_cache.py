@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from file_cache import FileCache
+
+
+def test_hits_invalidation_and_eviction(tmp_path):
+    cache = FileCache(max_bytes=10)
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("aaaaaa")
+    b.write_text("bbbbbb")
+
+    assert cache.read_text(a) == "aaaaaa"
+    assert cache.read_text(a) == "aaaaaa"
+    assert cache.stats()["hits"] == 1
+
+    a.write_text("changed")
+    os.utime(a, ns=(1, 1))
+    assert cache.read_text(a) == "changed"
+
+    cache.read_text(b)
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] <= 10
+    assert stats["misses"] == 3
+
+
+def test_header_and_text_are_cached_separately(tmp_path):
+    cache = FileCache()
+    inp = tmp_path / "x.inp"
+    inp.write_text("! HF\n  %pal\n end\n")
+    assert cache.read_header(inp) == "! HF%palend"
+    assert cache.read_text(inp) == "! HF\n  %pal\n end\n"
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from fragmentation import Fragmenter
+from molecule import Molecule
+
+
+def water_grid(n: int, spacing: float = 3.0) -> Molecule:
+    """n x n x n Wassermoleküle im Gitterabstand ``spacing``, das mittlere ist der Ligand"""
+    water = np.array([[0.0, 0.0, 0.0], [0.96, 0.0, 0.0], [-0.24, 0.93, 0.0]])
+    offsets = (np.indices((n, n, n)).reshape(3, -1).T - (n - 1) / 2) * spacing
+    coords = (offsets[:, None, :] + water[None, :, :]).reshape(-1, 3)
+    return Molecule(["O", "H", "H"] * len(offsets), coords)
+
+
+def test_connectivity_finds_every_water_and_centre_ligand():
+    molecule = water_grid(5)
+    fragments = Fragmenter().partition(molecule)
+    assert len(fragments) == 125
+    assert all(len(fragment) == 3 for fragment in fragments)
+    assert np.allclose(molecule.coords[fragments[0][0]], 0.0)
+    assert sorted(np.concatenate(fragments).tolist()) == list(range(len(molecule)))
+
+
+def test_shell_and_nearest_select_neighbours():
+    molecule = water_grid(5)
+    ligand = Fragmenter().partition(molecule)[0]
+    distance = np.linalg.norm(molecule.coords[:, None] - molecule.coords[ligand][None], axis=2).min(axis=1)
+
+    shell = Fragmenter("shell", cutoff=3.3).partition(molecule)
+    inside = {tuple(fragment) for fragment in Fragmenter().partition(molecule)[1:] if distance[fragment].min() <= 3.3}
+    assert {tuple(fragment) for fragment in shell[1:]} == inside
+    assert 6 <= len(inside) < 26
+
+    nearest = Fragmenter("nearest", k=10).partition(molecule)
+    assert len(nearest) == 1 + 10
+    assert max(distance[fragment].min() for fragment in nearest[1:]) <= 3.7
+
+
+def test_count_groups_environment_and_string_feeds_parse_fragments():
+    molecule = water_grid(4)
+    fragmenter = Fragmenter("count", count=3)
+    fragments = fragmenter.partition(molecule)
+    assert len(fragments) == 1 + 3
+    assert sum(len(fragment) for fragment in fragments) == len(molecule)
+
+    text = Fragmenter.fragment_string(fragments)
+    ligand, environment = text.split("#")
+    assert [int(atom) - 1 for atom in ligand.split()] == fragments[0].tolist()
+    assert [len(part.split()) for part in environment.split(",")] == [len(fragment) for fragment in fragments[1:]]
+
+
+def test_trim_renumbers_cut_out():
+    kept, fragments = Fragmenter.trim([np.array([9, 10]), np.array([3, 4, 5])])
+    assert kept.tolist() == [3, 4, 5, 9, 10]
+    assert [fragment.tolist() for fragment in fragments] == [[3, 4], [0, 1, 2]]
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        Fragmenter("voronoi")
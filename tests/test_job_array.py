@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import database
+from database import Database
+from job_array import JobArraySubmitter
+from test_database import make_candidate
+
+
+def test_job_arrays_group_by_resources_and_keep_links(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    xyz_text = (BASE_PATH / "tests/BrBr_FCCH.xyz").read_text()
+    calls = tmp_path / "sbatch_calls.txt"
+    stub = tmp_path / "sbatch"
+    stub.write_text(f"#!/bin/sh\necho \"$@\" >> {calls}\necho \"Submitted batch job 4711\"\n")
+    stub.chmod(0o755)
+
+    submitter = JobArraySubmitter(sbatch=str(stub))
+    paths = []
+    for topic in ("a", "b", "c"):
+        # verschiedene Geometrien, damit jede Rechnung einen eigenen Datenbankeintrag bekommt
+        shifted = xyz_text.replace("-6.539389", f"-{6 + ord(topic) - ord('a')}.539389")
+        job_dir = make_candidate(tmp_path / topic, "BrBr_FCCH", shifted)
+        path = Database.process_candidate(job_dir)
+        paths.append(path)
+    submitter.add(paths[0], 6, 90, "20:00:00")
+    submitter.add(paths[1], 6, 90, "20:00:00")
+    submitter.add(paths[2], 12, 180, "20:00:00")
+
+    job_ids = submitter.submit()
+    assert job_ids == ["4711", "4711"]
+    scripts = sorted((tmp_path / "database" / ".arrays").glob("*/array.sh"))
+    assert len(scripts) == 2
+    assert calls.read_text().count("array.sh") == 2
+
+    small = next(script for script in scripts if "n6_" in script.parent.name)
+    assert "#SBATCH --array=1-2" in small.read_text()
+    manifest = (small.parent / "manifest.txt").read_text().splitlines()
+    assert manifest == [p.split(".")[0] for p in paths[:2]]
+    assert Path(f"{manifest[1]}.jobid").read_text() == "4711_2\n"
+
+    # Topic-Symlinks gehen über den Datenbankeintrag auf das Log des Array-Tasks
+    (small.parent / "2_out.out").write_text("CPU Utilized: 01:00:00\n")
+    topic_log = tmp_path / "b" / "BrBr_FCCH" / "BrBr_FCCH_out.out"
+    assert topic_log.read_text() == "CPU Utilized: 01:00:00\n"
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from job_dag import Job, JobDAG, SlurmBackend
+
+
+class FakeScheduler:
+    """Vergibt fortlaufende IDs und merkt sich die Abhängigkeiten"""
+
+    def __init__(self) -> None:
+        self.submitted = []
+
+    def submit(self, job, dependency_ids):
+        job_id = str(100 + len(self.submitted))
+        self.submitted.append((job.name, job_id, list(dependency_ids)))
+        return job_id
+
+
+def make_jobs(tmp_path):
+    scripts = {}
+    for name in ("supersystem", "subsys_001", "subsys_002", "postprocess"):
+        scripts[name] = tmp_path / f"{name}.sh"
+        scripts[name].write_text("#!/bin/bash\n")
+    dag = JobDAG()
+    calculations = [Job(name, scripts[name]) for name in ("supersystem", "subsys_001", "subsys_002")]
+    # der Nachbearbeitungsjob wird vor den Rechnungen eingetragen, läuft aber danach
+    dag.add(Job("postprocess", scripts["postprocess"], calculations, external=["42_3"]))
+    for job in calculations:
+        dag.add(job)
+    return dag
+
+
+def test_dag_submits_dependencies_first(tmp_path):
+    dag = make_jobs(tmp_path)
+    scheduler = FakeScheduler()
+    ids = dag.submit(scheduler)
+
+    assert [name for name, _, _ in scheduler.submitted] == ["supersystem", "subsys_001", "subsys_002", "postprocess"]
+    assert scheduler.submitted[-1][2] == [ids["supersystem"], ids["subsys_001"], ids["subsys_002"], "42_3"]
+    assert (tmp_path / "postprocess.jobid").read_text() == f"{ids['postprocess']}\n"
+
+
+def test_dag_rejects_cycles(tmp_path):
+    dag = JobDAG()
+    a = dag.add(Job("a", tmp_path / "a.sh"))
+    b = dag.add(Job("b", tmp_path / "b.sh", [a]))
+    a.dependencies.append(b)
+    with pytest.raises(ValueError):
+        dag.order()
+
+
+def test_slurm_backend_uses_afterok(tmp_path):
+    calls = tmp_path / "calls.txt"
+    stub = tmp_path / "sbatch"
+    stub.write_text(f"#!/bin/sh\necho \"$@\" >> {calls}\necho \"555;cluster\"\n")
+    stub.chmod(0o755)
+    dag = make_jobs(tmp_path)
+    dag.submit(SlurmBackend(str(stub)))
+
+    lines = calls.read_text().splitlines()
+    assert lines[0] == f"--parsable {tmp_path / 'supersystem.sh'}"
+    assert lines[-1] == f"--parsable --dependency=afterok:555:555:555:42_3 {tmp_path / 'postprocess.sh'}"
@@ -0,0 +1,101 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import job_status
+from job_status import check_progress_of_all_topics
+from status_watcher import StatusStore, StatusWatcher
+
+
+def make_job(structure: Path, name: str, out: str = None, slurm: str = None, err: str = None) -> None:
+    job = structure / name
+    job.mkdir(parents=True)
+    for end, content in ((".out", out), ("_out.out", slurm), ("_err.err", err)):
+        if content is not None:
+            (job / f"{name}{end}").write_text(content)
+
+
+def make_tree(base: Path) -> None:
+    structure = base / "topic" / "BrBr"
+    make_job(structure, "BrBr", "INITIAL GUESS DONE\nTIMINGS\n")
+    make_job(structure, "subsys_001", "FINAL SINGLE POINT ENERGY   -10.5\n****ORCA TERMINATED NORMALLY****\n", "CPU Utilized: 00:10:00\n")
+    make_job(structure, "subsys_002", "INITIAL GUESS DONE\n", err="Segmentation fault\n")
+    make_job(base / "other" / "HCl", "HCl")  # keine subsys_/fragment_-Ordner: kein Topic
+    (base / "topic" / ".manifest.json").write_text("{}")
+
+
+def test_scan_finds_status_runtime_and_energy(tmp_path):
+    make_tree(tmp_path)
+    topics = check_progress_of_all_topics(tmp_path)
+    assert list(topics) == ["topic"]
+    jobs, structure_path = topics["topic"]["BrBr"]
+    assert structure_path == tmp_path / "topic" / "BrBr"
+    assert list(jobs.values()) == [
+        ("Progress: 100%", None, "BrBr", None),
+        ("Progress: 100%", "00:10:00", "subsys_001", -10.5),
+        ("Seg fault", None, "subsys_002", None),
+    ]
+
+
+def test_scan_keeps_order_and_bounded_concurrency(tmp_path, monkeypatch):
+    for topic in ("a", "b"):
+        for i in range(5):
+            structure = tmp_path / topic / f"mol{i}"
+            make_job(structure, f"mol{i}", "INITIAL GUESS DONE\n")
+            for j in (2, 1):
+                make_job(structure, f"subsys_00{j}", "TIMINGS\n")
+
+    running, peak = 0, 0
+    lock = threading.Lock()
+    check = job_status.check_progress_of_single_file
+
+    def counting_check(*args):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return check(*args)
+
+    monkeypatch.setattr(job_status, "check_progress_of_single_file", counting_check)
+    with ThreadPoolExecutor(2) as pool:
+        topics = check_progress_of_all_topics(tmp_path, scheduler=None, pool=pool)
+    assert sorted(topics) == ["a", "b"]
+    jobs, _ = topics["b"]["mol3"]
+    assert [info[2] for info in jobs.values()] == ["mol3", "subsys_001", "subsys_002"]
+    assert sum(len(jobs) for structures in topics.values() for jobs, _ in structures.values()) == 30
+    assert peak == 2
+
+
+def test_watcher_snapshot_matches_scan_and_follows_changes(tmp_path):
+    base = tmp_path / "calculations"
+    make_tree(base)
+    store = StatusStore(tmp_path / "status.sqlite")
+    watcher = StatusWatcher(base, store, interval=0.1)
+    watcher.scan_all()
+    assert store.snapshot() == check_progress_of_all_topics(base)
+    assert store.updated() is not None
+
+    stop = threading.Event()
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        with open(base / "topic" / "BrBr" / "BrBr" / "BrBr.out", "a") as f:
+            f.write("****ORCA TERMINATED NORMALLY****\n")
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            jobs, _ = store.snapshot()["topic"]["BrBr"]
+            if jobs[base / "topic" / "BrBr" / "BrBr"][0] == "Progress: 100%":
+                break
+            time.sleep(0.05)
+        assert jobs[base / "topic" / "BrBr" / "BrBr"][0] == "Progress: 100%"
+    finally:
+        stop.set()
+        thread.join()
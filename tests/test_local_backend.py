@@ -0,0 +1,94 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from job_dag import Job, JobDAG
+from local_backend import LocalExecutor
+
+
+def mock_orca(tmp_path, sleep=0.2):
+    """Schreibt Start/Ende in ``runs.txt`` und eine normal beendete ORCA-Ausgabe"""
+    log = tmp_path / "runs.txt"
+    orca = tmp_path / "orca"
+    orca.write_text(
+        "#!/bin/sh\n"
+        f"echo \"start $(date +%s.%N) $1\" >> {log}\n"
+        f"sleep {sleep}\n"
+        "echo 'warning from orca' >&2\n"
+        "grep -q FAIL \"$1\" && exit 3\n"
+        "echo '****ORCA TERMINATED NORMALLY****'\n"
+        f"echo \"end $(date +%s.%N) $1\" >> {log}\n"
+    )
+    orca.chmod(0o755)
+    return orca, log
+
+
+def make_entry(tmp_path, name, content="! B3LYP def2-SVP\n"):
+    entry = tmp_path / name
+    entry.mkdir()
+    (entry / f"{name}.inp").write_text(content)
+    return entry / name
+
+
+def test_local_runs_write_slurm_layout_and_respect_core_budget(tmp_path):
+    orca, log = mock_orca(tmp_path)
+    executor = LocalExecutor(str(orca), cores=4)
+    paths = [make_entry(tmp_path, f"entry{i}") for i in range(3)]
+    for path in paths:
+        executor.add(f"{path}.xyz", 4, 60, "01:00:00")
+    job_ids = executor.submit()
+    assert executor.wait() == {job_id: 0 for job_id in job_ids}
+    executor.shutdown()
+
+    for path in paths:
+        assert "****ORCA TERMINATED NORMALLY****" in Path(f"{path}.out").read_text()
+        assert Path(f"{path}_err.err").read_text() == "warning from orca\n"
+        assert "CPU Utilized: 00:00:0" in Path(f"{path}_out.out").read_text()
+        assert Path(f"{path}.jobid").read_text().startswith("local-")
+
+    # jede Rechnung braucht alle 4 Kerne, also laufen sie nacheinander
+    starts = sorted(float(line.split()[1]) for line in log.read_text().splitlines() if line.startswith("start"))
+    ends = sorted(float(line.split()[1]) for line in log.read_text().splitlines() if line.startswith("end"))
+    assert all(end <= start for end, start in zip(ends, starts[1:]))
+
+
+def test_local_dag_skips_jobs_after_failed_dependency(tmp_path):
+    orca, _ = mock_orca(tmp_path, sleep=0)
+    executor = LocalExecutor(str(orca), cores=2)
+    good = make_entry(tmp_path, "good")
+    bad = make_entry(tmp_path, "bad", "FAIL\n")
+    for path in (good, bad):
+        path.with_suffix(".sh").write_text("#SBATCH --ntasks-per-node=2\n")
+    marker = tmp_path / "postprocessed"
+    post = tmp_path / "postprocess.sh"
+    post.write_text(f"touch {marker}\n")
+
+    dag = JobDAG()
+    good_job = dag.add(Job("good", good.with_suffix(".sh")))
+    bad_job = dag.add(Job("bad", bad.with_suffix(".sh")))
+    dag.add(Job("post_good", post, [good_job]))
+    dag.add(Job("post_bad", tmp_path / "never.sh", [bad_job]))
+    ids = dag.submit(executor)
+    results = executor.wait()
+    executor.shutdown()
+
+    assert results[ids["good"]] == 0
+    assert results[ids["bad"]] == 3
+    assert "State: FAILED (exit code 3)" in Path(f"{bad}_out.out").read_text()
+    assert results[ids["post_good"]] == 0 and marker.exists()
+    assert results[ids["post_bad"]] == -1
+
+
+def test_script_output_is_kept_before_the_summary(tmp_path):
+    executor = LocalExecutor("true", cores=1)
+    script = tmp_path / "postprocess.sh"
+    script.write_text("echo 'LED extraction done'\n")
+    job_id = executor.start(executor.run_script, script)
+    assert executor.wait() == {job_id: 0}
+    executor.shutdown()
+
+    output = (tmp_path / "postprocess_out.out").read_text()
+    assert output.startswith("LED extraction done\n")
+    assert "State: COMPLETED (exit code 0)" in output
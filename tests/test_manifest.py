@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from manifest import TopicManifest, settings_hash
+from fragmentation import Fragmenter
+
+
+def make_structure(topic: Path, name: str) -> Path:
+    """Struktur, wie prepare() und submit() sie hinterlassen: Eingabe, Teilstrukturen, .out-Symlinks"""
+    folder = topic / name
+    folder.mkdir(parents=True)
+    xyz = folder / f"{name}.xyz"
+    xyz.write_text("2\n\nH 0 0 0\nH 0 0 0.74\n")
+    for part in ("fragment_001", "fragment_002", "subsys_001", "subsys_002"):
+        (folder / f"{part}.xyz").write_text(f"1\n{part}\nH 0 0 0\n")
+    for job in ("subsys_001", "subsys_002", name):
+        (folder / job).mkdir()
+        (folder / job / f"{job}.out").symlink_to(topic / "database_entry.out")
+    return xyz
+
+
+def test_manifest_skips_only_unchanged_structures(tmp_path):
+    topic = tmp_path / "topic"
+    xyz = make_structure(topic, "H2")
+    other = make_structure(topic, "D2")
+    settings = settings_hash("! B3LYP def2-SVP", None, None)
+    jobs = [xyz.parent / job for job in ("subsys_001", "subsys_002", "H2")]
+
+    manifest = TopicManifest.for_file(xyz)
+    manifest.record(xyz, settings, jobs)
+    manifest.save()
+    # ein zweiter Lauf (z.B. anderer Prozess) ergänzt das Manifest, statt es zu überschreiben
+    second = TopicManifest(topic)
+    second.record(other, settings, [other.parent / "D2"])
+    second.save()
+
+    manifest = TopicManifest.for_file(xyz)
+    assert manifest.unchanged(xyz, settings)
+    assert manifest.unchanged(other, settings)
+    assert not manifest.unchanged(xyz, settings_hash("! B3LYP def2-TZVP", None, None))
+    assert not manifest.unchanged(xyz, settings_hash("! B3LYP def2-SVP", Fragmenter("shell"), None))
+
+    (xyz.parent / "fragment_002.xyz").write_text("1\nchanged\nH 0 0 1\n")
+    assert not manifest.unchanged(xyz, settings)
+    assert manifest.unchanged(other, settings)
+
+    (other.parent / "D2" / "D2.out").unlink()
+    assert not manifest.unchanged(other, settings)
+
+
+def test_manifest_hashes_full_structure_after_cut_out(tmp_path):
+    xyz = make_structure(tmp_path / "topic", "H2")
+    full = xyz.with_name("H2_full.xyz")
+    full.write_text(xyz.read_text())
+    xyz.write_text("1\ncut-out\nH 0 0 0\n")
+    settings = settings_hash(None, Fragmenter("nearest", k=1), None)
+
+    manifest = TopicManifest.for_file(xyz)
+    manifest.record(xyz, settings, [])
+    assert manifest.unchanged(xyz, settings)
+    full.write_text("2\n\nH 0 0 0\nH 0 0 0.80\n")
+    assert not manifest.unchanged(xyz, settings)
@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from molecule import Molecule
+
+
+def test_molecule_round_trip_and_subset(tmp_path):
+    molecule = Molecule.from_xyz(BASE_PATH / "tests/input.xyz")
+    assert len(molecule) == 24
+    assert molecule.elements[0] == "Br"
+    assert molecule.multi_letter_atoms().tolist()[0] == 0
+
+    path = tmp_path / "copy.xyz"
+    molecule.write_xyz(path, "copy")
+    copy = Molecule.from_xyz(path)
+    assert copy.elements.tolist() == molecule.elements.tolist()
+    assert np.allclose(copy.coords, molecule.coords)
+
+    charged = Molecule(molecule.elements, molecule.coords, np.arange(24) % 2)
+    part = charged.subset([1, 3, 4])
+    assert part.elements.tolist() == [molecule.elements[i] for i in (1, 3, 4)]
+    assert part.charge == 2
@@ -0,0 +1,115 @@
+import sys
+import time
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from orca_prediction import CostModel, RunHistory
+
+OUT = """                                 *****************
+                                 * O   R   C   A *
+                                 *****************
+                         INPUT FILE
+================================================================================
+NAME = {name}.inp
+|  1> ! DLPNO-CCSD(T) def2-svp def2-svp/C DEF2/J RIJCOSX tightSCF normalPNO LED
+|  2> %pal
+|  3>   nprocs 4
+|  4> end
+|  5> *XYZfile 0 1 {name}.xyz
+|  6>
+|  7>                          ****END OF INPUT****
+ Number of atoms                             ...    {atoms}
+ Total Charge           Charge          ....    0
+...
+                             ****ORCA TERMINATED NORMALLY****
+TOTAL RUN TIME: 0 days 0 hours {minutes} minutes 0 seconds 0 msec
+"""
+
+
+def write_run(root: Path, name: str, atoms: int, minutes: int, memory_gb: float) -> None:
+    folder = root / name
+    folder.mkdir(parents=True)
+    (folder / f"{name}.out").write_text(OUT.format(name=name, atoms=atoms, minutes=minutes))
+    (folder / f"{name}_out.out").write_text(f"CPU Utilized: 01:00:00\nMemory Utilized: {memory_gb:.2f} GB\n")
+
+
+def test_history_parses_outputs_and_model_refits_incrementally(tmp_path):
+    root = tmp_path / "database"
+    for i, atoms in enumerate((10, 20, 40)):
+        write_run(root, f"run{i}", atoms, atoms // 2, atoms / 4)
+
+    history = RunHistory(tmp_path / "orca_data.db")
+    assert history.process_directory(root) == 3
+    assert history.process_directory(root) == 0
+
+    model = CostModel(history)
+    assert model.refresh() == 3
+    key = ("DLPNO-CCSD(T)", "DEF2-SVP", "NORMALPNO")
+    cpu_seconds, memory_gb = model.predict(80, key)
+    # Laufzeit linear in der Atomzahl: 80 Atome -> 40 min auf 4 Kernen
+    assert abs(cpu_seconds - 40 * 60 * 4) < 1e-6 * cpu_seconds
+    assert abs(memory_gb - 20) < 1e-6
+    assert model.predict(80, ("HF", "DEF2-SVP", "NORMALPNO")) is None
+
+    write_run(root, "run3", 80, 40, 20)
+    assert history.process_directory(root) == 1
+    assert model.refresh() == 1
+    assert model.refresh() == 0
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        model.predict(120, key)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_rewritten_output_replaces_its_row_in_the_fit(tmp_path):
+    root = tmp_path / "database"
+    for i, atoms in enumerate((10, 20, 40)):
+        write_run(root, f"run{i}", atoms, atoms // 2, atoms / 4)
+    history = RunHistory(tmp_path / "orca_data.db")
+    history.process_directory(root)
+    model = CostModel(history)
+    model.refresh()
+    key = ("DLPNO-CCSD(T)", "DEF2-SVP", "NORMALPNO")
+    before = model.predict(80, key)
+
+    # gleiche Laufzeit, andere Dateigröße: Zeile wird ersetzt, die Summen bleiben gleich
+    out = root / "run0" / "run0.out"
+    out.write_text(out.read_text() + "\n")
+    assert history.process_directory(root) == 1
+    assert model.refresh() == 1
+    assert model.cpu[key][0] == 3
+    assert abs(model.predict(80, key)[0] - before[0]) < 1e-6 * before[0]
+
+
+def test_process_new_reads_only_new_entries(tmp_path):
+    root = tmp_path / "database"
+    write_run(root, "run0", 10, 5, 2.5)
+    (root / "run1").mkdir()
+    (root / "run1" / "run1.out").write_text("running\n")
+    history = RunHistory(tmp_path / "orca_data.db")
+    assert history.process_new(root) == 1
+    assert history.process_new(root) == 0
+    assert str(root / "run1" / "run1.out") in history.pending
+
+    write_run(root, "run2", 20, 10, 5)
+    (root / "run1" / "run1.out").unlink()
+    write_run(root / "tmp", "run1", 40, 20, 10)
+    (root / "tmp" / "run1" / "run1.out").rename(root / "run1" / "run1.out")
+    assert history.process_new(root) == 2
+
+
+def test_concurrent_refresh_counts_each_row_once(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    root = tmp_path / "database"
+    for i in range(20):
+        write_run(root, f"run{i}", 10 + i, 5 + i, 2.5)
+    history = RunHistory(tmp_path / "orca_data.db")
+    history.process_directory(root)
+    model = CostModel(history)
+    with ThreadPoolExecutor(8) as pool:
+        assert sum(pool.map(lambda _: model.refresh(), range(8))) == 20
+    assert model.cpu[("DLPNO-CCSD(T)", "DEF2-SVP", "NORMALPNO")][0] == 20
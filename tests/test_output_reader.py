@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from output_reader import OutputTailReader
+
+
+def legacy_progress(content: str) -> int:
+    """Zählung aus dem alten get_progress_of_job auf der ganzen Datei"""
+    lines = content.split("\n")
+    return int("INITIAL GUESS DONE" in lines) + sum("TIMINGS" in line for line in lines)
+
+
+def test_incremental_reads_match_full_reads(tmp_path):
+    out = tmp_path / "job.out"
+    pieces = [
+        "ORCA header\n   INITIAL GUESS DONE (indented, does not count)\n",
+        "INITIAL GUESS DONE\nSCF TIMINGS\nFINAL SINGLE POINT ENERGY      -100.250000\n",
+        "DLPNO TIM",  # unvollständige Zeile
+        "INGS\nFINAL SINGLE POINT ENERGY      -100.500000\n",
+        "****ORCA TERMINATED NORMALLY****",
+    ]
+    reader = OutputTailReader(chunk_size=7)
+    content = ""
+    for piece in pieces:
+        content += piece
+        with open(out, "a") as f:
+            f.write(piece)
+        state = reader.read(out)
+        assert state.progress_count == legacy_progress(content)
+        assert state.finished == ("****ORCA TERMINATED NORMALLY****" in content)
+    assert state.last_energy == -100.5
+    assert reader.stats()["bytes_read"] == len(content.encode())
+
+    # unverändert: die Datei wird nicht gelesen
+    reader.read(out)
+    assert reader.stats()["bytes_read"] == len(content.encode())
+    assert reader.stats()["skipped"] == 1
+
+
+def test_rewritten_file_starts_over(tmp_path):
+    out = tmp_path / "job.out"
+    out.write_text("INITIAL GUESS DONE\nTIMINGS\nTIMINGS\nFINAL SINGLE POINT ENERGY  -1.0\n")
+    reader = OutputTailReader()
+    assert reader.read(out).progress_count == 3
+    out.write_text("TIMINGS\n")
+    state = reader.read(out)
+    assert state.progress_count == 1
+    assert state.last_energy is None
+
+
+def test_file_truncated_in_place_and_regrown_starts_over(tmp_path):
+    import os
+
+    out = tmp_path / "job.out"
+    out.write_text("INITIAL GUESS DONE\nTIMINGS\nTIMINGS\nFINAL SINGLE POINT ENERGY  -1.0\n")
+    reader = OutputTailReader()
+    assert reader.read(out).progress_count == 3
+    inode = out.stat().st_ino
+
+    # Neustart: gleiche Inode, vor dem nächsten Blick schon länger als vorher
+    out.write_text("rerun " * 20 + "\nTIMINGS\n")
+    assert out.stat().st_ino == inode
+    state = reader.read(out)
+    assert state.progress_count == 1
+    assert state.last_energy is None
+
+    # gleiche letzte Bytes vor dem Offset, nur die ältere mtime verrät den Neustart
+    out.write_text("INITIAL GUESS DONE\n" + "x" * 300 + "\n")
+    assert reader.read(out).progress_count == 1
+    stamp = out.stat().st_mtime_ns
+    out.write_text("NOTHING GUESS DONE\n" + "x" * 300 + "\nTIMINGS\n")
+    os.utime(out, ns=(stamp - 10**9, stamp - 10**9))
+    assert reader.read(out).progress_count == 1
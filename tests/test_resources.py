@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+import database
+from database import Database
+from resources import ResourceModel, method_key, parse_run_time, parse_seff
+
+HEADER = """! DLPNO-CCSD(T) def2-svp def2-svp/C DEF2/J RIJCOSX tightSCF normalPNO LED
+
+%maxcore 160000
+
+%pal
+  nprocs {nprocs}
+end
+*XYZfile 0 1 x.xyz
+"""
+
+
+def test_parsers():
+    assert parse_run_time("TOTAL RUN TIME: 0 days 1 hours 2 minutes 3 seconds 500 msec") == 3723.5
+    wall, memory = parse_seff("Job Wall-clock time: 1-02:00:00\nMemory Utilized: 512.00 MB\n")
+    assert wall == 26 * 3600
+    assert memory == 0.5
+    assert method_key(HEADER) == ("DLPNO-CCSD(T)", "DEF2-SVP", "NORMALPNO")
+
+
+def write_entry(base: Path, name: str, atoms: int, seconds: int, memory_gb: float) -> None:
+    """Fertiger Datenbankeintrag mit ORCA-Eingabe-Echo und seff-Ausgabe"""
+    folder = base / name
+    folder.mkdir(parents=True)
+    echo = "\n".join(f"|  {i + 1}> {line}" for i, line in enumerate(HEADER.format(nprocs=4).splitlines()))
+    (folder / f"{name}.out").write_text(
+        f"{echo}\n Number of atoms                             ...    {atoms}\n"
+        f"****ORCA TERMINATED NORMALLY****\nTOTAL RUN TIME: 0 days 0 hours 0 minutes {seconds} seconds 0 msec\n"
+    )
+    (folder / f"{name}_out.out").write_text(f"Memory Utilized: {memory_gb:.2f} GB\n")
+
+
+def test_model_sizes_from_history_and_falls_back(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    db = Database(tmp_path / "topic" / "job")
+    # CPU-Zeit wächst quadratisch mit der Atomzahl
+    for atoms in (10, 20, 40, 80):
+        write_entry(db.base, f"run{atoms}", atoms, atoms**2 // 4, atoms)
+    model = ResourceModel.from_database(db, safety=1.0, target_hours=1.0)
+    assert ResourceModel.from_database(db).cost_model.cpu[method_key(HEADER)][0] == 4
+
+    nprocs, mem, time, maxcore = model.predict(160, HEADER.format(nprocs=48), 48)
+    # 160**2 / 4 * 4 s = 25600 CPU-s -> 8 Kerne bei 1 h Ziel, Speicher ~160 GB
+    assert nprocs == 8
+    assert 160 <= mem <= 170
+    assert time == "01:00:00"
+    assert maxcore == int(mem * 1024 * 0.75 / 8)
+
+    other = HEADER.replace("normalPNO", "tightPNO")
+    assert model.predict(160, other, 48) is None
+
+
+def test_header_key_ignores_resources(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "BASE_PATH", tmp_path)
+    db = Database(tmp_path / "topic" / "job")
+    joined = "".join(line.strip() for line in HEADER.format(nprocs=6).splitlines(keepends=True))
+    resized = HEADER.format(nprocs=12).replace("160000", "7680")
+    assert db.header_key(joined) == db.header_key(resized)
+    assert db.header_key(joined) != db.header_key(joined.replace("normalPNO", "tightPNO"))
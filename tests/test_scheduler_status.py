@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+sys.path.append(str(BASE_PATH / 'scripts'))
+
+from job_status import check_progress_of_single_topic
+from scheduler_status import SchedulerStatus, expand_array_ids
+
+
+def make_sacct(tmp_path: Path) -> tuple:
+    """Stub für sacct: schreibt seine Argumente mit und gibt feste Zustände aus"""
+    calls = tmp_path / "calls.txt"
+    script = tmp_path / "sacct"
+    script.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> "{calls}"\n'
+        "echo '4711_1|COMPLETED|01:02:03'\n"
+        "echo '4711_2|TIMEOUT|00:00:01'\n"
+        "echo '4711_[3-4]|PENDING|'\n"
+        "echo '4712|CANCELLED by 1000|'\n"
+    )
+    script.chmod(0o755)
+    return str(script), calls
+
+
+def test_expand_array_ids():
+    assert expand_array_ids("123_[1-3,7%2]") == ["123_1", "123_2", "123_3", "123_7"]
+    assert expand_array_ids("123_4") == ["123_4"]
+
+
+def test_one_sacct_call_per_batch_and_ttl_cache(tmp_path):
+    command, calls = make_sacct(tmp_path)
+    scheduler = SchedulerStatus(command, ttl=60)
+    scheduler.query(["4711_1", "4711_2", "4711_3", "4712", "local-3"])
+    assert scheduler.calls == 1
+    assert "--jobs=4711_1,4711_2,4711_3,4712" in calls.read_text()
+
+    assert scheduler.job_status("4711_1") == ("Not Finished", "01:02:03")
+    assert scheduler.job_status("4711_2") == ("Failed: Time Limit", None)
+    assert scheduler.job_status("4711_3") == ("Not Started", None)
+    assert scheduler.job_status("4712") == ("Cancelled", None)
+    assert scheduler.job_status("local-3") is None
+
+    # alles noch frisch: kein weiterer Aufruf
+    scheduler.query(["4711_1", "4711_2", "4711_3", "4712"])
+    assert scheduler.calls == 1
+
+
+def test_failing_sacct_falls_back_to_files(tmp_path):
+    scheduler = SchedulerStatus("false", ttl=60)
+    scheduler.query(["4711_1"])
+    scheduler.query(["4711_1"])
+    assert scheduler.calls == 1
+    assert scheduler.job_status("4711_1") is None
+
+
+def test_topic_uses_scheduler_state(tmp_path):
+    command, calls = make_sacct(tmp_path)
+    structure = tmp_path / "calculations" / "topic" / "BrBr"
+    for name, job_id in (("BrBr", "4711_1"), ("subsys_001", "4711_2")):
+        entry = tmp_path / "database" / f"entry_{name}"
+        entry.mkdir(parents=True)
+        (entry / f"{entry.name}.out").write_text("INITIAL GUESS DONE\n")
+        (entry / f"{entry.name}.jobid").write_text(job_id)
+        job = structure / name
+        job.mkdir(parents=True)
+        (job / f"{name}.out").symlink_to(entry / f"{entry.name}.out")
+
+    topic = check_progress_of_single_topic(tmp_path / "calculations" / "topic", SchedulerStatus(command))
+    jobs, _ = topic["BrBr"]
+    assert [status for status, *_ in jobs.values()] == ["Progress: 50%", "Failed: Time Limit"]
+    assert len(calls.read_text().splitlines()) == 1
+
+
+def test_dependency_state(tmp_path):
+    command, _ = make_sacct(tmp_path)
+    scheduler = SchedulerStatus(command)
+    scheduler.query(["4711_1", "4711_2", "4711_3", "4712", "4713"])
+    assert scheduler.dependency_state("4711_1") == "completed"
+    assert scheduler.dependency_state("4711_2") == "failed"
+    assert scheduler.dependency_state("4711_3") == "active"
+    assert scheduler.dependency_state("4712") == "failed"
+    assert scheduler.dependency_state("4713") == "gone"
+    assert scheduler.dependency_state("local-3") == "unknown"
+
+    unreachable = SchedulerStatus("false")
+    unreachable.query(["4711_3"])
+    assert unreachable.dependency_state("4711_3") == "unknown"